@@ -169,7 +169,8 @@ def md(
                         "6/1_output/constP_prod.crd",
                         "7/1_output/constP_prod.crd",
                         ]
-        pyqmmm.md.rmsf_calculator.calculate_rmsf(topology, trajectories, reference_file)
+        streaming = input("Stream the RMSF one frame at a time to save memory? (y/n) ").strip().lower() == "y"
+        pyqmmm.md.rmsf_calculator.calculate_rmsf(topology, trajectories, reference_file, streaming)
     
     elif quick_csa:
         click.echo("> Charge shift analysis:")
@@ -200,22 +201,26 @@ def md(
 
 @cli.command()
 @click.option("--plot_energy", "-pe", is_flag=True, help="Plot the energy of a xyz traj.")
+@click.option("--energy_manifest", "-em", type=click.Path(exists=True), default=None, help="Plot the energies of every trajectory group in a JSON manifest.")
 @click.option("--flip_xyz", "-f", is_flag=True, help="Reverse and xyz trajectory.")
 @click.option("--plot_mechanism", "-pm", is_flag=True, help="Plot energies for all steps of a mechanism.")
 @click.option("--residue_decomp", "-rd", is_flag=True, help="Analyze residue decomposition analysis.")
 @click.option("--qm_replace_pdb", "-qr", is_flag=True, help="Replace QM optimized atoms in a pdb.")
 @click.option("--bond_valence", "-bv", is_flag=True, help="Replace QM optimized atoms in a pdb.")
+@click.option("--multiwfn_jobs", "-mj", type=int, default=1, show_default=True, help="Multiwfn jobs run at once for --bond_valence.")
 @click.option("--orca_scan", "-os", is_flag=True, help="Plots an ORCA scan.")
 @click.option("--orca_neb_restart", "-rneb", is_flag=True, help="Prepare to restart an ORCA NEB.")
 @click.option("--combine_nebs", "-cneb", is_flag=True, help="Combines and plots NEBs as a single trajectory.")
 @click.help_option('--help', '-h', is_flag=True, help='Exiting pyQMMM.')
 def qm(
     plot_energy,
+    energy_manifest,
     flip_xyz,
     plot_mechanism,
     residue_decomp,
     qm_replace_pdb,
     bond_valence,
+    multiwfn_jobs,
     orca_scan,
     orca_neb_restart,
     combine_nebs,
@@ -230,6 +235,13 @@ def qm(
         import pyqmmm.qm.energy_plotter
         pyqmmm.qm.energy_plotter.plot_energies()
 
+    if energy_manifest:
+        click.echo("> Plot energies for a manifest of xyz trajectories:")
+        click.echo("> Loading...")
+        import pyqmmm.qm.energy_plotter
+        figures = pyqmmm.qm.energy_plotter.plot_batch(energy_manifest)
+        click.echo(f"   > Saved {len(figures)} energy plots.")
+
     if flip_xyz:
         click.echo("> Reverse an xyz trajectory:")
         click.echo("> Loading...")
@@ -273,7 +285,7 @@ def qm(
         except FileNotFoundError:
             print("   > CSV file not found. Running Multiwfn analysis.")
             atom_pairs = [(145, 146), (65, 145), (66, 145), (12, 145), (32, 145), (145, 149)]
-            pyqmmm.qm.bond_valence.calculate_bond_valence(atom_pairs, 4)
+            pyqmmm.qm.bond_valence.calculate_bond_valence(atom_pairs, 4, multiwfn_jobs)
             pyqmmm.qm.bond_valence.plot_bond_valence()
             
     if orca_scan:
@@ -1,12 +1,16 @@
 """Analyze data from hydrogen bonding analysis based on hbond.gnu file."""
 
+import numpy as np
 import pandas as pd
+import pyqmmm.md.hbond_matrix
+import pyqmmm.md.hbond_lifetimes
 import matplotlib.pyplot as plt
 from pathlib import Path
 import subprocess
 import sys
 import os
 import textwrap
+from concurrent.futures import ProcessPoolExecutor
 
 
 def compute_hbonds(cpptraj_script, submit_script, script_name):
@@ -124,22 +128,9 @@ def count_occurrences(file_path, labels):
     frame_count: total number of frames in trajectory
     """
 
-    labels["count"] = 0
-    frame_count = 0
-    with open(file_path, "r") as f:
-        for _ in range(8):
-            next(f)
-        for frame in f.read().split("\n\n"):
-            frame_count += 1
-            bonds = set()
-            for line in frame.split("\n"):
-                if line == "end":
-                    break
-                arr = [int(float(x)) for x in line.split(" ") if x]
-                if arr[-1] == 1:
-                    bonds.add(arr[1])
-            contains_bond = [len(i & bonds) != 0 for i in labels["index"]]
-            labels.loc[contains_bond, "count"] += 1
+    # Stream the series so only one block of frames is held in memory at a time
+    counts, frame_count = pyqmmm.md.hbond_matrix.final_counts(file_path, labels["index"].tolist())
+    labels["count"] = counts
     return labels, frame_count
 
 
@@ -262,25 +253,54 @@ def plot(data, file_path):
         plt.savefig(file_path + f"hbond.{ext}", format=ext, dpi=600, bbox_inches="tight")
 
 
+def system_colors(count):
+    """
+    Pick one bar color per system from a colormap sized to the number of systems.
+
+    Parameters
+    ----------
+    count: int
+        Number of systems plotted side by side
+
+    Returns
+    -------
+    colors: list
+        RGBA colors, distinct tab10 colors for up to ten systems and viridis beyond
+    """
+    if count <= 10:
+        return [plt.get_cmap("tab10")(i) for i in range(count)]
+    return [tuple(color) for color in plt.get_cmap("viridis")(np.linspace(0, 1, count))]
+
+
 def plot_multi(data, file_path):
     """
-    Plot hbonding comparison between two trajectories.
+    Plot hbonding comparison between trajectories.
 
     Parameters
     ----------
-    data: list of two dataframes
+    data: pd.DataFrame or list of dataframes
+        A tidy occupancy table from occupancy_table() or the per-system dataframes
     file_path: path to directory where output image should go
 
     """
     figure_formatting()
-    new_df = (
-        pd.merge(data[0], data[1], on=["residue", "position"], how="inner")
-        .sort_index()
-        .sort_values("position")
-    )
+    errors = None
+    if isinstance(data, pd.DataFrame):
+        new_df = wide_occupancy(data).reset_index().set_index("residue")
+        errors = wide_occupancy(data, "sem").reset_index().set_index("residue")
+    else:
+        new_df = data[0]
+        for d in data[1:]:
+            new_df = pd.merge(new_df, d, on=["residue", "position"], how="inner")
+    new_df = new_df.sort_index().sort_values("position")
     new_df = new_df.dropna(axis=0).drop(["position"], axis=1)
     new_df = new_df[new_df.ge(0.1).all(axis=1)]  # 10% ocurrence cutoff
-    ax = new_df.plot.bar(color=["Blue", "Red", "Orange"])
+    # Systems with replicates get error bars of the standard error across replicates
+    if errors is not None and errors.drop(["position"], axis=1).notna().any().any():
+        errors = errors.loc[new_df.index, new_df.columns].fillna(0.0)
+    else:
+        errors = None
+    ax = new_df.plot.bar(color=system_colors(len(new_df.columns)), yerr=errors, capsize=2)
     ax.set_ylabel("occurrence (%)", weight="bold")
     ax.set_xlabel("residue", weight="bold")
     ax.legend(bbox_to_anchor=(1.34, 1.02), frameon=False)
@@ -297,7 +317,139 @@ def plot_multi(data, file_path):
         )
 
 
-def analyze_hbonds(file_paths, names, substrate):
+def process_system(job):
+    """
+    Get the hbond occupancies of one system, reusing its hbond.csv if it exists.
+
+    Parameters
+    ----------
+    job: tuple
+        The directory containing hbond.gnu, the system name and the substrate
+
+    Returns
+    -------
+    d: pd.DataFrame
+        Occupancy of each residue, indexed by residue
+    """
+    file_path, name, substrate = job
+    data_path = Path(file_path + "hbond.csv")
+    if data_path.is_file():
+        print(f"   > {data_path} already exists")
+        d = pd.read_csv(file_path + "hbond.csv")
+        d = d.set_index("residue")
+    else:
+        path = file_path + "hbond.gnu"
+        print(f"   > Processing: {path}")
+        label_df = bond_labels(path)
+        count_df, frame_count = count_occurrences(path, label_df)
+        d = process_data(count_df, frame_count, name, substrate)
+        d.to_csv(file_path + "hbond.csv")
+
+    return d
+
+
+def occupancy_table(file_paths, names, substrate, workers=None):
+    """
+    Process many systems in parallel and merge them into one tidy occupancy table.
+
+    Names may repeat, e.g., wild-type replicates, and each repeat is a new replicate.
+
+    Parameters
+    ----------
+    file_paths: list[str]
+        Directories containing the hbond.gnu files
+    names: list[str]
+        The system name of each directory
+    substrate: str
+        The substrate residue name
+    workers: int
+        Number of systems processed at once
+
+    Returns
+    -------
+    data: list of dataframes
+        The per-system occupancies, in the order of file_paths
+    tidy: pd.DataFrame
+        One row per system, replicate and residue with its percent occupancy
+    """
+    jobs = [(file_path, name, substrate) for file_path, name in zip(file_paths, names)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        data = list(executor.map(process_system, jobs))
+
+    tables = []
+    replicates = {}
+    for d, name in zip(data, names):
+        replicates[name] = replicates.get(name, 0) + 1
+        table = d.reset_index().rename(columns={d.columns[0]: "occupancy"})
+        table.insert(0, "replicate", replicates[name])
+        table.insert(0, "system", name)
+        tables.append(table[["system", "replicate", "residue", "position", "occupancy"]])
+
+    return data, pd.concat(tables, ignore_index=True)
+
+
+def replicate_occupancy(tidy):
+    """
+    Average the occupancy of each residue over the replicates of every system.
+
+    A residue forming several hbond pairs keeps its highest occupancy,
+    and a residue missing from a replicate counts as zero occupancy in it.
+    Replicates are independent trajectories, so their spread gives the standard error.
+
+    Parameters
+    ----------
+    tidy: pd.DataFrame
+        The table from occupancy_table()
+
+    Returns
+    -------
+    stats: pd.DataFrame
+        One row per system and residue with the number of replicates,
+        the mean occupancy and its standard error (NaN for a single replicate)
+    """
+    best = tidy.groupby(["system", "replicate", "residue", "position"], sort=False)["occupancy"].max().reset_index()
+    tables = []
+    for system in dict.fromkeys(tidy["system"]):
+        replicates = best[best["system"] == system].pivot_table(
+            index=["residue", "position"], columns="replicate", values="occupancy", fill_value=0.0
+        )
+        # Replicates without any row for the system still count as zero occupancy
+        n_replicates = tidy.loc[tidy["system"] == system, "replicate"].nunique()
+        values = replicates.reindex(columns=range(1, n_replicates + 1), fill_value=0.0).to_numpy()
+        table = replicates.index.to_frame(index=False)
+        table.insert(0, "system", system)
+        table["replicates"] = n_replicates
+        table["mean"] = values.mean(axis=1)
+        table["sem"] = values.std(axis=1, ddof=1) / np.sqrt(n_replicates) if n_replicates > 1 else np.nan
+        tables.append(table)
+
+    return pd.concat(tables, ignore_index=True)
+
+
+def wide_occupancy(tidy, column="mean"):
+    """
+    Pivot a tidy occupancy table to one column per system.
+
+    Parameters
+    ----------
+    tidy: pd.DataFrame
+        The table from occupancy_table()
+    column: str
+        The statistic from replicate_occupancy(), "mean" or "sem"
+
+    Returns
+    -------
+    wide: pd.DataFrame
+        Occupancy of each residue in each system, indexed by residue and position
+    """
+    stats = replicate_occupancy(tidy)
+    systems = list(dict.fromkeys(tidy["system"]))
+    wide = stats.pivot_table(index=["residue", "position"], columns="system", values=column)
+
+    return wide.reindex(columns=systems)
+
+
+def analyze_hbonds(file_paths, names, substrate, lifetimes=False):
     """
     Driver for analyzing hbonds from hbond.gnu file
 
@@ -307,27 +459,27 @@ def analyze_hbonds(file_paths, names, substrate):
         A list of paths to hbond.gnu files
     names: list[str]
         A list of names of each hbond.gnu files
+    substrate: str
+        The substrate residue name
+    lifetimes: bool
+        Also write hbond lifetimes and sliding window occupancies for each file
     """
-    data = []
-    for file_path, name in zip(file_paths, names):
-        data_path = Path(file_path + "hbond.csv")
-        if data_path.is_file():
-            print(f"   > {data_path} already exists")
-            d = pd.read_csv(file_path + "hbond.csv")
-            d = d.set_index("residue")
-        else:
+    # All systems are parsed at once, plotting stays in this process
+    data, tidy = occupancy_table(file_paths, names, substrate)
+    tidy.to_csv(file_paths[0] + "hbond_occupancy_table.csv", index=False)
+    replicate_occupancy(tidy).to_csv(file_paths[0] + "hbond_occupancy_replicates.csv", index=False)
+    for file_path, d in zip(file_paths, data):
+        if lifetimes:
             path = file_path + "hbond.gnu"
-            print(f"   > Processing: {path}")
-            label_df = bond_labels(path)
-            count_df, frame_count = count_occurrences(path, label_df)
-            d = process_data(count_df, frame_count, name, substrate)
-            d.to_csv(file_path + "hbond.csv")
+            print(f"   > Computing lifetimes: {path}")
+            summary, series = pyqmmm.md.hbond_lifetimes.hbond_lifetimes(path, bond_labels(path))
+            summary.to_csv(file_path + "hbond_lifetimes.csv", index=False)
+            series.to_csv(file_path + "hbond_occupancy_series.csv")
         plot(d, file_path)
         print(f"   > Creating single plot")
-        data.append(d)
 
     if len(names) > 1:
-        plot_multi(data, file_paths[0])
+        plot_multi(tidy, file_paths[0])
         print(f"   > Creating multi plot")
 
 
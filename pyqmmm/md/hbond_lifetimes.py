@@ -0,0 +1,204 @@
+"""Hydrogen bond lifetimes and time-resolved occupancy from the per-frame bond matrix."""
+
+import numpy as np
+import pandas as pd
+import pyqmmm.md.hbond_matrix
+
+
+def run_lengths(presence):
+    """
+    Run-length encode the frames in which each group is present.
+
+    Parameters
+    ----------
+    presence: np.ndarray
+        A (frames, groups) boolean array
+
+    Returns
+    -------
+    groups: np.ndarray
+        Group of each run, runs are sorted by group then start
+    starts: np.ndarray
+        First frame of each run
+    lengths: np.ndarray
+        Number of frames in each run
+    """
+    frame_count, group_count = presence.shape
+    padded = np.zeros((group_count, frame_count + 2), dtype=np.int8)
+    padded[:, 1:-1] = presence.T
+    # A run starts where the series steps up and ends where it steps down
+    steps = np.diff(padded, axis=1)
+    groups, starts = np.nonzero(steps == 1)
+    _, ends = np.nonzero(steps == -1)
+
+    return groups, starts, ends - starts
+
+
+def fill_gaps(presence, tolerance):
+    """
+    Treat short breaks in a hydrogen bond as if the bond persisted.
+
+    Parameters
+    ----------
+    presence: np.ndarray
+        A (frames, groups) boolean array
+    tolerance: int
+        Longest break in frames that is bridged, breaks at the start or end are never bridged
+
+    Returns
+    -------
+    filled: np.ndarray
+        The (frames, groups) presence with the short breaks filled
+    """
+    if tolerance <= 0:
+        return presence
+    frame_count = presence.shape[0]
+    groups, starts, lengths = run_lengths(~presence)
+    bridged = (lengths <= tolerance) & (starts > 0) & (starts + lengths < frame_count)
+
+    # Mark the start and end of every bridged break, a cumulative sum fills between them
+    marks = np.zeros((frame_count + 1, presence.shape[1]), dtype=np.int64)
+    np.add.at(marks, (starts[bridged], groups[bridged]), 1)
+    np.add.at(marks, (starts[bridged] + lengths[bridged], groups[bridged]), -1)
+
+    return presence | (np.cumsum(marks, axis=0)[:-1] > 0)
+
+
+def lifetimes(presence, time_per_frame=1.0, tolerance=0):
+    """
+    Summarize how long each hydrogen bond lasts once it forms.
+
+    Parameters
+    ----------
+    presence: np.ndarray
+        A (frames, groups) boolean array
+    time_per_frame: float
+        Time between frames, lifetimes are reported in the same unit
+    tolerance: int
+        Longest break in frames that is bridged,
+        zero gives continuous lifetimes and larger values intermittent lifetimes
+
+    Returns
+    -------
+    summary: pd.DataFrame
+        Number of events and the mean and longest lifetime of each group
+    """
+    group_count = presence.shape[1]
+    groups, _, lengths = run_lengths(fill_gaps(presence, tolerance))
+    events = np.bincount(groups, minlength=group_count)
+    total = np.bincount(groups, weights=lengths, minlength=group_count)
+    longest = np.zeros(group_count)
+    np.maximum.at(longest, groups, lengths)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(events > 0, total / events, 0.0)
+    summary = pd.DataFrame(
+        {
+            "events": events,
+            "mean_lifetime": mean * time_per_frame,
+            "max_lifetime": longest * time_per_frame,
+        }
+    )
+
+    return summary
+
+
+def sliding_occupancy(presence, window):
+    """
+    Compute the percent occupancy of each group over a sliding window of frames.
+
+    Parameters
+    ----------
+    presence: np.ndarray
+        A (frames, groups) boolean array
+    window: int
+        Number of frames in each window
+
+    Returns
+    -------
+    occupancy: np.ndarray
+        A (frames - window + 1, groups) array of percent occupancies
+    """
+    window = min(window, presence.shape[0])
+    if window <= 0:
+        return np.zeros((0, presence.shape[1]))
+    totals = np.zeros((presence.shape[0] + 1, presence.shape[1]), dtype=np.int64)
+    np.cumsum(presence, axis=0, out=totals[1:])
+
+    return (totals[window:] - totals[:-window]) / window * 100
+
+
+def trajectory_blocks(presence, n_blocks=5):
+    """
+    Average the percent occupancy over consecutive blocks of a single trajectory.
+
+    Adjacent blocks of one trajectory are correlated, so their spread is only a
+    convergence check and not an error bar, see replicate_occupancy() in hbond_analyzer
+    for the standard error across independent replicates.
+
+    Parameters
+    ----------
+    presence: np.ndarray
+        A (frames, groups) boolean array
+    n_blocks: int
+        Number of blocks, trailing frames that do not fill a block are dropped
+
+    Returns
+    -------
+    summary: pd.DataFrame
+        Mean block occupancy and the standard deviation between blocks for each group
+    blocks: np.ndarray
+        A (n_blocks, groups) array of the occupancy in each block
+    """
+    block_size = presence.shape[0] // n_blocks
+    if block_size == 0:
+        raise ValueError(f"Cannot split {presence.shape[0]} frames into {n_blocks} blocks.")
+    trimmed = presence[: block_size * n_blocks]
+    blocks = trimmed.reshape(n_blocks, block_size, -1).mean(axis=1) * 100
+    spread = blocks.std(axis=0, ddof=1) if n_blocks > 1 else np.zeros(blocks.shape[1])
+    summary = pd.DataFrame({"block_mean": blocks.mean(axis=0), "block_std": spread})
+
+    return summary, blocks
+
+
+def hbond_lifetimes(file_path, labels, time_per_frame=1.0, tolerance=2, window=100, n_blocks=5):
+    """
+    Run the lifetime and time-resolved occupancy analyses on one hbond.gnu file.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to hbond.gnu file
+    labels: pd.DataFrame
+        Residue pairs and hbond indices from hbond_analyzer.bond_labels()
+    time_per_frame: float
+        Time between frames
+    tolerance: int
+        Longest break in frames bridged for the intermittent lifetimes
+    window: int
+        Number of frames in each sliding occupancy window
+    n_blocks: int
+        Number of consecutive blocks used to check convergence
+
+    Returns
+    -------
+    summary: pd.DataFrame
+        Lifetimes and the occupancy of consecutive blocks of each residue pair
+    series: pd.DataFrame
+        Sliding window occupancy of each residue pair, one row per window start
+    """
+    groups = labels["index"].tolist()
+    packed, n_hbonds = pyqmmm.md.hbond_matrix.read_hbond_matrix(file_path)
+    presence = pyqmmm.md.hbond_matrix.group_presence(packed, n_hbonds, groups)
+    pairs = labels["acceptor"] + "-" + labels["donor"]
+
+    continuous = lifetimes(presence, time_per_frame).add_prefix("continuous_")
+    intermittent = lifetimes(presence, time_per_frame, tolerance).add_prefix("intermittent_")
+    summary = pd.concat([labels[["acceptor", "donor"]].reset_index(drop=True), continuous, intermittent], axis=1)
+    if presence.shape[0] >= n_blocks:
+        summary = pd.concat([summary, trajectory_blocks(presence, n_blocks)[0]], axis=1)
+
+    series = pd.DataFrame(sliding_occupancy(presence, window), columns=pairs.tolist())
+    series.index.name = "frame"
+
+    return summary, series
@@ -0,0 +1,437 @@
+"""Packed boolean (frames, hbonds) matrix built from a cpptraj hbond.gnu series."""
+
+import numpy as np
+
+CHUNK_BYTES = 1 << 24  # Bytes of the hbond.gnu series parsed at a time
+FRAME_CHUNK = 100000  # Frames unpacked at a time when reducing the matrix
+
+
+def find_data_start(file_path):
+    """
+    Find where the data rows of a hbond.gnu file start.
+
+    The gnuplot header (set, unset and splot commands) is skipped
+    by looking for the first line that starts with a number.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to hbond.gnu file
+
+    Returns
+    -------
+    offset: int
+        Byte offset of the first data row
+    """
+    with open(file_path, "rb") as f:
+        offset = 0
+        for line in f:
+            tokens = line.split()
+            if tokens:
+                try:
+                    float(tokens[0])
+                    return offset
+                except ValueError:
+                    pass
+            offset += len(line)
+
+    return offset
+
+
+def parse_block(block, frame_base):
+    """
+    Convert a block of complete data rows into integer arrays.
+
+    Parameters
+    ----------
+    block: bytes
+        Data rows ending with a newline, frames separated by blank lines
+    frame_base: int
+        Zero-based frame of the first row in the block
+
+    Returns
+    -------
+    frames: np.ndarray
+        Zero-based frame of each present hbond
+    bonds: np.ndarray
+        Index of each present hbond
+    blank_count: int
+        Number of blank lines, i.e., frame breaks, in the block
+    """
+    # Line lengths come from the newline positions, a length of one is a blank line
+    newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+    blank = np.diff(newlines, prepend=-1) == 1
+    line_frames = frame_base + np.cumsum(blank)[~blank]
+
+    tokens = block.split()
+    if len(tokens) == 3 * len(line_frames):
+        # NumPy converts every number in the block in a single call
+        rows = np.array(tokens, dtype=np.float64).reshape(-1, 3).astype(np.int64)
+    else:
+        # Some rows have extra or missing fields, so split them one by one
+        rows = np.array([parse_row(line) for line in block.split(b"\n") if line], dtype=np.int64).reshape(-1, 3)
+    present = rows[:, 2] == 1
+
+    return line_frames[present], rows[present, 1], int(blank.sum())
+
+
+def parse_row(line):
+    """
+    Read the frame, hbond index and presence flag from one data row.
+
+    As in the original line parser, the presence flag is the last field,
+    so rows with extra columns are still read.
+
+    Parameters
+    ----------
+    line: bytes
+        A data row of a hbond.gnu file
+
+    Returns
+    -------
+    row: list
+        The frame, hbond index and presence flag
+    """
+    fields = line.split()
+    if len(fields) < 3:
+        raise ValueError(f"Expected at least 3 fields in the hbond.gnu row {line.decode(errors='replace')!r}")
+
+    return [int(float(fields[0])), int(float(fields[1])), int(float(fields[-1]))]
+
+
+def iter_series_chunks(file_path, chunk_bytes=CHUNK_BYTES):
+    """
+    Stream the present hbonds of a hbond.gnu file a block of frames at a time.
+
+    Only complete frames are yielded, rows of a frame that continues
+    into the next block are held back, so peak memory is bounded by chunk_bytes.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to hbond.gnu file
+    chunk_bytes: int
+        Number of bytes read at a time
+
+    Yields
+    ------
+    start: int
+        First frame in the chunk
+    stop: int
+        One past the last frame in the chunk
+    frames: np.ndarray
+        Zero-based frame of each present hbond
+    bonds: np.ndarray
+        Index of each present hbond
+    """
+    frame_base = 0
+    held_frames = np.empty(0, dtype=np.int64)
+    held_bonds = np.empty(0, dtype=np.int64)
+    seen_data = False
+    carry = b""
+    with open(file_path, "rb") as f:
+        f.seek(find_data_start(file_path))
+        finished = False
+        while not finished:
+            data = f.read(chunk_bytes)
+            block = carry + data
+            if not data:
+                finished = True
+                if block and not block.endswith(b"\n"):
+                    block += b"\n"
+            end = block.find(b"\nend") + 1 if not block.startswith(b"end") else 0
+            if block.startswith(b"end") or end > 0:
+                # Everything after the end marker is ignored
+                block = block[:end]
+                finished = True
+            cut = block.rfind(b"\n") + 1
+            block, carry = block[:cut], block[cut:]
+            if not block:
+                continue
+
+            seen_data = seen_data or bool(block.strip())
+            frames, bonds, blank_count = parse_block(block, frame_base)
+            frames = np.concatenate([held_frames, frames])
+            bonds = np.concatenate([held_bonds, bonds])
+            stop = frame_base + blank_count
+            # The frame after the last blank line may continue in the next block
+            complete = frames < stop
+            if stop > frame_base:
+                yield frame_base, stop, frames[complete], bonds[complete]
+            held_frames, held_bonds = frames[~complete], bonds[~complete]
+            frame_base = stop
+
+    if seen_data:
+        yield frame_base, frame_base + 1, held_frames, held_bonds
+
+
+def read_present_bonds(file_path, chunk_bytes=CHUNK_BYTES):
+    """
+    Read which hydrogen bonds are present in each frame of a hbond.gnu file.
+
+    Frames are separated by blank lines and each data row holds
+    the frame, the hbond index and whether the hbond is present.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to hbond.gnu file
+    chunk_bytes: int
+        Number of bytes read at a time
+
+    Returns
+    -------
+    frames: np.ndarray
+        Zero-based frame of each present hbond
+    bonds: np.ndarray
+        Index of each present hbond, as used in the ytics labels
+    frame_count: int
+        Total number of frames in the trajectory
+    """
+    frame_list = [np.empty(0, dtype=np.int64)]
+    bond_list = [np.empty(0, dtype=np.int64)]
+    frame_count = 0
+    for start, stop, frames, bonds in iter_series_chunks(file_path, chunk_bytes):
+        frame_list.append(frames)
+        bond_list.append(bonds)
+        frame_count = stop
+
+    return np.concatenate(frame_list), np.concatenate(bond_list), frame_count
+
+
+def iter_partial_counts(file_path, groups, n_hbonds=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Stream running group occupancy counts through a hbond.gnu file.
+
+    The full matrix is never built, so files larger than memory can be counted.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to hbond.gnu file
+    groups: list
+        Sets of hbond indices, one per group
+    n_hbonds: int
+        Number of hbond columns, one past the largest grouped index if not given
+    chunk_bytes: int
+        Number of bytes read at a time
+
+    Yields
+    ------
+    counts: np.ndarray
+        Number of frames read so far with each group present
+    frame_count: int
+        Number of frames read so far
+    """
+    if n_hbonds is None:
+        n_hbonds = max((max(group) for group in groups if group), default=-1) + 1
+    counts = np.zeros(len(groups), dtype=np.int64)
+    for start, stop, frames, bonds in iter_series_chunks(file_path, chunk_bytes):
+        keep = bonds < n_hbonds
+        packed, _ = pack_matrix(frames[keep] - start, bonds[keep], stop - start, n_hbonds)
+        counts += group_counts(packed, n_hbonds, groups)
+        yield counts.copy(), stop
+
+
+def final_counts(file_path, groups, n_hbonds=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Count the frames in which each group is present over a whole hbond.gnu file.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to hbond.gnu file
+    groups: list
+        Sets of hbond indices, one per group
+    n_hbonds: int
+        Number of hbond columns, one past the largest grouped index if not given
+    chunk_bytes: int
+        Number of bytes read at a time
+
+    Returns
+    -------
+    counts: np.ndarray
+        Number of frames with each group present
+    frame_count: int
+        Total number of frames in the trajectory
+    """
+    counts = np.zeros(len(groups), dtype=np.int64)
+    frame_count = 0
+    for counts, frame_count in iter_partial_counts(file_path, groups, n_hbonds, chunk_bytes):
+        pass
+
+    return counts, frame_count
+
+
+def pack_matrix(frames, bonds, frame_count, n_hbonds=None):
+    """
+    Pack present hbonds into a bit matrix with one row per frame.
+
+    Parameters
+    ----------
+    frames: np.ndarray
+        Zero-based frame of each present hbond
+    bonds: np.ndarray
+        Index of each present hbond
+    frame_count: int
+        Total number of frames in the trajectory
+    n_hbonds: int
+        Number of hbond columns, one past the largest index if not given
+
+    Returns
+    -------
+    packed: np.ndarray
+        A (frame_count, ceil(n_hbonds / 8)) uint8 array of packed bits
+    n_hbonds: int
+        Number of hbond columns in the matrix
+    """
+    if n_hbonds is None:
+        n_hbonds = int(bonds.max()) + 1 if len(bonds) else 0
+    matrix = np.zeros((frame_count, n_hbonds), dtype=bool)
+    matrix[frames, bonds] = True
+
+    return np.packbits(matrix, axis=1), n_hbonds
+
+
+def read_hbond_matrix(file_path, n_hbonds=None):
+    """
+    Read a hbond.gnu file into a packed boolean (frames, hbonds) matrix.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to hbond.gnu file
+    n_hbonds: int
+        Number of hbond columns, one past the largest present index if not given
+
+    Returns
+    -------
+    packed: np.ndarray
+        A (frames, ceil(n_hbonds / 8)) uint8 array of packed bits
+    n_hbonds: int
+        Number of hbond columns in the matrix
+    """
+    if n_hbonds is None:
+        n_hbonds = 0
+        for _, _, _, bonds in iter_series_chunks(file_path):
+            n_hbonds = max(n_hbonds, int(bonds.max()) + 1 if len(bonds) else 0)
+
+    # Each block of frames is packed as soon as it is read
+    packed_blocks = [np.zeros((0, (n_hbonds + 7) // 8), dtype=np.uint8)]
+    for start, stop, frames, bonds in iter_series_chunks(file_path):
+        keep = bonds < n_hbonds
+        packed_blocks.append(pack_matrix(frames[keep] - start, bonds[keep], stop - start, n_hbonds)[0])
+
+    return np.concatenate(packed_blocks), n_hbonds
+
+
+def group_columns(groups, n_hbonds):
+    """
+    Order the hbond columns so every group is a contiguous run.
+
+    Parameters
+    ----------
+    groups: list
+        Sets of hbond indices, one per group
+    n_hbonds: int
+        Number of hbond columns in the matrix
+
+    Returns
+    -------
+    columns: np.ndarray
+        The hbond columns of all groups, group after group
+    starts: np.ndarray
+        Where each group starts in columns
+    valid: np.ndarray
+        Which groups have at least one column in the matrix
+    """
+    columns = []
+    starts = []
+    valid = []
+    for group in groups:
+        group_cols = sorted(index for index in group if 0 <= index < n_hbonds)
+        valid.append(bool(group_cols))
+        if group_cols:
+            starts.append(len(columns))
+            columns.extend(group_cols)
+
+    return np.array(columns, dtype=np.int64), np.array(starts, dtype=np.int64), np.array(valid, dtype=bool)
+
+
+def iter_group_presence(packed, n_hbonds, groups, chunk_size=FRAME_CHUNK):
+    """
+    Find which groups have at least one hbond present, a block of frames at a time.
+
+    Parameters
+    ----------
+    packed: np.ndarray
+        The packed (frames, hbonds) matrix
+    n_hbonds: int
+        Number of hbond columns in the matrix
+    groups: list
+        Sets of hbond indices, one per group
+    chunk_size: int
+        Number of frames unpacked at a time
+
+    Yields
+    ------
+    presence: np.ndarray
+        A (chunk frames, groups) boolean array
+    """
+    columns, starts, valid = group_columns(groups, n_hbonds)
+    for start in range(0, packed.shape[0], chunk_size):
+        block = np.unpackbits(packed[start : start + chunk_size], axis=1, count=n_hbonds).astype(bool)
+        presence = np.zeros((block.shape[0], len(valid)), dtype=bool)
+        if len(columns):
+            # Each group is a contiguous run of columns, so one reduceat handles all groups
+            presence[:, valid] = np.logical_or.reduceat(block[:, columns], starts, axis=1)
+        yield presence
+
+
+def group_presence(packed, n_hbonds, groups):
+    """
+    Find which groups have at least one hbond present in each frame.
+
+    Parameters
+    ----------
+    packed: np.ndarray
+        The packed (frames, hbonds) matrix
+    n_hbonds: int
+        Number of hbond columns in the matrix
+    groups: list
+        Sets of hbond indices, one per group
+
+    Returns
+    -------
+    presence: np.ndarray
+        A (frames, groups) boolean array
+    """
+    blocks = list(iter_group_presence(packed, n_hbonds, groups))
+    if not blocks:
+        return np.zeros((0, len(groups)), dtype=bool)
+    return np.concatenate(blocks)
+
+
+def group_counts(packed, n_hbonds, groups):
+    """
+    Count the frames in which each group has at least one hbond.
+
+    Parameters
+    ----------
+    packed: np.ndarray
+        The packed (frames, hbonds) matrix
+    n_hbonds: int
+        Number of hbond columns in the matrix
+    groups: list
+        Sets of hbond indices, one per group
+
+    Returns
+    -------
+    counts: np.ndarray
+        Number of frames with each group present
+    """
+    counts = np.zeros(len(groups), dtype=np.int64)
+    for presence in iter_group_presence(packed, n_hbonds, groups):
+        counts += presence.sum(axis=0)
+
+    return counts
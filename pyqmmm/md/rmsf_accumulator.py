@@ -0,0 +1,41 @@
+"""Single-pass per-atom RMSF of aligned coordinates, kept free of MDAnalysis."""
+
+import numpy as np
+
+
+def accumulate_rmsf(frames):
+    """
+    Compute the per-atom RMSF from aligned frames in a single pass.
+
+    A running mean and sum of squared deviations are updated as each frame
+    arrives (Welford), so the frames never have to be held in memory at once.
+
+    Parameters
+    ----------
+    frames : iterable of numpy.ndarray
+        The aligned (n_atoms, 3) coordinates of each frame.
+
+    Returns
+    -------
+    rmsf_values : numpy.ndarray
+        The RMSF of each atom.
+
+    """
+    n_frames = 0
+    mean = None
+    sum_squares = None
+    for frame in frames:
+        frame = np.asarray(frame, dtype=np.float64)
+        if mean is None:
+            mean = np.zeros_like(frame)
+            sum_squares = np.zeros_like(frame)
+
+        n_frames += 1
+        delta = frame - mean
+        mean += delta / n_frames
+        sum_squares += delta * (frame - mean)
+
+    if n_frames == 0:
+        raise ValueError("The trajectory has no frames.")
+
+    return np.sqrt(sum_squares.sum(axis=1) / n_frames)
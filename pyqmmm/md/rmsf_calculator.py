@@ -4,6 +4,7 @@ import MDAnalysis as mda
 from MDAnalysis.analysis import align, rms
 import numpy as np
 import pandas as pd
+import pyqmmm.md.rmsf_accumulator
 import time
 import os
 from pathlib import Path
@@ -12,7 +13,47 @@ import warnings
 # Ignore MDAnalysis UserWarnings
 warnings.filterwarnings('ignore', category=UserWarning, module='MDAnalysis')
 
-def calculate_rmsf_per_trajectory(topology, trajectory, reference, count):
+def streaming_rmsf(u, reference, select="all"):
+    """
+    Calculate the per-atom RMSF in a single pass over the trajectory.
+
+    Each frame is superimposed onto the reference as it is read,
+    and the RMSF is accumulated with rmsf_accumulator.accumulate_rmsf(),
+    so the aligned trajectory is never held in memory.
+    The fit matches AlignTraj with unweighted centers and
+    the result matches rms.RMSF on the aligned trajectory.
+
+    Parameters
+    ----------
+    u : MDAnalysis.core.universe.Universe
+        The trajectory to analyze.
+    reference : MDAnalysis.core.universe.Universe
+        The reference structure to which each frame is aligned.
+    select : str
+        Atom selection used for the fit and the RMSF.
+
+    Returns
+    -------
+    rmsf_values : numpy.ndarray
+        The RMSF of each selected atom.
+
+    """
+    mobile_atoms = u.select_atoms(select)
+    ref_atoms = reference.select_atoms(select)
+    ref_com = ref_atoms.center(None)
+    ref_coordinates = (ref_atoms.positions - ref_com).astype(np.float64)
+
+    def aligned_frames():
+        for _ in u.trajectory:
+            mobile_coordinates = mobile_atoms.positions.astype(np.float64)
+            mobile_coordinates -= mobile_coordinates.mean(axis=0)
+            R, _ = align.rotation_matrix(mobile_coordinates, ref_coordinates)
+            # Same transform as AlignTraj, applied to a copy instead of the timestep
+            yield mobile_coordinates @ np.asarray(R).T + ref_com
+
+    return pyqmmm.md.rmsf_accumulator.accumulate_rmsf(aligned_frames())
+
+def calculate_rmsf_per_trajectory(topology, trajectory, reference, count, streaming=False):
     """
     Calculate the RMSF per trajectory.
 
@@ -30,6 +71,9 @@ def calculate_rmsf_per_trajectory(topology, trajectory, reference, count):
         The reference structure to which the trajectory is aligned.
     count : int
         The index of the trajectory, used for naming in the resulting DataFrame.
+    streaming : bool
+        Align and accumulate the RMSF one frame at a time in a single pass.
+        Otherwise the aligned trajectory is loaded into memory first.
 
     Returns
     -------
@@ -40,14 +84,18 @@ def calculate_rmsf_per_trajectory(topology, trajectory, reference, count):
     print(f"   > Reading: {trajectory}")
     u = mda.Universe(topology, trajectory, dt=0.2, format="TRJ")
 
-    # Use 'all' to select all atoms
-    aligner = align.AlignTraj(u, reference, select="all", in_memory=True)
-    # Perform trajectory alignment
-    aligner.run()
+    if streaming:
+        print(f"   > Aligning and computing the RMSF: {trajectory}")
+        rmsf_values = streaming_rmsf(u, reference, select="all")
+    else:
+        # Use 'all' to select all atoms
+        aligner = align.AlignTraj(u, reference, select="all", in_memory=True)
+        # Perform trajectory alignment
+        aligner.run()
 
-    print(f"   > Computing the RMSF: {trajectory}")
-    R = rms.RMSF(u.select_atoms("all")).run()
-    rmsf_values = R.results.rmsf
+        print(f"   > Computing the RMSF: {trajectory}")
+        R = rms.RMSF(u.select_atoms("all")).run()
+        rmsf_values = R.results.rmsf
 
     # Calculate average RMSF per residue and store residue info
     rmsf_residues = []
@@ -76,7 +124,7 @@ def calculate_rmsf_per_trajectory(topology, trajectory, reference, count):
 
     return df
 
-def calculate_rmsf(topology, trajectories, reference_file=None):
+def calculate_rmsf(topology, trajectories, reference_file=None, streaming=False):
     """
     Calculate the RMSF with MDAnalysis.
 
@@ -88,6 +136,9 @@ def calculate_rmsf(topology, trajectories, reference_file=None):
     ----------
     reference_file : str
         The path to a PDB file that you would like to use as a reference.
+    streaming : bool
+        Compute the RMSF in a single pass without loading the aligned trajectories into memory.
+        Off by default; the in-memory path stays the reference result.
 
     """
     # Greet the user
@@ -106,12 +157,12 @@ def calculate_rmsf(topology, trajectories, reference_file=None):
         reference = mda.Universe(reference_file)
     # Otherwise use the first frame of the first trajectory as reference
     else:
-        mda.Universe(topology, trajectories[0], dt=0.2, format="TRJ")
+        reference = mda.Universe(topology, trajectories[0], dt=0.2, format="TRJ")
     
     # Iterate over trajectories
     rmsf_residue_df = pd.DataFrame()
     for count, trajectory in enumerate(trajectories):
-        df = calculate_rmsf_per_trajectory(topology, trajectory, reference, count)
+        df = calculate_rmsf_per_trajectory(topology, trajectory, reference, count, streaming)
 
         # Concatenate current trajectory DataFrame with the total DataFrame
         if rmsf_residue_df.empty:
@@ -1,10 +1,19 @@
 """Calculates the bond valence for coordinating atoms across a reaction"""
 
+import os
 import glob
 import time
+import hashlib
 import subprocess
 import pandas as pd
+import scipy.sparse
 import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
+
+CACHE_DIR = ".bond_valence_cache"
+
+# Menu input sent to Multiwfn for each analysis
+ANALYSES = {"mayer": ["9", "1", "n", "0", "q"]}
 
 def format_plot() -> None:
     """
@@ -26,7 +35,298 @@ def format_plot() -> None:
     plt.rcParams["ytick.right"] = True
     plt.rcParams["svg.fonttype"] = "none"
 
-def calculate_bond_valence(atom_pairs, threads):
+def file_hash(file_name):
+    """
+    Hash the contents of a wavefunction file.
+
+    Parameters
+    ----------
+    file_name : str
+        The name of the wavefunction file.
+
+    Returns
+    -------
+    str
+        The SHA-256 hex digest of the file.
+
+    """
+    digest = hashlib.sha256()
+    with open(file_name, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def cache_path(wfn, analysis="mayer", cache_dir=CACHE_DIR):
+    """
+    Get the cache file for an analysis of a wavefunction.
+
+    Parameters
+    ----------
+    wfn : str
+        The name of the wavefunction file.
+    analysis : str
+        The Multiwfn analysis, a key of ANALYSES.
+    cache_dir : str
+        The directory holding the cached results.
+
+    Returns
+    -------
+    str
+        The cache file, named by the wavefunction hash and the analysis.
+
+    """
+    return os.path.join(cache_dir, f"{file_hash(wfn)}_{analysis}_csr.npz")
+
+
+def split_threads(threads, jobs):
+    """
+    Split the available threads between concurrent Multiwfn jobs.
+
+    Parameters
+    ----------
+    threads : int
+        The total number of threads available.
+    jobs : int
+        The number of Multiwfn jobs to run at once.
+
+    Returns
+    -------
+    jobs : int
+        The number of concurrent jobs.
+    job_threads : int
+        The number of threads passed to each Multiwfn job with -nt.
+
+    """
+    jobs = max(1, min(jobs, threads))
+
+    return jobs, max(1, threads // jobs)
+
+
+def parse_bond_orders(lines):
+    """
+    Stream the Mayer bond order table out of Multiwfn output.
+
+    Parameters
+    ----------
+    lines : iterable
+        Lines of Multiwfn output, e.g., an open stdout pipe.
+
+    Returns
+    -------
+    bond_orders : scipy.sparse.csr_matrix
+        A symmetric matrix where entry [i - 1, j - 1] is the total bond order between atoms i and j.
+
+    """
+    rows, cols, orders = [], [], []
+    start_processing = False
+    for line in lines:
+        if "Bond orders with absolute value" in line:
+            start_processing = True
+            continue
+
+        if "Note: The \"Total\" bond orders shown above" in line:
+            break
+
+        if start_processing and "Alpha:" in line and "Total:" in line:
+            parts = line.split("(")
+            rows.append(int(parts[0].split()[-1]) - 1)
+            cols.append(int(parts[1].split()[-1]) - 1)
+            orders.append(float(parts[2].split()[-1]))
+
+    size = max(rows + cols, default=-1) + 1
+    upper = scipy.sparse.coo_matrix((orders, (rows, cols)), shape=(size, size))
+
+    return (upper + upper.T).tocsr()
+
+
+def run_multiwfn(wfn, analysis="mayer", threads=1):
+    """
+    Run a Multiwfn analysis on a single wavefunction and parse its output as it is written.
+
+    A RuntimeError is raised if Multiwfn exits with an error or prints no bond orders,
+    so a failed run is never mistaken for a molecule without bonds.
+
+    Parameters
+    ----------
+    wfn : str
+        The name of the wavefunction file.
+    analysis : str
+        The Multiwfn analysis, a key of ANALYSES.
+    threads : int
+        The number of threads passed to Multiwfn with -nt.
+
+    Returns
+    -------
+    bond_orders : scipy.sparse.csr_matrix
+        The full bond order matrix of the wavefunction.
+
+    """
+    command = f"Multiwfn {wfn} -nt {threads}"
+    print(f"      > Executing command: {command}")
+    proc = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        shell=True,
+        universal_newlines=True,
+    )
+    proc.stdin.write("\n".join(ANALYSES[analysis]))
+    proc.stdin.close()
+    bond_orders = parse_bond_orders(proc.stdout)
+
+    # Drain the rest of the output so Multiwfn can exit
+    for _ in proc.stdout:
+        pass
+    proc.stdout.close()
+    return_code = proc.wait()
+    if return_code != 0:
+        raise RuntimeError(f"   > {command} failed with exit code {return_code}.")
+    if bond_orders.nnz == 0:
+        raise RuntimeError(f"   > {command} did not print a bond order table.")
+
+    return bond_orders
+
+
+def get_bond_orders(wfn, analysis="mayer", threads=1, cache_dir=CACHE_DIR):
+    """
+    Get the bond orders of a wavefunction, running Multiwfn only if they are not cached.
+
+    Parameters
+    ----------
+    wfn : str
+        The name of the wavefunction file.
+    analysis : str
+        The Multiwfn analysis, a key of ANALYSES.
+    threads : int
+        The number of threads passed to Multiwfn with -nt.
+    cache_dir : str
+        The directory holding the cached results.
+
+    Returns
+    -------
+    bond_orders : scipy.sparse.csr_matrix
+        The full bond order matrix of the wavefunction.
+
+    """
+    cache_file = cache_path(wfn, analysis, cache_dir)
+    if os.path.exists(cache_file):
+        bond_orders = scipy.sparse.load_npz(cache_file).tocsr()
+        # Empty results were written by failed runs of older versions, so run them again
+        if bond_orders.nnz:
+            return bond_orders
+
+    # Only a successful run reaches the cache, run_multiwfn raises on failure
+    bond_orders = run_multiwfn(wfn, analysis, threads)
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_file = f"{cache_file}.{os.getpid()}.tmp.npz"
+    try:
+        scipy.sparse.save_npz(temp_file, bond_orders)
+        os.replace(temp_file, cache_file)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+    return bond_orders
+
+
+def get_bond_order(bond_orders, atom1, atom2):
+    """
+    Look up the bond order between two atoms.
+
+    Parameters
+    ----------
+    bond_orders : scipy.sparse.csr_matrix
+        The full bond order matrix of a wavefunction.
+    atom1 : int
+        The one-based index of the first atom.
+    atom2 : int
+        The one-based index of the second atom.
+
+    Returns
+    -------
+    float
+        The bond order, zero if Multiwfn did not report the pair.
+
+    """
+    if max(atom1, atom2) > bond_orders.shape[0]:
+        return 0.0
+
+    return float(bond_orders[atom1 - 1, atom2 - 1])
+
+
+def get_coordination_sphere(bond_orders, atom, threshold=0.05):
+    """
+    Find every atom bonded to an atom.
+
+    Parameters
+    ----------
+    bond_orders : scipy.sparse.csr_matrix
+        The full bond order matrix of a wavefunction.
+    atom : int
+        The one-based index of the central atom.
+    threshold : float
+        The smallest bond order counted as a bond.
+
+    Returns
+    -------
+    sphere : dict
+        Bond orders keyed by the one-based index of each bonded atom.
+
+    """
+    if atom > bond_orders.shape[0]:
+        return {}
+    row = bond_orders.getrow(atom - 1)
+    sphere = {
+        int(neighbor) + 1: float(order)
+        for neighbor, order in zip(row.indices, row.data)
+        if abs(order) >= threshold
+    }
+
+    return sphere
+
+
+def run_bond_orders(wfn_files, threads=4, jobs=1, analysis="mayer", cache_dir=CACHE_DIR):
+    """
+    Get the bond orders of several wavefunctions with concurrent Multiwfn jobs.
+
+    Parameters
+    ----------
+    wfn_files : list
+        The names of the wavefunction files.
+    threads : int
+        The total number of threads to use.
+    jobs : int
+        The number of Multiwfn jobs to run at once.
+    analysis : str
+        The Multiwfn analysis, a key of ANALYSES.
+    cache_dir : str
+        The directory holding the cached results.
+
+    Returns
+    -------
+    list
+        The bond order matrix of each wavefunction, in the order of wfn_files.
+        A RuntimeError listing every failed wavefunction is raised if any job fails.
+
+    """
+    jobs, job_threads = split_threads(threads, jobs)
+    print(f"   > Running {jobs} Multiwfn job(s) with {job_threads} thread(s) each")
+    # Each job waits on its own Multiwfn process, so threads are enough to run them in parallel
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(get_bond_orders, wfn, analysis, job_threads, cache_dir) for wfn in wfn_files]
+
+    # Every job has finished, so the successful ones are cached before any failure is raised
+    failures = [(wfn, future.exception()) for wfn, future in zip(wfn_files, futures) if future.exception()]
+    if failures:
+        failed_files = ", ".join(wfn for wfn, _ in failures)
+        raise RuntimeError(f"   > Multiwfn failed for {failed_files}") from failures[0][1]
+
+    return [future.result() for future in futures]
+
+
+def calculate_bond_valence(atom_pairs, threads, jobs=1):
     start_time = time.time()
 
     # Get all wave function files
@@ -39,46 +339,21 @@ def calculate_bond_valence(atom_pairs, threads):
 
     # Define the columns based on atom pairs
     columns = ['Step'] + [f'{pair[0]}-{pair[1]}' for pair in atom_pairs]
+    results = run_bond_orders(wfn_files, threads, jobs)
 
     # Open the CSV file
     with open("bond_valence.csv", "w") as csv_file:
         # Write the header
         csv_file.write(','.join(columns) + '\n')
 
-        for wfn in wfn_files:
+        for wfn, bond_orders in zip(wfn_files, results):
             step_name = wfn.split('.')[0]
-            command = f"Multiwfn {wfn} -nt {threads}"
-
-            print(f"   > Processing {step_name}")
-            print(f"      > Executing command: {command}")
-
-            proc = subprocess.Popen(
-                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, shell=True
-            )
-
-            commands = ["9", "1", "n", "0", "q"]
-            output = proc.communicate("\n".join(commands).encode())
-
-            lines = str(output[0]).split("\\n")
             step_data = {'Step': step_name}
-            start_processing = False
-
-            for line in lines:
-                if "Bond orders with absolute value" in line:
-                    start_processing = True
-                    continue
-
-                if "Note: The \"Total\" bond orders shown above" in line:
-                    break
-
-                if start_processing and "Alpha:" in line and "Total:" in line:
-                    parts = line.split("(")
-                    atom1 = int(parts[0].split()[-1])
-                    atom2 = int(parts[1].split()[-1])
-                    bond_order = float(parts[2].split()[-1])
-                    if (atom1, atom2) in atom_pairs or (atom2, atom1) in atom_pairs:
-                        step_data[f"{atom1}-{atom2}"] = bond_order
-            
+            for atom1, atom2 in atom_pairs:
+                bond_order = get_bond_order(bond_orders, atom1, atom2)
+                if bond_order:
+                    step_data[f"{atom1}-{atom2}"] = bond_order
+
             # Create step_data as a list with the same order as columns
             step_data_list = [step_data.get(col, '') for col in columns]
 
@@ -124,5 +399,6 @@ if __name__ == "__main__":
     except FileNotFoundError:
         print("   > CSV file not found. Running Multiwfn analysis.")
         atom_pairs = [(145, 146), (65, 145), (66, 145), (12, 145), (32, 145), (145, 149)]
-        calculate_bond_valence(atom_pairs, 4)
+        jobs = input("   > How many Multiwfn jobs should run at once (default 1)? ")
+        calculate_bond_valence(atom_pairs, 4, int(jobs) if jobs else 1)
         plot_bond_valence()
\ No newline at end of file
@@ -1,7 +1,12 @@
 """Extract charge and spin data for a given subset of atoms for graphing."""
 
+import os
 import glob
+import functools
+import numpy as np
+import pandas as pd
 
+STORE_PATTERN = "scan_properties*.npz"  # Written by pes_organizer
 
 def get_files(file_pattern):
     """
@@ -25,6 +30,26 @@ def get_files(file_pattern):
     return file_list
 
 
+def get_property_files(key):
+    """
+    Find the files in the current directory that hold a property.
+
+    Parameters
+    ----------
+    key : str
+        The property, "charges" or "spins".
+
+    Returns
+    -------
+    files : list
+        The .charge or .spin text files followed by the scan_properties .npz files holding the property.
+    """
+    text_pattern = {"charges": "*.charge", "spins": "*.spin"}[key]
+    stores = [file for file in get_files(STORE_PATTERN) if key in load_store(file)]
+
+    return get_files(text_pattern) + stores
+
+
 def get_selection(file):
     """
     Get the user's atom set.
@@ -61,6 +86,264 @@ def get_atoms():
     return atoms
 
 
+def load_property_table(file, column):
+    """
+    Load a .spin or .charge scan file into a (steps, atoms) array.
+
+    Parameters
+    ----------
+    file : str
+        The name of the .spin or .charge file.
+    column : int
+        The column holding the value, 9 for spins and 2 for charges.
+
+    Returns
+    -------
+    values : numpy.ndarray
+        A (scan steps, atoms) array of the values in the file.
+    """
+    steps = []
+    step = []
+    with open(file, "r") as scan_file:
+        for line in scan_file:
+            line_list = line.split()
+            if not line_list:
+                continue
+            if line_list[0] == "End":
+                steps.append(step)
+                step = []
+            elif line_list[0].isdigit() and len(line_list) > column:
+                step.append(line_list[column])
+    if step:
+        steps.append(step)
+
+    return np.array(steps, dtype=np.float64)
+
+
+@functools.lru_cache(maxsize=None)
+def read_store(file, mtime_ns, size):
+    """
+    Parse every property in a scan file, cached on the file's modification time and size.
+
+    Parameters
+    ----------
+    file : str
+        A .spin or .charge file, or a scan_properties .npz written by pes_organizer.
+    mtime_ns : int
+        The modification time of the file, a rewritten file is parsed again.
+    size : int
+        The size of the file in bytes.
+
+    Returns
+    -------
+    store : dict
+        Arrays keyed by property, "spins" and/or "charges".
+    """
+    if file.endswith(".npz"):
+        with np.load(file) as saved:
+            return {key: saved[key] for key in ("charges", "spins") if key in saved}
+    if file.endswith(".spin"):
+        return {"spins": load_property_table(file, 9)}
+    if file.endswith(".charge"):
+        return {"charges": load_property_table(file, 2)}
+    raise ValueError(f"Unsupported charge or spin file: {file}")
+
+
+def load_store(file):
+    """
+    Load every property in a scan file as (steps, atoms) arrays.
+
+    Each file is only parsed once per session and shared by all later sums,
+    unless it is rewritten in the meantime.
+
+    Parameters
+    ----------
+    file : str
+        A .spin or .charge file, or a scan_properties .npz written by pes_organizer.
+
+    Returns
+    -------
+    store : dict
+        Arrays keyed by property, "spins" and/or "charges".
+    """
+    stat = os.stat(file)
+
+    return read_store(os.path.abspath(file), stat.st_mtime_ns, stat.st_size)
+
+
+def get_property(file, key):
+    """
+    Get the (steps, atoms) array of one property from a scan file.
+
+    Parameters
+    ----------
+    file : str
+        A .spin or .charge file, or a scan_properties .npz written by pes_organizer.
+    key : str
+        The property, "charges" or "spins".
+
+    Returns
+    -------
+    numpy.ndarray
+        A (scan steps, atoms) array of the property.
+    """
+    store = load_store(file)
+    if key not in store:
+        # pes_organizer leaves the spins out when the job had no mullpop file
+        raise ValueError(f"{file} has no {key}, it only holds {', '.join(store) or 'nothing'}.")
+
+    return store[key]
+
+
+def group_matrix(groups, atom_count):
+    """
+    Build a (atoms, groups) matrix with a one where an atom belongs to a group.
+
+    Parameters
+    ----------
+    groups : dict
+        One-based atom indices keyed by group name.
+    atom_count : int
+        The number of atoms in the system.
+
+    Returns
+    -------
+    numpy.ndarray
+        The membership matrix, in the order of the groups.
+    """
+    matrix = np.zeros((atom_count, len(groups)))
+    for column, (name, atoms) in enumerate(groups.items()):
+        atoms = np.asarray(atoms, dtype=int)
+        # Atoms are numbered from 1, so 0 would wrap around to the last atom
+        invalid = atoms[(atoms < 1) | (atoms > atom_count)]
+        if len(invalid):
+            raise ValueError(f"   > Atoms are numbered 1 to {atom_count}, group {name} has {invalid.tolist()}.")
+        matrix[atoms - 1, column] = 1.0
+
+    return matrix
+
+
+def sum_atom_groups(values, groups):
+    """
+    Sum the values of several atom groups for every step in one reduction.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        A (scan steps, atoms) array of charges or spins.
+    groups : dict
+        One-based atom indices keyed by group name.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per scan step and one column per group.
+    """
+    sums = values @ group_matrix(groups, values.shape[1])
+    table = pd.DataFrame(sums, columns=list(groups))
+    table.index = pd.RangeIndex(1, len(table) + 1, name="Step")
+
+    return table
+
+
+def export_groups(table, out_file):
+    """
+    Write summed group values to a CSV or Parquet file based on its extension.
+
+    Parameters
+    ----------
+    table : pandas.DataFrame
+        The group sums returned by sum_atom_groups().
+    out_file : str
+        The name of the output .csv or .parquet file.
+    """
+    if out_file.endswith(".parquet"):
+        table.to_parquet(out_file)
+    else:
+        table.to_csv(out_file)
+
+
+def fragment_tables(files, groups):
+    """
+    Sum several fragments for every file and stack the results per property.
+
+    Parameters
+    ----------
+    files : list
+        The .spin, .charge or scan_properties.npz files to analyze.
+    groups : dict
+        One-based atom indices keyed by fragment name.
+
+    Returns
+    -------
+    tables : dict
+        A DataFrame of fragment sums for each property, with a File column.
+    """
+    tables = {}
+    for file in files:
+        for key, values in load_store(file).items():
+            table = sum_atom_groups(values, groups).reset_index()
+            table.insert(0, "File", file)
+            tables.setdefault(key, []).append(table)
+
+    return {key: pd.concat(table_list, ignore_index=True) for key, table_list in tables.items()}
+
+
+def get_fragments():
+    """
+    Ask the user for additional fragments to sum side by side.
+
+    Returns
+    -------
+    groups : dict
+        One-based atom indices keyed by the fragment as it was typed.
+    """
+    fragments = input("   > Additional fragments to tabulate (e.g., 1-5;6-9), or press enter to skip: ")
+    groups = {}
+    for fragment in fragments.split(";"):
+        fragment = fragment.strip()
+        if fragment:
+            temp = [
+                (lambda sub: range(sub[0], sub[-1] + 1))(list(map(int, ele.split("-"))))
+                for ele in fragment.split(",")
+            ]
+            groups[fragment] = [b for a in temp for b in a]
+
+    return groups
+
+
+def select_steps(net_values, selection, file):
+    """
+    Keep the user selected steps and optionally reverse them.
+
+    Parameters
+    ----------
+    net_values : numpy.ndarray
+        The summed value of each scan step.
+    selection : list
+        The one-based steps to keep.
+    file : str
+        The name of the file the values came from.
+
+    Returns
+    -------
+    net_data : list
+        Lines of "step,value" for each kept step.
+    """
+    selected = set(selection)
+    net_data = [
+        f"{step},{value}\n"
+        for step, value in enumerate(net_values.tolist(), start=1)
+        if step in selected
+    ]
+
+    reverse = input(f"   > Press any key to reverse data for {file}: ")
+    if reverse:
+        net_data.reverse()
+
+    return net_data
+
+
 def get_spins(atoms, file, selection):
     """
     Gets the charges for the atoms specified by the user and sums them.
@@ -79,32 +362,10 @@ def get_spins(atoms, file, selection):
     net_spins : list
         List fo spins corresponding to each image in the scan.
     """
+    spins = get_property(file, "spins")
+    net_spins = sum_atom_groups(spins, {"spin": [int(atom) for atom in atoms]})["spin"].to_numpy()
 
-    # Sum the spins for the user selected atoms
-    net_spins = []
-    net_spin = 0
-    step_count = 0
-    with open(file, "r") as scan_spin_file:
-        for line in scan_spin_file:
-            line_list = line.split()
-            if line_list[0] in atoms:
-                net_spin += float(line_list[9])
-
-            if line_list[0] == "End":
-                step_count += 1
-                net_spins.append(f"{step_count},{net_spin}\n")
-                net_spin = 0
-
-    net_spins_reference = net_spins.copy()
-    for index, spin in enumerate(net_spins_reference):
-        if index + 1 not in selection:
-            net_spins.remove(net_spins_reference[index])
-
-    reverse = input(f"   > Press any key to reverse data for {file}: ")
-    if reverse:
-        net_spins.reverse()
-
-    return net_spins
+    return select_steps(net_spins, selection, file)
 
 
 def get_charges(atoms, file, selection):
@@ -125,32 +386,10 @@ def get_charges(atoms, file, selection):
     net_spins : list
         List fo spins corresponding to each image in the scan.
     """
+    charges = get_property(file, "charges")
+    net_charges = sum_atom_groups(charges, {"charge": [int(atom) for atom in atoms]})["charge"].to_numpy()
 
-    # Sum the charges for the user selected atoms
-    net_charges = []
-    net_charge = 0
-    step_count = 0
-    with open(file, "r") as scan_charge_file:
-        for line in scan_charge_file:
-            line_list = line.split()
-            if line_list[0] in atoms:
-                net_charge += float(line_list[2])
-
-            if line_list[0] == "End":
-                step_count += 1
-                net_charges.append(f"{step_count},{net_charge}\n")
-                net_charge = 0
-
-    net_charges_reference = net_charges.copy()
-    for index, charge in enumerate(net_charges_reference):
-        if index + 1 not in selection:
-            net_charges.remove(net_charges_reference[index])
-
-    reverse = input(f"   > Press any key to reverse data for {file}: ")
-    if reverse:
-        net_charges.reverse()
-
-    return net_charges
+    return select_steps(net_charges, selection, file)
 
 
 def write_data(file, net_data):
@@ -174,14 +413,14 @@ def charge_spin_extractor():
     print("\n.-----------------------.")
     print("| CHARGE SPIN EXTRACTOR |")
     print(".-----------------------.\n")
-    print("First run organize_energy_scan_data.py for each job.")
-    print("Move the scan_charge and scan_spin to the same directory.")
-    print("Give them unique names.")
+    print("First run pes_organizer for each job.")
+    print("Move each scr/scan_properties_<job>.npz to the same directory.")
+    print("Older .charge and .spin files with unique names are also read.")
     print("Extract summed charge and spin for user specified atoms.\n")
 
     # Check how many charge and spin files
-    charge_files = get_files("*.charge")
-    spin_files = get_files("*.spin")
+    charge_files = get_property_files("charges")
+    spin_files = get_property_files("spins")
 
     # What atoms does the user want to perform charge-spin analysis for?
     atoms = get_atoms()
@@ -202,6 +441,14 @@ def charge_spin_extractor():
         spin_lists += net_spin_data
     write_data("combined_spin.csv", spin_lists)
 
+    # Optionally sum several fragments at once from the already parsed arrays
+    groups = get_fragments()
+    if groups:
+        # A scan_properties file holds both properties, so only list it once
+        tables = fragment_tables(list(dict.fromkeys(charge_files + spin_files)), groups)
+        for key, table in tables.items():
+            export_groups(table, f"fragment_{key}.csv")
+
 
 if __name__ == "__main__":
     charge_spin_extractor()
@@ -1,41 +1,169 @@
 import re
 
-def create_neb_mep_trj_from_out():
-    # Define the file paths
-    orca_output_file = 'orca.out'
-    output_xyz_file = 'qmscript_MEP_trj.xyz'
+# Headers of the coordinate blocks, handles one-letter and two-letter element symbols
+block_pattern = re.compile(r'^\s*(REACTANT|PRODUCT|IMAGE \d+)(?:\s*\((?:ANGSTROEM|BOHR)\))?\s*$')
+coordinate_pattern = re.compile(r'^[A-Z][a-z]?\s+-?\d+\.\d+\s+-?\d+\.\d+\s+-?\d+\.\d+\s*$')
+energy_pattern = re.compile(r'\s+\d+\s+\S+\s+(-?\d+\.\d+)')
+# The rule ORCA prints above and below the rows of the path summary
+summary_separator = '-' * 63
 
-    # Define regex patterns for extracting data
-    # Adjusted to handle one-letter and two-letter element symbols
-    coordinate_pattern = re.compile(r'(REACTANT|PRODUCT|IMAGE \d+ \((ANGSTROEM|BOHR)\))\n-+\n((?:[A-Z][a-z]?\s+-?\d+\.\d+\s+-?\d+\.\d+\s+-?\d+\.\d+\s*\n)+)')
-    energy_pattern = re.compile(r'\s+\d+\s+\S+\s+(-?\d+\.\d+)')
 
-    # Read the ORCA output file
-    with open(orca_output_file, 'r') as file:
-        orca_output = file.read()
+def is_separator(line):
+    """Check if a line is a row of dashes."""
+    stripped = line.strip()
+    return bool(stripped) and set(stripped) == {'-'}
 
-    # Extract coordinates and energies
-    coordinates = coordinate_pattern.findall(orca_output)
-    path_summary_snippet = orca_output.split('PATH SUMMARY')[1].split('---------------------------------------------------------------')[1].strip()
-    energies = energy_pattern.findall(path_summary_snippet)
 
-    # Adjust coordinates list to include REACTANT and PRODUCT properly
-    coordinates = [('REACTANT', coordinates[0][1], coordinates[0][2])] + coordinates + [('PRODUCT', coordinates[-1][1], coordinates[-1][2])]
+def is_summary_separator(line):
+    """Check if a line is the exact rule that opens and closes the path summary."""
+    return line.strip() == summary_separator
 
-    # Ensure the number of coordinates and energies match
-    assert len(coordinates) == len(energies), "Mismatch between number of coordinates and energies."
 
-    # Write the extracted data to the new XYZ file
+def order_blocks(blocks):
+    """
+    Order the latest coordinate blocks along the path.
+
+    Parameters
+    ----------
+    blocks : dict
+        The latest coordinate lines of each REACTANT, IMAGE n and PRODUCT block.
+
+    Returns
+    -------
+    list
+        The coordinate lines of each image from reactant to product.
+        The first and last images stand in for the endpoints if those were not printed.
+
+    """
+    images = sorted((int(label.split()[1]), lines) for label, lines in blocks.items() if label.startswith('IMAGE'))
+    images = [lines for _, lines in images]
+    if not images:
+        return []
+    reactant = blocks.get('REACTANT', images[0])
+    product = blocks.get('PRODUCT', images[-1])
+
+    return [reactant] + images + [product]
+
+
+def write_mep(file, coordinates, energies):
+    """
+    Write one MEP to an open xyz file.
+
+    Parameters
+    ----------
+    file : file
+        The open output file.
+    coordinates : list
+        The coordinate lines of each image from reactant to product.
+    energies : list
+        The energy of each image from the path summary.
+
+    Returns
+    -------
+    bool
+        False if there were no images or the images and energies did not match,
+        in which case nothing is written.
+
+    """
+    if not coordinates or len(coordinates) != len(energies):
+        print(f"   > Skipping a MEP with {len(coordinates)} images and {len(energies)} energies.")
+        return False
+
+    for lines, energy in zip(coordinates, energies):
+        title_line = f"Coordinates from ORCA-job qmscript_MEP E {energy}"
+        file.write(f"{len(lines)}\n")
+        file.write(f"{title_line}\n")
+        file.writelines(lines)
+
+    return True
+
+
+def create_neb_mep_trj_from_out(orca_output_file='orca.out', output_xyz_file='qmscript_MEP_trj.xyz', iterations_file=None):
+    """
+    Build the MEP trajectory of an ORCA NEB from its output in a single streaming pass.
+
+    Only the latest coordinate block of each image is kept,
+    so memory does not grow with the number of NEB iterations printed.
+
+    Parameters
+    ----------
+    orca_output_file : str
+        The ORCA output file.
+    output_xyz_file : str
+        The xyz trajectory of the final MEP.
+    iterations_file : str
+        If given, the MEP at every path summary is appended to this file for convergence movies.
+        Path summaries without matching coordinate blocks are skipped with a warning.
+
+    Returns
+    -------
+    int
+        The number of path summaries found.
+
+    """
+    blocks = {}
+    energies = []
+    summaries = 0
+    state = 'search'
+    label = None
+    iterations = open(iterations_file, 'w') if iterations_file else None
+
+    try:
+        with open(orca_output_file, 'r') as file:
+            for line in file:
+                if state == 'block_header':
+                    # A row of dashes separates a block header from its coordinates,
+                    # any other line means the header was just a mention and the last block is kept
+                    if is_separator(line):
+                        state = 'block'
+                        blocks[label] = []
+                        continue
+                    state = 'search'
+
+                if state == 'block':
+                    if coordinate_pattern.match(line):
+                        blocks[label].append(line.strip() + '\n')
+                        continue
+                    if not blocks[label]:
+                        del blocks[label]
+                    state = 'search'
+
+                elif state == 'summary_header':
+                    if is_summary_separator(line):
+                        state = 'summary'
+                        energies = []
+                    continue
+
+                elif state == 'summary':
+                    if not is_summary_separator(line):
+                        energies.extend(energy_pattern.findall(line))
+                        continue
+                    # The closing row of dashes ends the path summary
+                    state = 'search'
+                    summaries += 1
+                    if iterations:
+                        write_mep(iterations, order_blocks(blocks), energies)
+                    continue
+
+                match = block_pattern.match(line)
+                if match:
+                    label = match.group(1)
+                    state = 'block_header'
+                elif 'PATH SUMMARY' in line:
+                    state = 'summary_header'
+    finally:
+        if iterations:
+            iterations.close()
+
+    # Check the final MEP before the new XYZ file is created
+    coordinates = order_blocks(blocks)
+    if not coordinates or len(coordinates) != len(energies):
+        raise ValueError(
+            f"Mismatch between {len(coordinates)} images and {len(energies)} energies in {orca_output_file}."
+        )
+
+    # Write the latest coordinates and energies to the new XYZ file
     with open(output_xyz_file, 'w') as file:
-        for i, (coord_type, unit, coord_data) in enumerate(coordinates):
-            lines = coord_data.strip().split('\n')
-            num_atoms = len(lines)
-            energy = energies[i]
-            title_line = f"Coordinates from ORCA-job qmscript_MEP E {energy}"
-            
-            file.write(f"{num_atoms}\n")
-            file.write(f"{title_line}\n")
-            for line in lines:
-                file.write(line + '\n')
-
-    output_xyz_file
+        write_mep(file, coordinates, energies)
+
+    return summaries
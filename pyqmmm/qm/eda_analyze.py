@@ -1,117 +1,81 @@
 import os
 import re
 import csv
+import itertools
+import pyqmmm.qm.output_crawler
 import matplotlib.pyplot as plt
 
 # Conversion factor
 kj_to_kcal = 0.239006
 
 
+# Lines after each section header that hold an energy, with the regex that extracts it
+EDA_SECTIONS = {
+    "Decomposition of frozen interaction energy": [
+        ("Electrostatics", 11, re.compile(r"E_cls_elec\(solv\)\s+\(kJ/mol\) = ([-+]?[\d.]+)")),
+        ("Repulsion", 6, re.compile(r"E_mod_pauli\s+\(MOD PAULI\) \(kJ/mol\) = ([-+]?[\d.]+)")),
+        ("Dispersion", 7, re.compile(r"E_cls_disp\s+\(CLS DISP\)\s+\(kJ/mol\) = ([-+]?[\d.]+)")),
+    ],
+    "Simplified EDA Summary (kJ/mol)": [
+        ("SOLVATION", 3, re.compile(r"SOLVATION\s+([-+]?[\d.]+)")),
+        ("POLARIZATION", 6, re.compile(r"POLARIZATION\s+([-+]?[\d.]+)")),
+        ("CHARGE TRANSFER", 7, re.compile(r"CHARGE TRANSFER\s+([-+]?[\d.]+)")),
+    ],
+}
+
+
 def extract_energies(file_path):
     energies = {}
     with open(file_path, "r") as f:
-        lines = f.readlines()
-
-        # Extract energies from the "Decomposition of frozen interaction energy" section
-        for idx, line in enumerate(lines):
-            if "Decomposition of frozen interaction energy" in line:
-                try:
-                    energies["Electrostatics"] = (
-                        float(
-                            re.search(
-                                r"E_cls_elec\(solv\)\s+\(kJ/mol\) = ([-+]?[\d.]+)",
-                                lines[idx + 11],
-                            ).group(1)
-                        )
-                        * kj_to_kcal
-                    )
-                except AttributeError:
-                    print(
-                        f"Couldn't find Electrostatics energy in {file_path}. Line content: {lines[idx+11]}"
-                    )
-                    energies["Electrostatics"] = 0
-
-                try:
-                    energies["Repulsion"] = (
-                        float(
-                            re.search(
-                                r"E_mod_pauli\s+\(MOD PAULI\) \(kJ/mol\) = ([-+]?[\d.]+)",
-                                lines[idx + 6],
-                            ).group(1)
-                        )
-                        * kj_to_kcal
-                    )
-                except AttributeError:
-                    print(
-                        f"Couldn't find Repulsion energy in {file_path}. Line content: {lines[idx+6]}"
-                    )
-                    energies["Repulsion"] = 0
-
-                try:
-                    energies["Dispersion"] = (
-                        float(
-                            re.search(
-                                r"E_cls_disp\s+\(CLS DISP\)\s+\(kJ/mol\) = ([-+]?[\d.]+)",
-                                lines[idx + 7],
-                            ).group(1)
-                        )
-                        * kj_to_kcal
-                    )
-                except AttributeError:
-                    print(
-                        f"Couldn't find Dispersion energy in {file_path}. Line content: {lines[idx+7]}"
-                    )
-                    energies["Dispersion"] = 0
-
-            if "Simplified EDA Summary (kJ/mol)" in line:
-                try:
-                    energies["SOLVATION"] = (
-                        float(
-                            re.search(
-                                r"SOLVATION\s+([-+]?[\d.]+)", lines[idx + 3]
-                            ).group(1)
-                        )
-                        * kj_to_kcal
-                    )
-                except AttributeError:
-                    print(
-                        f"Couldn't find SOLVATION energy in {file_path}. Line content: {lines[idx+3]}"
-                    )
-                    energies["SOLVATION"] = 0
-
-                try:
-                    energies["POLARIZATION"] = (
-                        float(
-                            re.search(
-                                r"POLARIZATION\s+([-+]?[\d.]+)", lines[idx + 6]
-                            ).group(1)
-                        )
-                        * kj_to_kcal
-                    )
-                except AttributeError:
-                    print(
-                        f"Couldn't find POLARIZATION energy in {file_path}. Line content: {lines[idx+6]}"
-                    )
-                    energies["POLARIZATION"] = 0
-
-                try:
-                    energies["CHARGE TRANSFER"] = (
-                        float(
-                            re.search(
-                                r"CHARGE TRANSFER\s+([-+]?[\d.]+)", lines[idx + 7]
-                            ).group(1)
-                        )
-                        * kj_to_kcal
-                    )
-                except AttributeError:
-                    print(
-                        f"Couldn't find CHARGE TRANSFER energy in {file_path}. Line content: {lines[idx+7]}"
-                    )
-                    energies["CHARGE TRANSFER"] = 0
+        for line in f:
+            for header, fields in EDA_SECTIONS.items():
+                if header not in line:
+                    continue
+
+                # Only the few lines after a section header are held in memory
+                section = [line] + list(itertools.islice(f, max(offset for _, offset, _ in fields)))
+                for name, offset, pattern in fields:
+                    content = section[offset] if offset < len(section) else ""
+                    match = pattern.search(content)
+                    if match:
+                        energies[name] = float(match.group(1)) * kj_to_kcal
+                    else:
+                        print(f"Couldn't find {name} energy in {file_path}. Line content: {content}")
+                        energies[name] = 0
 
     return energies
 
 
+def find_eda_outputs(folder_names):
+    """
+    Find the qmscript output in each intermediate folder.
+
+    Parameters
+    ----------
+    folder_names : list
+        The intermediate folders, e.g., 1_Reactant.
+
+    Returns
+    -------
+    file_paths : dict
+        The output file of each folder that has one.
+
+    """
+    file_paths = {}
+    for folder in folder_names:
+        file_name = [
+            file
+            for file in os.listdir(folder)
+            if "qmscript" in file and file.endswith(".out")
+        ]
+        if not file_name:
+            print(f"No matching .out file found in folder {folder}. Skipping...")
+            continue
+        file_paths[folder] = os.path.join(folder, file_name[0])
+
+    return file_paths
+
+
 def format_plot() -> None:
     """
     General plotting parameters for the Kulik Lab.
@@ -152,24 +116,18 @@ def main():
     polarization_energies = []
     charge_transfer_energies = []
 
+    # Parse the outputs in parallel, only new or changed outputs are read
+    file_paths = find_eda_outputs(folder_names)
+    results = pyqmmm.qm.output_crawler.crawl(list(file_paths.values()), extract_energies)
+
     for folder in folder_names:
         intermediate_name = folder.split("_")[1]
         intermediates.append(intermediate_name)
-
-        # Find the desired .out file in the folder
-        file_name = [
-            file
-            for file in os.listdir(folder)
-            if "qmscript" in file and file.endswith(".out")
-        ]
-        if not file_name:
-            print(f"No matching .out file found in folder {folder}. Skipping...")
+        if folder not in file_paths:
             continue
 
-        file_path = os.path.join(folder, file_name[0])
-
         # Extract energies
-        energies = extract_energies(file_path)
+        energies = results[file_paths[folder]]
 
         solvation_energies.append(energies.get("SOLVATION", 0))
         electrostatics_energies.append(energies.get("Electrostatics", 0))
@@ -2,8 +2,13 @@
 
 import matplotlib.pyplot as plt
 import numpy as np
+import os
 import csv
+import json
 import time
+import pyqmmm.qm.traj_cache
+from pyqmmm.qm.traj_indexer import identify_software, parse_energy
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 HARTREE_TO_KCAL = 627.509
 
@@ -28,37 +33,6 @@ def write_energies_to_csv(energies_by_file, energies_hartrees_by_file, filename=
                 energy_hartrees = energies_hartrees_by_file[file][frame]
                 writer.writerow([file, frame, energy_hartrees, energy_kcal])
 
-def parse_energy(line, software):
-    """
-    Parse the energy from a line based on the software used.
-
-    Parameters
-    ----------
-    line : str
-        Line from the file containing energy information.
-    software: str
-        The software used for the calculation.
-
-    Returns
-    -------
-    float
-        The energy extracted from the line, in Hartrees.
-
-    """
-    if software == "ORCA-MEP" or software == "ORCA-IRC":
-        energy_str = line.split()[5]
-    elif software == "ORCA":
-        energy_str = line.split()[4]
-    elif software == "TeraChem-scan":
-        energy_str = line.split()[4]
-    elif software == "TeraChem-opt":
-        energy_str = line.split()[0]
-    else:
-        raise ValueError(f"Unsupported software: {software}")
-
-    return float(energy_str)
-
-
 def get_trajectory_energies(filename, software):
     """
     Parse the energies from an xyz trajectory file.
@@ -78,55 +52,14 @@ def get_trajectory_energies(filename, software):
         Third value is a list of absolute energies in Hartrees.
 
     """
-    energies_hartrees = []
-    with open(filename, "r") as f:
-        while True:
-            line = f.readline()
-            if not line:
-                break  # end of file
-
-            atom_count = int(line.strip())
-            # next line should contain energy
-            energy_line = f.readline().strip()
-            # parse and append energy
-            energies_hartrees.append(parse_energy(energy_line, software))
-            # skip atom lines
-            for _ in range(atom_count):
-                f.readline()
+    # Only the comment lines are read, or the energies come straight from the cache
+    energies_hartrees = pyqmmm.qm.traj_cache.get_energies(filename, software)
 
     # convert energies to kcal/mol and subtract first energy to make it relative
     first_energy = energies_hartrees[0] * HARTREE_TO_KCAL
-    energies_kcal = [(e - energies_hartrees[0]) * HARTREE_TO_KCAL for e in energies_hartrees]
-
-    return energies_kcal, first_energy, energies_hartrees
-
-
-def identify_software(line):
-    """
-    Identify the software used for the calculation from a line.
-
-    Parameters
-    ----------
-    line : str
-        Line from the file.
+    energies_kcal = (energies_hartrees - energies_hartrees[0]) * HARTREE_TO_KCAL
 
-    Returns
-    -------
-    str
-        Identifier of the software used for the calculation.
-    """
-    if "ORCA-job qmscript_MEP" in line:
-        return "ORCA-MEP"
-    elif "ORCA-job qmscript_IRC_Full" in line:
-        return "ORCA-IRC"
-    elif "ORCA-job qmscript" in line:
-        return "ORCA"
-    elif "Converged     Job" in line:
-        return "TeraChem-scan"
-    elif "TeraChem" in line:
-        return "TeraChem-opt"
-    else:
-        raise ValueError(f"Could not identify software from line: {line}")
+    return energies_kcal.tolist(), first_energy, energies_hartrees.tolist()
 
 
 def format_plot() -> None:
@@ -196,7 +129,7 @@ def collect_data():
     return energies_by_file, min_first_energy, plot_relative_to_lowest, energies_hartrees_by_file
 
 
-def plot_data(energies_by_file, min_first_energy, plot_relative_to_lowest, dim_list):
+def plot_data(energies_by_file, min_first_energy, plot_relative_to_lowest, dim_list, first_energies=None, out_name="energy_plot"):
     """
     Plot the collected energies.
 
@@ -208,6 +141,12 @@ def plot_data(energies_by_file, min_first_energy, plot_relative_to_lowest, dim_l
         The minimum first frame energy.
     plot_relative_to_lowest : bool
         Whether to plot energies relative to the lowest energy.
+    dim_list : list
+        Dimensions for the plot.
+    first_energies : dict
+        The first frame energy of each file in kcal/mol, needed to plot relative to the lowest energy.
+    out_name : str
+        The name of the saved figures without the extension.
     """
 
     format_plot()
@@ -221,7 +160,7 @@ def plot_data(energies_by_file, min_first_energy, plot_relative_to_lowest, dim_l
         if plot_relative_to_lowest:
             # make energies relative to the first frame with the lowest energy
             energies = [
-                e - (first_energies[filenames.index(filename)] - min_first_energy)
+                e + (first_energies[filename] - min_first_energy)
                 for e in energies
             ]
 
@@ -258,12 +197,165 @@ def plot_data(energies_by_file, min_first_energy, plot_relative_to_lowest, dim_l
     extensions = ["png", "svg"]
     for ext in extensions:
         plt.savefig(
-            f"energy_plot.{ext}",
+            f"{out_name}.{ext}",
             dpi=600,
             bbox_extra_artists=(plt.legend(bbox_to_anchor=(1.05, 1), loc="upper left"),),
             bbox_inches="tight",
             format=ext,
         )
+    plt.close(fig)
+
+
+def load_manifest(manifest_file):
+    """
+    Read the trajectory groups to plot from a JSON manifest.
+
+    The manifest is a list of groups such as
+    {"name": "step_1", "trajectories": ["1.xyz", "2.xyz"], "dimensions": [5, 4], "relative_to_lowest": false},
+    where only "trajectories" is required.
+
+    Parameters
+    ----------
+    manifest_file : str
+        Path to the JSON manifest.
+
+    Returns
+    -------
+    groups : list
+        The groups with the default name, dimensions and relative energy choice filled in.
+
+    """
+    with open(manifest_file, "r") as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_file))
+    groups = []
+    for idx, group in enumerate(manifest):
+        # Trajectories are found relative to the manifest, like the interactive flow in the current directory
+        trajectories = [os.path.join(base_dir, name) for name in group["trajectories"]]
+        groups.append(
+            {
+                "name": group.get("name", f"energy_plot_{idx + 1}"),
+                "trajectories": trajectories,
+                "dimensions": group.get("dimensions", [4, 4]),
+                "relative_to_lowest": bool(group.get("relative_to_lowest", False)),
+            }
+        )
+
+    return groups
+
+
+def get_energy_table(filenames, workers=None):
+    """
+    Parse the energies of many trajectories concurrently.
+
+    Each trajectory is parsed once however many groups it appears in.
+    Energies come from an up-to-date trajectory cache if one exists, which is never written here,
+    otherwise only the comment lines are read, seeking through the saved frame index.
+
+    Parameters
+    ----------
+    filenames : list
+        Paths to the trajectories.
+    workers : int
+        The number of trajectories parsed at once.
+
+    Returns
+    -------
+    energies_hartrees_by_file : dict
+        The absolute energy of each frame in Hartrees keyed by trajectory.
+
+    """
+    unique_files = list(dict.fromkeys(filenames))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        energies = executor.map(pyqmmm.qm.traj_cache.get_energies, unique_files)
+        return dict(zip(unique_files, energies))
+
+
+def render_group(job):
+    """
+    Render the figure of one trajectory group on the headless Agg backend.
+
+    Parameters
+    ----------
+    job : dict
+        The group settings and the energies of its trajectories in Hartrees.
+
+    Returns
+    -------
+    str
+        The name of the saved figures without the extension.
+
+    """
+    plt.switch_backend("Agg")
+    energies_by_file = {}
+    first_energies = {}
+    for filename, energies_hartrees in job["energies"].items():
+        energies_hartrees = np.asarray(energies_hartrees)
+        energies_by_file[filename] = ((energies_hartrees - energies_hartrees[0]) * HARTREE_TO_KCAL).tolist()
+        first_energies[filename] = energies_hartrees[0] * HARTREE_TO_KCAL
+
+    plot_data(
+        energies_by_file,
+        min(first_energies.values()),
+        job["relative_to_lowest"] and len(energies_by_file) > 1,
+        job["dimensions"],
+        first_energies,
+        job["out_name"],
+    )
+
+    return job["out_name"]
+
+
+def plot_batch(manifest_file, out_dir=".", workers=None):
+    """
+    Plot every trajectory group in a manifest without any prompts.
+
+    Energies for all groups are parsed concurrently into a shared table,
+    then the figures are rendered in parallel worker processes.
+
+    Parameters
+    ----------
+    manifest_file : str
+        Path to the JSON manifest of trajectory groups.
+    out_dir : str
+        The directory for the figures and CSV files.
+    workers : int
+        The number of worker processes rendering figures.
+
+    Returns
+    -------
+    list
+        The names of the saved figures without the extension.
+
+    """
+    groups = load_manifest(manifest_file)
+    energy_table = get_energy_table([f for group in groups for f in group["trajectories"]], workers)
+    os.makedirs(out_dir, exist_ok=True)
+
+    jobs = []
+    for group in groups:
+        out_name = os.path.join(out_dir, group["name"])
+        energies = {f: energy_table[f] for f in group["trajectories"]}
+        energies_by_file = {
+            f: ((e - e[0]) * HARTREE_TO_KCAL).tolist() for f, e in energies.items()
+        }
+        write_energies_to_csv(
+            energies_by_file,
+            {f: e.tolist() for f, e in energies.items()},
+            f"{out_name}_data.csv",
+        )
+        jobs.append(
+            {
+                "energies": energies,
+                "dimensions": group["dimensions"],
+                "relative_to_lowest": group["relative_to_lowest"],
+                "out_name": out_name,
+            }
+        )
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(render_group, jobs))
 
 
 def plot_energies():
@@ -289,7 +381,8 @@ def plot_energies():
 
     energies_by_file, min_first_energy, plot_relative_to_lowest, energies_hartrees_by_file = collect_data()
     write_energies_to_csv(energies_by_file, energies_hartrees_by_file)  # Write energies to CSV
-    plot_data(energies_by_file, min_first_energy, plot_relative_to_lowest, dim_list)
+    first_energies = {f: e[0] * HARTREE_TO_KCAL for f, e in energies_hartrees_by_file.items()}
+    plot_data(energies_by_file, min_first_energy, plot_relative_to_lowest, dim_list, first_energies)
 
     total_time = round(time.time() - start_time, 3)  # Seconds to run the function
     job_summary = f"""
@@ -5,6 +5,7 @@ import numpy as np
 import glob
 import os
 import re
+import pyqmmm.qm.traj_indexer
 
 # Define constant
 HARTREE_TO_KCAL = 627.509
@@ -13,6 +14,9 @@ def read_energy_from_xyz(filename):
     """
     Extract energy values from an xyz file.
 
+    Only the comment lines of converged frames are read,
+    the atom lines are skipped using the frame index.
+
     Parameters
     ----------
     filename : str
@@ -23,13 +27,17 @@ def read_energy_from_xyz(filename):
     energies : list
         A list of energy values from each frame in the file.
     """
-    energies = []
-    with open(filename, "r") as file:
-        for line in file:
-            if line.startswith("Converged"):
-                energy_hartree = float(line.split()[4])
-                energy_kcal = energy_hartree * HARTREE_TO_KCAL
-                energies.append(energy_kcal)
+    comments = pyqmmm.qm.traj_indexer.read_comment_lines(filename)
+    converged = [comment for comment in comments if comment.startswith("Converged")]
+    if not converged:
+        print(f"   > No converged frames found in {filename}, skipping.")
+        return []
+
+    try:
+        software = pyqmmm.qm.traj_indexer.identify_software(converged[0])
+    except ValueError:
+        raise ValueError(f"   > Could not identify the software that wrote {filename}: {converged[0]}") from None
+    energies = [pyqmmm.qm.traj_indexer.parse_energy(comment, software) * HARTREE_TO_KCAL for comment in converged]
     return energies
 
 def format_plot() -> None:
@@ -1,6 +1,51 @@
 """This script checks to see if any frames were not written to the mdcrd."""
 
+import os
 import re
+import pyqmmm.qm.tail_reader
+
+BLOCK_SIZE = 1 << 20  # Bytes counted at a time
+NSTEP_MARKER = b"\n NSTEP"
+AVERAGES_MARKER = "A V E R A G E S"
+
+
+def count_progress_prints(file_name, start, stop, block_size=BLOCK_SIZE):
+    """
+    Count the NSTEP progress prints between two byte offsets.
+
+    Parameters
+    ----------
+    file_name : str
+        The name of the production output file.
+    start : int
+        The offset to start counting from.
+    stop : int
+        The offset to stop counting at.
+    block_size : int
+        The number of bytes counted at a time.
+
+    Returns
+    -------
+    count : int
+        The number of progress prints.
+
+    """
+    count = 0
+    carry = b""
+    with open(file_name, "rb") as prod_file:
+        prod_file.seek(start)
+        position = start
+        while position < stop:
+            block = prod_file.read(min(block_size, stop - position))
+            if not block:
+                break
+            position += len(block)
+            # The carry is shorter than the marker so no print is counted twice
+            buffer = carry + block
+            count += buffer.count(NSTEP_MARKER)
+            carry = buffer[-(len(NSTEP_MARKER) - 1):]
+
+    return count
 
 
 def missing_frame_checkup():
@@ -11,32 +56,32 @@ def missing_frame_checkup():
 
     # Open the production run MD file
     print("   > Analyzing production output file ...\n")
-    with open("constP_prod.out", "r") as prod_file:
-        nsteps = []
-        nstep = 0
+    prod_out = "constP_prod.out"
+    with open(prod_out, "rb") as prod_file:
         nstlim = ""  # The total number of frames
         ntpr = ""  # The increment that frame data is written out
-        # Identify the nstlim and ntpr variables
-        for line in prod_file:
-            if not nstlim or not ntpr:
-                if line[1:7] == "nstlim":
-                    line = line.strip()
-                    nstlim = int(re.split("[=,]", line)[1])
-                if line[1:5] == "ntpr":
-                    line = line.strip()
-                    ntpr = int(re.split("[=,]", line)[1])
-                continue
-
-            # Save the value of nstep to a list
-            if line[1:6] == "NSTEP":
-                nstep = int(line[8:].split()[0])
-                nsteps.append(nstep)
-            if nstep == nstlim:
+        # Identify the nstlim and ntpr variables from the input echo
+        for line in iter(prod_file.readline, b""):
+            line = line.decode(errors="replace")
+            if line[1:7] == "nstlim":
+                line = line.strip()
+                nstlim = int(re.split("[=,]", line)[1])
+            if line[1:5] == "ntpr":
+                line = line.strip()
+                ntpr = int(re.split("[=,]", line)[1])
+            if nstlim and ntpr:
                 break
+        # Start counting at the last newline so a progress print on the next line is found
+        header_end = max(prod_file.tell() - 1, 0)
+
+    # The averages at the end of a finished run repeat the last NSTEP, so stop counting there
+    averages = pyqmmm.qm.tail_reader.find_last_offsets(prod_out, [AVERAGES_MARKER])[AVERAGES_MARKER]
+    stop = averages if averages is not None else os.path.getsize(prod_out)
+    nsteps = count_progress_prints(prod_out, header_end, stop)
 
     # Calculate the number of missing nstep progress prints
     total = int(nstlim / ntpr)
-    missing = int(nstlim / ntpr - len(nsteps))
+    missing = int(nstlim / ntpr - nsteps)
     print(f"   > Out of {total} progress prints, {missing} were missing.")
 
 
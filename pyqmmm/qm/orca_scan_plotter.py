@@ -7,8 +7,10 @@ To fix this, I had to manually set the axes and add padding.
 """
 
 import matplotlib.pyplot as plt
+import pyqmmm.qm.tail_reader
 
 HARTREE_TO_KCAL_MOL = 627.509
+SURFACE_MARKER = "The Calculated Surface using the 'Actual Energy'"
 
 def format_plot() -> None:
     """
@@ -30,16 +32,17 @@ def format_plot() -> None:
     plt.rcParams["svg.fonttype"] = "none"
 
 def read_orca_output(file_name):
-    with open(file_name, 'r') as file:
-        lines = file.readlines()
-    
+    # The surface table is printed at the end, so only the tail of the output is read
+    section = pyqmmm.qm.tail_reader.read_trailing_sections(file_name, [SURFACE_MARKER])[SURFACE_MARKER]
+    lines = section.splitlines() if section else []
+
     start_reading = False
     distances = []
     relative_energies = []
     first_energy_kcal_mol = None
 
     for line in lines:
-        if "The Calculated Surface using the 'Actual Energy'" in line:
+        if SURFACE_MARKER in line:
             start_reading = True
             continue
         if start_reading:
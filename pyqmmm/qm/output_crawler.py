@@ -0,0 +1,134 @@
+"""Parallel crawler that parses QM output files with a persistent per-file cache."""
+
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+CACHE_FILE = ".qm_output_cache.json"
+CACHE_VERSION = 1
+
+
+def find_outputs(base_path, file_name, ignore=()):
+    """
+    Find every output file with a given name below a directory.
+
+    Parameters
+    ----------
+    base_path : str
+        The directory to search.
+    file_name : str
+        The name of the output files, e.g., qmscript.out.
+    ignore : list
+        Names of directories whose outputs are skipped.
+
+    Returns
+    -------
+    list
+        Paths to the output files, sorted by path.
+
+    """
+    outputs = []
+    for root, dirs, files in os.walk(base_path):
+        if file_name in files and os.path.basename(root) not in ignore:
+            outputs.append(os.path.join(root, file_name))
+
+    return sorted(outputs)
+
+
+def load_cache(cache_file=CACHE_FILE):
+    """
+    Load the results of previously parsed files.
+
+    Parameters
+    ----------
+    cache_file : str
+        The name of the JSON cache file.
+
+    Returns
+    -------
+    dict
+        Cache entries keyed by parser and absolute path.
+
+    """
+    try:
+        with open(cache_file, "r") as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+
+    return cache.get("entries", {})
+
+
+def save_cache(entries, cache_file=CACHE_FILE):
+    """
+    Save parsed results so later runs only parse new or changed files.
+
+    The cache is only an optimization, so a directory that cannot be written
+    is reported and the results are simply not saved.
+
+    Parameters
+    ----------
+    entries : dict
+        Cache entries keyed by parser and absolute path.
+    cache_file : str
+        The name of the JSON cache file.
+
+    """
+    temp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, "w") as f:
+            json.dump({"version": CACHE_VERSION, "entries": entries}, f)
+        os.replace(temp_file, cache_file)
+    except OSError as error:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        print(f"   > Could not save the output cache {cache_file}, continuing without it: {error}")
+
+
+def crawl(file_names, parser, cache_file=CACHE_FILE, workers=None):
+    """
+    Parse many output files in parallel, reusing cached results for unchanged files.
+
+    A file is only parsed again if its path, modification time or size has changed.
+
+    Parameters
+    ----------
+    file_names : list
+        Paths to the output files.
+    parser : function
+        Takes the path to an output file and returns a JSON serializable result.
+    cache_file : str
+        The name of the JSON cache file, no cache is used if None.
+    workers : int
+        The number of files parsed at once, chosen by ThreadPoolExecutor if not given.
+
+    Returns
+    -------
+    results : dict
+        The result of the parser keyed by each path in file_names.
+
+    """
+    entries = load_cache(cache_file) if cache_file else {}
+    results = {}
+    stale = []
+    for file_name in file_names:
+        stat = os.stat(file_name)
+        key = f"{parser.__module__}.{parser.__name__}:{os.path.abspath(file_name)}"
+        entry = entries.get(key)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            results[file_name] = entry["result"]
+        else:
+            stale.append((file_name, key, stat))
+
+    if stale:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            parsed = executor.map(parser, [file_name for file_name, _, _ in stale])
+            for (file_name, key, stat), result in zip(stale, parsed):
+                results[file_name] = result
+                entries[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "result": result}
+        if cache_file:
+            save_cache(entries, cache_file)
+
+    return {file_name: results[file_name] for file_name in file_names}
@@ -1,5 +1,9 @@
 """This script will return the the charge and spin into a more readable format."""
 
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
 
 def get_iteration_pairs():
     """
@@ -40,101 +44,143 @@ def get_iteration_pairs():
     return final_scan_position, scan_step_pairs
 
 
-def get_scan_spins(final_scan_position):
+def read_spin_sections(mullpop_file="./scr/mullpop"):
     """
-    Extracts spin sections from mullpop for each scan and stores them as a dict.
+    Read the atomic spins of every Spin-Averaged section of mullpop.
 
     Parameters
     ----------
-    iter_pairs : dictionary
-        The scan step number as the key and iterations as the value.
+    mullpop_file : str
+        The TeraChem mullpop file.
 
     Returns
     -------
-    spin_pairs : dictionary
-        The scan step number as the key and the spin section as the key.
+    sections : list
+        One list of spin strings per section, in atom order.
     """
-    section_count = 0
-    section_content = ""
     sections = []
-    current_section = 0
-    section_found = False
-    with open("./scr/mullpop", "r") as spins:
-        for line in spins:
+    spins = None
+    with open(mullpop_file, "r") as mullpop:
+        for line in mullpop:
             if line[29:42] == "Spin-Averaged":
-                current_section += 1
-                if current_section == final_scan_position[section_count]:
-                    section_count += 1
-                    section_found = True
-                elif section_found:
-                    sections.append(section_content)
-                    section_found = False
-                    section_content = ""
-
-            # Combine all lines of a final section into a single string
-            if section_found:
-                section_content += line
-
-    # Add the last section of the file to the list of sections
-    if section_found:
-        sections.append(section_content)
-
-    # Write the spin data for the final step of each scan step to a file
-    with open("./scr/1.spin", "w") as scan_spin_file:
-        for index, section in enumerate(sections):
-            scan_spin_file.write(section)
-            scan_spin_file.write(f"End scan {index + 1}\n")
+                spins = []
+                sections.append(spins)
+            elif spins is not None:
+                line_content = line.split()
+                if len(line_content) == 10 and line_content[0].isdigit():
+                    spins.append(line_content[9])
 
     return sections
 
 
-def get_scan_charges(final_scan_position):
+def read_charge_sections(charge_file="./scr/charge_mull.xls"):
     """
-    Extracts charges from charge_mull.xls for each scan and stores them as a dict.
+    Read the atomic charges of every section of charge_mull.xls.
+
+    Sections are split where the atom index resets,
+    so a section does not need to start at atom 1.
 
     Parameters
     ----------
-    iter_pairs : dictionary
-        The scan step number as the key and iterations as the value.
+    charge_file : str
+        The TeraChem charge_mull.xls file.
 
     Returns
     -------
-    charge_pairs : dictionary
-        The scan step number as the key and the charge section as the key.
+    sections : list
+        One list of charge strings per section, in atom order.
+    elements : list
+        The element symbol of each atom.
     """
-    section_count = 0
-    section_content = ""
     sections = []
-    current_section = 0
-    section_found = False
-    with open("./scr/charge_mull.xls", "r") as charges:
+    elements = []
+    previous_atom = None
+    with open(charge_file, "r") as charges:
         for line in charges:
             line_content = line.split()
-            if line_content[0] == "1":
-                current_section += 1
-                if current_section == final_scan_position[section_count]:
-                    section_count += 1
-                    section_found = True
-                elif section_found:
-                    sections.append(section_content)
-                    section_found = False
-                    section_content = ""
-
-            # Combine all lines of a final section into a single string
-            if section_found:
-                section_content += line
-
-    # Add the last section of the file to the list of sections
-    if section_found:
-        sections.append(section_content)
-
-    # Write the charge data for the final step of each scan step to a file
-    with open("./scr/1.charge", "w") as scan_charge_file:
-        for index, section in enumerate(sections):
-            scan_charge_file.write(section)
-            scan_charge_file.write(f"End scan {index + 1}\n")
+            if len(line_content) < 3 or not line_content[0].isdigit():
+                continue
+            # A new section starts whenever the atom index stops increasing
+            atom = int(line_content[0])
+            if previous_atom is None or atom <= previous_atom:
+                sections.append([])
+            previous_atom = atom
+            if len(sections) == 1:
+                elements.append(line_content[1])
+            sections[-1].append(line_content[2])
 
-    return sections
+    return sections, elements
+
+
+def select_final_steps(sections, final_scan_position):
+    """
+    Keep the section printed at the end of each scan step.
+
+    Parameters
+    ----------
+    sections : list
+        One list of values per section, in atom order.
+    final_scan_position : list
+        The one-based section number that ends each scan step.
+
+    Returns
+    -------
+    numpy.ndarray
+        A (scan steps, atoms) array of the final values of each step.
+    """
+    return np.array([sections[position - 1] for position in final_scan_position], dtype=np.float64)
+
+
+def default_store_name():
+    """
+    Name the scan properties file after the job directory, e.g., ./scr/scan_properties_job1.npz.
+
+    Each job gets a unique name, so the files can be copied next to each other for charge_spin_extractor.
+
+    """
+    job = os.path.basename(os.path.abspath("."))
+
+    return f"./scr/scan_properties_{job}.npz"
+
+
+def post_process_scan(out_file=None):
+    """
+    Collect the final charges and spins of every scan step in one pass over each file.
+
+    The TeraChem output, mullpop and charge_mull.xls are parsed concurrently.
+    The results are saved as columnar arrays indexed by (scan step, atom).
+
+    Parameters
+    ----------
+    out_file : str
+        The .npz file the arrays are written to, named after the job directory if not given.
+
+    Returns
+    -------
+    properties : dict
+        The final "charges" and "spins" of each scan step along with the atom "elements"
+        and the "file" they were saved to. Spins are left out if there is no mullpop file.
+    """
+    if out_file is None:
+        out_file = default_store_name()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        positions_job = executor.submit(get_iteration_pairs)
+        charges_job = executor.submit(read_charge_sections)
+        spins_job = executor.submit(read_spin_sections) if os.path.exists("./scr/mullpop") else None
+        final_scan_position, _ = positions_job.result()
+        charge_sections, elements = charges_job.result()
+        spin_sections = spins_job.result() if spins_job else None
+
+    properties = {
+        "charges": select_final_steps(charge_sections, final_scan_position),
+        "elements": np.array(elements, dtype=str),
+    }
+    if spin_sections is not None:
+        properties["spins"] = select_final_steps(spin_sections, final_scan_position)
+    np.savez(out_file, **properties)
+    properties["file"] = out_file
+
+    return properties
 
 
 def pes_organizer():
@@ -148,9 +194,11 @@ def pes_organizer():
     print("However, we only need the final charge and spin.")
     print("This script will return the charge and spin in a readable format.")
 
-    final_scan_position, scan_step_pairs = get_iteration_pairs()
-    get_scan_spins(final_scan_position)
-    get_scan_charges(final_scan_position)
+    properties = post_process_scan()
+    step_count, atom_count = properties["charges"].shape
+    print(f"   > Saved the final charges and spins of {step_count} scan steps and {atom_count} atoms.")
+    print(f"   > Output: {properties['file']}")
+    print("   > Copy it next to the files from your other jobs and run charge_spin_extractor.")
 
 
 if __name__ == "__main__":
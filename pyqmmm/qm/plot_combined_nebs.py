@@ -6,8 +6,15 @@ import csv
 import time
 import os
 import re
+import pyqmmm.qm.traj_indexer
+from pyqmmm.qm.trajectory import Trajectory
 
 HARTREE_TO_KCAL = 627.509
+COMBINED_XYZ = "combined_neb.xyz"
+COMBINED_DATA = "combined_neb.npz"
+COMBINED_VERSION = 1
+COMBINED_FIELDS = ("files", "signatures", "energies", "boundaries")
+DUPLICATE_TOLERANCE = 1e-4  # Angstroms
 
 def get_xyz_files():
     """
@@ -35,123 +42,183 @@ def write_energies_to_csv(total_energies, filename="energy_plot_data.csv"):
         for i, energy in enumerate(total_energies):
             writer.writerow([i, energy])
 
-def parse_energy(line, software):
+def format_plot() -> None:
     """
-    Parse the energy from a line based on the software used.
+    General plotting parameters.
+
+    """
+    font = {"family": "sans-serif", "weight": "bold", "size": 10}
+    plt.rc("font", **font)
+    plt.rcParams["xtick.major.pad"] = 5
+    plt.rcParams["ytick.major.pad"] = 5
+    plt.rcParams["axes.linewidth"] = 2
+    plt.rcParams["xtick.major.size"] = 7
+    plt.rcParams["xtick.major.width"] = 2
+    plt.rcParams["ytick.major.size"] = 7
+    plt.rcParams["ytick.major.width"] = 2
+    plt.rcParams["xtick.direction"] = "in"
+    plt.rcParams["ytick.direction"] = "in"
+    plt.rcParams["xtick.top"] = True
+    plt.rcParams["ytick.right"] = True
+    plt.rcParams["svg.fonttype"] = "none"
+
+def is_duplicate_frame(previous_file, next_file, tolerance=DUPLICATE_TOLERANCE):
+    """
+    Check if a NEB starts with the same geometry the previous NEB ended with.
+
+    Only the two frames being compared are decoded.
 
     Parameters
     ----------
-    line : str
-        Line from the file containing energy information.
-    software: str
-        The software used for the calculation.
+    previous_file : str
+        Path to the earlier NEB trajectory.
+    next_file : str
+        Path to the later NEB trajectory.
+    tolerance : float
+        The largest coordinate difference in Angstroms for frames to count as the same.
 
     Returns
     -------
-    float
-        The energy extracted from the line, in Hartrees.
+    bool
+        Whether the last frame of previous_file matches the first frame of next_file.
 
     """
-    if software == "ORCA-MEP" or software == "ORCA-IRC":
-        energy_str = line.split()[5]
-    elif software == "ORCA":
-        energy_str = line.split()[4]
-    elif software == "TeraChem-scan":
-        energy_str = line.split()[4]
-    elif software == "TeraChem-opt":
-        energy_str = line.split()[0]
-    else:
-        raise ValueError(f"Unsupported software: {software}")
+    last_frame = Trajectory.from_xyz(previous_file)[-1]
+    first_frame = Trajectory.from_xyz(next_file)[0]
+    if last_frame.shape != first_frame.shape:
+        return False
 
-    return float(energy_str)
+    return bool(np.allclose(last_frame, first_frame, rtol=0, atol=tolerance))
 
-def get_trajectory_energies(filename, software):
+
+def segment_signatures(xyz_files):
     """
-    Parse the energies from an xyz trajectory file.
+    Get the modification time and size of each NEB trajectory.
 
     Parameters
     ----------
-    filename : str
-        Path to the trajectory file.
-    software: str
-        Software used for the calculation.
+    xyz_files : list
+        Paths to the NEB trajectories.
 
     Returns
     -------
-    tuple
-        First value is a list of absolute energies for each frame, in kcal/mol.
-        Second value is the first frame energy in kcal/mol.
-        Third value is a list of absolute energies in Hartrees.
+    numpy.ndarray
+        An (n_files, 2) array of modification times and sizes.
 
     """
-    energies_hartrees = []
-    with open(filename, "r") as f:
-        while True:
-            line = f.readline()
-            if not line:
-                break  # end of file
-
-            atom_count = int(line.strip())
-            # next line should contain energy
-            energy_line = f.readline().strip()
-            # parse and append energy
-            energies_hartrees.append(parse_energy(energy_line, software))
-            # skip atom lines
-            for _ in range(atom_count):
-                f.readline()
-
-    # Convert energies to kcal/mol (absolute energies)
-    energies_kcal_abs = [e * HARTREE_TO_KCAL for e in energies_hartrees]
-    first_energy_kcal = energies_kcal_abs[0]
-
-    return energies_kcal_abs, first_energy_kcal, energies_hartrees
-
-def identify_software(line):
+    return np.array([pyqmmm.qm.traj_indexer.file_signature(f) for f in xyz_files], dtype=np.int64).reshape(-1, 2)
+
+
+def load_combined_neb(xyz_files, xyz_out=COMBINED_XYZ, data_file=COMBINED_DATA):
     """
-    Identify the software used for the calculation from a line.
+    Load a combined NEB from a previous run if none of the NEBs have changed.
 
     Parameters
     ----------
-    line : str
-        Line from the file.
+    xyz_files : list
+        Paths to the NEB trajectories, in order.
+    xyz_out : str
+        The merged trajectory.
+    data_file : str
+        The energies and boundaries saved alongside the merged trajectory.
 
     Returns
     -------
-    str
-        Identifier of the software used for the calculation.
+    combined : dict or None
+        The saved energies and boundaries, or None if the combined NEB has to be rebuilt.
+
     """
-    if "ORCA-job qmscript_MEP" in line:
-        return "ORCA-MEP"
-    elif "ORCA-job qmscript_IRC_Full" in line:
-        return "ORCA-IRC"
-    elif "ORCA-job qmscript" in line:
-        return "ORCA"
-    elif "Converged     Job" in line:
-        return "TeraChem-scan"
-    elif "TeraChem" in line:
-        return "TeraChem-opt"
-    else:
-        raise ValueError(f"Could not identify software from line: {line}")
+    if not os.path.exists(xyz_out):
+        return None
+    combined = pyqmmm.qm.traj_indexer.load_sidecar(data_file, xyz_out, COMBINED_VERSION, COMBINED_FIELDS)
+    if combined is None:
+        return None
+    if combined["files"].tolist() != list(xyz_files):
+        return None
+    if not np.array_equal(combined["signatures"], segment_signatures(xyz_files)):
+        return None
 
-def format_plot() -> None:
+    return combined
+
+
+def build_combined_neb(xyz_files, xyz_out=COMBINED_XYZ, data_file=COMBINED_DATA):
     """
-    General plotting parameters.
+    Merge NEB trajectories into one trajectory and energy array.
+
+    Energies come from the comment lines located with each NEB's frame index,
+    and frames are copied into the merged trajectory without being decoded.
+    When a NEB starts where the previous one ended, the repeated frame is dropped.
+
+    Parameters
+    ----------
+    xyz_files : list
+        Paths to the NEB trajectories, in order.
+    xyz_out : str
+        The merged trajectory to write.
+    data_file : str
+        Where to save the energies and boundaries for later runs.
+
+    Returns
+    -------
+    combined : dict
+        The energy of every merged frame in Hartrees and the frame of each NEB boundary.
 
     """
-    font = {"family": "sans-serif", "weight": "bold", "size": 10}
-    plt.rc("font", **font)
-    plt.rcParams["xtick.major.pad"] = 5
-    plt.rcParams["ytick.major.pad"] = 5
-    plt.rcParams["axes.linewidth"] = 2
-    plt.rcParams["xtick.major.size"] = 7
-    plt.rcParams["xtick.major.width"] = 2
-    plt.rcParams["ytick.major.size"] = 7
-    plt.rcParams["ytick.major.width"] = 2
-    plt.rcParams["xtick.direction"] = "in"
-    plt.rcParams["ytick.direction"] = "in"
-    plt.rcParams["xtick.top"] = True
-    plt.rcParams["ytick.right"] = True
-    plt.rcParams["svg.fonttype"] = "none"
+    energies = []
+    boundaries = []
+    frame_count = 0
+    with open(xyz_out, "wb") as out_file:
+        for idx, filename in enumerate(xyz_files):
+            index = pyqmmm.qm.traj_indexer.get_frame_index(filename)
+            file_energies = pyqmmm.qm.traj_indexer.read_energies(filename, index=index)
+            frames = list(range(len(file_energies)))
+            if idx > 0:
+                if is_duplicate_frame(xyz_files[idx - 1], filename):
+                    # The shared endpoint is kept once and marks the boundary
+                    frames = frames[1:]
+                    boundaries.append(frame_count - 1)
+                else:
+                    boundaries.append(frame_count - 0.5)
+            pyqmmm.qm.traj_indexer.copy_frames(filename, frames, out_file, index)
+            energies.append(file_energies[frames])
+            frame_count += len(frames)
+
+    combined = {
+        "files": np.array(xyz_files, dtype=str),
+        "signatures": segment_signatures(xyz_files),
+        "energies": np.concatenate(energies) if energies else np.empty(0),
+        "boundaries": np.array(boundaries, dtype=np.float64),
+    }
+    pyqmmm.qm.traj_indexer.save_sidecar(data_file, xyz_out, COMBINED_VERSION, combined)
+
+    return combined
+
+
+def get_combined_neb(xyz_files, xyz_out=COMBINED_XYZ, data_file=COMBINED_DATA):
+    """
+    Get the combined NEB, only rebuilding it if a NEB has changed since the last run.
+
+    Parameters
+    ----------
+    xyz_files : list
+        Paths to the NEB trajectories, in order.
+    xyz_out : str
+        The merged trajectory.
+    data_file : str
+        The energies and boundaries saved alongside the merged trajectory.
+
+    Returns
+    -------
+    combined : dict
+        The energy of every merged frame in Hartrees and the frame of each NEB boundary.
+
+    """
+    combined = load_combined_neb(xyz_files, xyz_out, data_file)
+    if combined is None:
+        combined = build_combined_neb(xyz_files, xyz_out, data_file)
+
+    return combined
+
 
 def collect_data():
     """
@@ -164,48 +231,13 @@ def collect_data():
     float
         The first frame energy of the first NEB in kcal/mol.
     list
-        A list of cumulative frame counts where each NEB ends.
+        A list of the frames where each NEB ends.
     """
-    xyz_files = get_xyz_files()
-    energies_by_file = {}
-    first_energies = []
-    frames_per_neb = []
-
-    for idx, filename in enumerate(xyz_files):
-        with open(filename, "r") as f:
-            # read two lines to get to the software info
-            f.readline()
-            software_line = f.readline()
-            software = identify_software(software_line)
-
-        energies_kcal_abs, first_energy_kcal, energies_hartrees = get_trajectory_energies(filename, software)
-        energies_by_file[filename] = energies_kcal_abs
-        first_energies.append(first_energy_kcal)
-
-        if idx < len(xyz_files) - 1:
-            frames_per_neb.append(len(energies_kcal_abs) - 1)  # Exclude last frame
-        else:
-            frames_per_neb.append(len(energies_kcal_abs))  # Include last frame for the last NEB
-
-    # Compute cumulative frames to get NEB boundaries
-    cumulative_frames = [0]
-    for frames in frames_per_neb:
-        cumulative_frames.append(cumulative_frames[-1] + frames)
-
-    # NEB boundaries (excluding the final total frame count)
-    neb_boundaries = cumulative_frames[1:-1]
-
-    first_energy_kcal_of_first_neb = first_energies[0]
-
-    # Concatenate energies, excluding duplicate frames
-    total_energies_abs = []
-    for idx, filename in enumerate(xyz_files):
-        energies = energies_by_file[filename]
-        if idx < len(xyz_files) - 1:
-            energies = energies[:-1]  # Exclude last frame except for last NEB
-        total_energies_abs.extend(energies)
-
-    return total_energies_abs, first_energy_kcal_of_first_neb, neb_boundaries
+    combined = get_combined_neb(get_xyz_files())
+    total_energies_abs = (combined["energies"] * HARTREE_TO_KCAL).tolist()
+    neb_boundaries = combined["boundaries"].tolist()
+
+    return total_energies_abs, total_energies_abs[0], neb_boundaries
 
 def plot_data(total_energies_abs, first_energy_kcal_of_first_neb, dim_list, neb_boundaries):
     """
@@ -295,7 +327,8 @@ def plot_energies():
     job_summary = f"""
         --------------------------ENERGY PLOTTER END--------------------------
         RESULT: Plotted energies for combined NEBs.
-        OUTPUT: Created a plot called 'energy_plot.png' and a CSV file called 'energy_plot_data.csv' in the current directory.
+        OUTPUT: Created a plot called 'energy_plot.png', a CSV file called 'energy_plot_data.csv'
+                and a merged trajectory called '{COMBINED_XYZ}' in the current directory.
         TIME: Total execution time: {total_time} seconds.
         --------------------------------------------------------------------\n
         """
@@ -1,8 +1,9 @@
 """Extract RC against energy and generate CSV."""
 
-from scipy.spatial import distance
 import numpy as np
 import os
+import pyqmmm.qm.traj_cache
+import pyqmmm.qm.trajectory
 
 
 def request_rc(rc_request):
@@ -29,6 +30,223 @@ def request_rc(rc_request):
     return atoms, request
 
 
+def get_converged_frames(xyz_file):
+    """
+    Load the converged frames of a scan from the trajectory's cache.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+
+    Returns
+    -------
+    coordinates : numpy.ndarray
+        An (n_frames, n_atoms, 3) array with the coordinates of the converged frames.
+    energies : numpy.ndarray
+        The energy of each converged frame in Hartrees.
+
+    """
+    cache = pyqmmm.qm.traj_cache.get_cache(xyz_file)
+    converged = np.char.startswith(cache["comments"], "Converged")
+    if "coordinates" in cache:
+        return cache["coordinates"][converged], cache["energies"][converged]
+
+    # Ragged trajectories are not cached, so only decode the converged frames
+    frames = np.flatnonzero(converged)
+    blocks = [coordinates for _, _, coordinates in pyqmmm.qm.trajectory.iter_coordinate_chunks(xyz_file, frames=frames)]
+    coordinates = np.concatenate(blocks) if blocks else np.empty((0, 0, 3))
+
+    return coordinates, cache["energies"][converged]
+
+
+def compute_distances(coordinates, pairs):
+    """
+    Distances between atom pairs for every frame at once.
+
+    Parameters
+    ----------
+    coordinates : numpy.ndarray
+        An (n_frames, n_atoms, 3) coordinate array.
+    pairs : numpy.ndarray
+        A (n_pairs, 2) array of zero-based atom indices.
+
+    Returns
+    -------
+    numpy.ndarray
+        An (n_frames, n_pairs) array of distances.
+
+    """
+    pairs = np.asarray(pairs, dtype=int).reshape(-1, 2)
+    bond = coordinates[:, pairs[:, 1]] - coordinates[:, pairs[:, 0]]
+
+    return np.linalg.norm(bond, axis=-1)
+
+
+def compute_angles(coordinates, triples):
+    """
+    Angles in degrees defined by atom triples for every frame at once.
+
+    Parameters
+    ----------
+    coordinates : numpy.ndarray
+        An (n_frames, n_atoms, 3) coordinate array.
+    triples : numpy.ndarray
+        A (n_angles, 3) array of zero-based atom indices with the vertex in the middle.
+
+    Returns
+    -------
+    numpy.ndarray
+        An (n_frames, n_angles) array of angles.
+
+    """
+    triples = np.asarray(triples, dtype=int).reshape(-1, 3)
+    bond_1 = coordinates[:, triples[:, 0]] - coordinates[:, triples[:, 1]]
+    bond_2 = coordinates[:, triples[:, 2]] - coordinates[:, triples[:, 1]]
+    cosine = np.einsum("fkx,fkx->fk", bond_1, bond_2)
+    cosine /= np.linalg.norm(bond_1, axis=-1) * np.linalg.norm(bond_2, axis=-1)
+
+    return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+
+def compute_dihedrals(coordinates, quads):
+    """
+    Dihedral angles in degrees defined by atom quadruples for every frame at once.
+
+    Parameters
+    ----------
+    coordinates : numpy.ndarray
+        An (n_frames, n_atoms, 3) coordinate array.
+    quads : numpy.ndarray
+        A (n_dihedrals, 4) array of zero-based atom indices.
+
+    Returns
+    -------
+    numpy.ndarray
+        An (n_frames, n_dihedrals) array of dihedrals between -180 and 180 degrees.
+
+    """
+    quads = np.asarray(quads, dtype=int).reshape(-1, 4)
+    bond_1 = coordinates[:, quads[:, 1]] - coordinates[:, quads[:, 0]]
+    bond_2 = coordinates[:, quads[:, 2]] - coordinates[:, quads[:, 1]]
+    bond_3 = coordinates[:, quads[:, 3]] - coordinates[:, quads[:, 2]]
+    normal_1 = np.cross(bond_1, bond_2)
+    normal_2 = np.cross(bond_2, bond_3)
+    x = np.einsum("fkx,fkx->fk", normal_1, normal_2)
+    y = np.linalg.norm(bond_2, axis=-1) * np.einsum("fkx,fkx->fk", bond_1, normal_2)
+
+    return np.degrees(np.arctan2(y, x))
+
+
+def parse_rc_definitions(request):
+    """
+    Parse reaction coordinate definitions such as 1_2,1_2_3,1_2_3_4.
+
+    Atoms are listed one by one, so the kind of each coordinate is explicit.
+    Hyphenated ranges are rejected because 1-3 could mean a distance or an angle.
+
+    Parameters
+    ----------
+    request : str
+        Comma-separated definitions with atoms joined by underscores.
+
+    Returns
+    -------
+    definitions : list
+        One-based atom indices for each reaction coordinate.
+
+    """
+    definitions = []
+    for rc in request.split(","):
+        fields = rc.strip().split("_")
+        if not all(field.strip().isdigit() for field in fields):
+            raise ValueError(f"List every atom of {rc.strip()} separated by underscores, ranges are not allowed.")
+        atoms = [int(field) for field in fields]
+        # Atoms are numbered from 1, so 0 would wrap around to the last atom
+        if any(atom < 1 for atom in atoms):
+            raise ValueError(f"Atoms are numbered from 1, cannot use {rc.strip()}.")
+        definitions.append(atoms)
+
+    return definitions
+
+
+def rc_label(atoms):
+    """
+    Name a reaction coordinate from its atoms, e.g., d(1-2), a(1-2-3) or t(1-2-3-4).
+
+    """
+    kind = {2: "d", 3: "a", 4: "t"}[len(atoms)]
+    return f"{kind}({'-'.join(str(atom) for atom in atoms)})"
+
+
+def compute_reaction_coordinates(coordinates, definitions):
+    """
+    Compute any number of distances, angles and dihedrals in one vectorized pass.
+
+    Parameters
+    ----------
+    coordinates : numpy.ndarray
+        An (n_frames, n_atoms, 3) coordinate array.
+    definitions : list
+        One-based atom indices for each reaction coordinate.
+        Two atoms define a distance, three an angle and four a dihedral.
+
+    Returns
+    -------
+    numpy.ndarray
+        An (n_frames, n_definitions) array in the same order as the definitions.
+
+    """
+    calculators = {2: compute_distances, 3: compute_angles, 4: compute_dihedrals}
+    atom_count = coordinates.shape[1]
+    for atoms in definitions:
+        if any(atom < 1 or atom > atom_count for atom in atoms):
+            name = "_".join(str(atom) for atom in atoms)
+            raise ValueError(f"Atoms are numbered 1 to {atom_count}, cannot use {name}.")
+    values = np.empty((len(coordinates), len(definitions)))
+    for atom_count, calculator in calculators.items():
+        columns = [i for i, atoms in enumerate(definitions) if len(atoms) == atom_count]
+        if columns:
+            atoms = np.array([definitions[i] for i in columns]) - 1
+            values[:, columns] = calculator(coordinates, atoms)
+    unsupported = [atoms for atoms in definitions if len(atoms) not in calculators]
+    if unsupported:
+        raise ValueError(f"Reaction coordinates need 2, 3 or 4 atoms: {unsupported}")
+
+    return values
+
+
+def write_rc_table(xyz_file, definitions, out_file="rc_table.csv"):
+    """
+    Write every requested reaction coordinate alongside the scan energies.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    definitions : list
+        One-based atom indices for each reaction coordinate.
+    out_file : str
+        The name of the output CSV file.
+
+    Returns
+    -------
+    values : numpy.ndarray
+        An (n_frames, n_definitions) array of the reaction coordinates.
+
+    """
+    coordinates, _ = get_converged_frames(xyz_file)
+    values = compute_reaction_coordinates(coordinates, definitions)
+    DE_list, E_list = get_opt_energies(xyz_file)
+
+    header = ["Frame", "E (Hartree)", "DE (kcal/mol)"] + [rc_label(atoms) for atoms in definitions]
+    table = np.column_stack((np.arange(1, len(values) + 1), E_list, DE_list, values))
+    np.savetxt(out_file, table, delimiter=",", header=",".join(header), comments="",
+               fmt=["%d", "%.10f", "%.6f"] + ["%.6f"] * len(definitions))
+
+    return values
+
+
 def get_distance(atoms, xyz_file):
     """
     Calculates the reaction coordinate at each step of the scan in the xyz file.
@@ -44,23 +262,11 @@ def get_distance(atoms, xyz_file):
         List of values mapping to the distance that two atoms have moved.
 
     """
-    atom_count = 0
-    coords_list = []
-    dist_list = []
-    with open(xyz_file, "r") as scan_optim:
-        for line in scan_optim:
-            if line[:9] == "Converged":
-                atom_count = 0
-            if atom_count in atoms:
-                line_elements = line.split()
-                coords = line_elements[1:4]
-                coords_list.append(list(map(float, coords)))
-                if len(coords_list) and len(coords_list) % 2 == 0:
-                    atom_1 = tuple(coords_list[-1])
-                    atom_2 = tuple(coords_list[-2])
-                    dist = distance.euclidean(atom_1, atom_2)
-                    dist_list.append(dist)
-            atom_count += 1
+    # A hyphenated range such as 1-3 expands to three atoms, which would silently be an angle
+    if len(atoms) != 2:
+        raise ValueError(f"A distance needs exactly two atoms, got {len(atoms)}: {list(atoms)}")
+    coordinates, _ = get_converged_frames(xyz_file)
+    dist_list = compute_reaction_coordinates(coordinates, [atoms])[:, 0].tolist()
 
     return dist_list
 
@@ -77,20 +283,10 @@ def get_opt_energies(xyz_file):
         Returns a list of the energies extracted from the .out file.
 
     """
-    DE_list = []
-    E_list = []
-    with open(xyz_file, "r") as file:
-        first_energy = None
-        for line in file:
-            if line[:9] == "Converged":
-                line = line.split()
-                energy = float(line[4])
-                if first_energy is None:
-                    first_energy = energy
-                relative_energy = (energy - first_energy) * 627.5
-                absolute_energy = energy
-                DE_list.append(relative_energy)
-                E_list.append(absolute_energy)
+    # Energies are parsed once and then loaded from the trajectory's cache
+    _, energies = get_converged_frames(xyz_file)
+    E_list = energies.tolist()
+    DE_list = ((energies - energies[0]) * 627.5).tolist() if len(energies) else []
 
     # Return lists of relative and absolute energies
     return DE_list, E_list
@@ -165,6 +361,12 @@ def reaction_coordinate_collector():
     get_reaction_csv(diff_dist_list, rc1_dist_list, "dd_v_rc1")
     get_reaction_csv(diff_dist_list, rc2_dist_list, "dd_v_rc2")
 
+    # Any number of distances, angles and dihedrals can be tabulated in one pass
+    extra_request = input("   > Extra RCs for rc_table.csv (e.g., 1_2,1_2_3,1_2_3_4), else Return: ")
+    if extra_request:
+        definitions = parse_rc_definitions(extra_request)
+        write_rc_table(xyz_file, definitions)
+
 
 if __name__ == "__main__":
     reaction_coordinate_collector()
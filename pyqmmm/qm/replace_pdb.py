@@ -1,5 +1,6 @@
 from Bio.PDB import PDBParser, PDBIO
 import pandas as pd
+from pyqmmm.qm.trajectory import Trajectory
 
 
 def read_info(info_file_path):
@@ -7,31 +8,10 @@ def read_info(info_file_path):
 
 
 def read_xyz_last_frame(xyz_file_path):
-    with open(xyz_file_path, "r") as file:
-        lines = file.readlines()
+    # Only the final frame is decoded, the rest of the trajectory is never parsed
+    last_frame = Trajectory.from_xyz(xyz_file_path)[-1]
 
-    # Determine the number of lines in one frame. The first two lines contain
-    # the atom count and a comment, respectively. The rest are atom lines.
-    num_atoms = int(lines[0].strip())
-    lines_per_frame = num_atoms + 2
-
-    # Get the lines of the final frame. Exclude the atom count and comment lines.
-    last_frame_lines = lines[-lines_per_frame + 2 :]
-
-    # Check if the last line is blank
-    if last_frame_lines[-1].strip() == "":
-        # If it is, remove it
-        last_frame_lines = last_frame_lines[:-1]
-
-    # Split each line into its components and convert to float
-    data = {"X": [], "Y": [], "Z": []}
-    for line in last_frame_lines:
-        _, x, y, z = line.split()
-        data["X"].append(float(x))
-        data["Y"].append(float(y))
-        data["Z"].append(float(z))
-
-    return pd.DataFrame(data)
+    return pd.DataFrame(last_frame, columns=["X", "Y", "Z"])
 
 
 def replace_coordinates_in_pdb(
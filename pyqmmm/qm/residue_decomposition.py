@@ -3,6 +3,8 @@
 import os
 import re
 import pandas as pd
+import pyqmmm.qm.output_crawler
+import pyqmmm.qm.tail_reader
 import matplotlib.pyplot as plt
 from matplotlib.ticker import AutoMinorLocator
 
@@ -41,12 +43,11 @@ def get_energy(filename):
         Final energy found in the file, or None if not found.
 
     """
-    final_energy = None
-    with open(filename, 'r') as file:
-        for line in file:
-            if "FINAL ENERGY:" in line:
-                final_energy = float(line.split()[2])
-    return final_energy
+    # Only the end of the file is read since just the last energy is needed
+    line = pyqmmm.qm.tail_reader.read_last_line_with(filename, "FINAL ENERGY:")
+    if line is None:
+        return None
+    return float(line.split()[2])
 
 
 def process_directory(path, ignore):
@@ -66,17 +67,35 @@ def process_directory(path, ignore):
         Dictionary of {dir_name: energy} pairs.
     
     """
+    outputs = pyqmmm.qm.output_crawler.find_outputs(path, 'qmscript.out', ignore)
+    return collect_energies(outputs)
+
+
+def collect_energies(outputs, results=None):
+    """
+    Retrieves the final energy of many outputs in parallel, reusing cached energies.
+
+    Parameters
+    ----------
+    outputs : list
+        Paths to 'qmscript.out' files.
+    results : dict
+        Energies already crawled, keyed by output path.
+        The outputs are crawled if not given.
+
+    Returns
+    -------
+    dict
+        Dictionary of {dir_name: energy} pairs.
+
+    """
+    if results is None:
+        results = pyqmmm.qm.output_crawler.crawl(outputs, get_energy)
     energies = {}
-    paths_to_process = []
-    for root, dirs, files in os.walk(path):
-        if 'qmscript.out' in files and os.path.basename(root) not in ignore:
-            paths_to_process.append(root)
-            
-    for path in paths_to_process:
-        dir_name = os.path.basename(path)
-        energy = get_energy(os.path.join(path, 'qmscript.out'))
+    for output in outputs:
+        energy = results[output]
         if energy:
-            energies[dir_name] = energy
+            energies[os.path.basename(os.path.dirname(output))] = energy
     return energies
 
 
@@ -165,13 +184,17 @@ def residue_decomposition():
     kcal_per_hartree = 627.509  # Replace with the correct conversion factor
 
     base_path = './'  # Replace with the correct path to the base directory
-    data = {}
+    outputs = {}
     for folder_name in sorted(os.listdir(base_path), key=natural_sort):
         if folder_name in ignore:
             continue
         folder_path = os.path.join(base_path, folder_name)
         if os.path.isdir(folder_path):
-            data[folder_name] = process_directory(folder_path, ignore)
+            outputs[folder_name] = pyqmmm.qm.output_crawler.find_outputs(folder_path, 'qmscript.out', ignore)
+
+    # Parse every output of every folder in one parallel pass and share the results
+    results = pyqmmm.qm.output_crawler.crawl([output for paths in outputs.values() for output in paths], get_energy)
+    data = {folder_name: collect_energies(paths, results) for folder_name, paths in outputs.items()}
 
     df = pd.DataFrame(data)
     df = df.applymap(lambda x: x * kcal_per_hartree if pd.notnull(x) else x)
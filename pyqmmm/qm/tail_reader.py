@@ -0,0 +1,145 @@
+"""Search QM output files backwards from the end for the last occurrence of markers."""
+
+import os
+
+BLOCK_SIZE = 1 << 16  # Bytes read at a time when searching from the end of a file
+
+
+def find_last_offsets(file_name, markers, block_size=BLOCK_SIZE, limit=None):
+    """
+    Find the byte offset of the last occurrence of each marker.
+
+    The file is read backwards one block at a time
+    and the search stops as soon as every marker has been found.
+
+    Parameters
+    ----------
+    file_name : str
+        Path to the file.
+    markers : list
+        The text to search for.
+    block_size : int
+        The number of bytes read at a time.
+    limit : int
+        The most bytes to search from the end of the file, the whole file if not given.
+
+    Returns
+    -------
+    offsets : dict
+        The offset of the last occurrence of each marker, None if a marker was not found.
+
+    """
+    needles = {marker: marker.encode() for marker in markers}
+    overlap = max(len(needle) for needle in needles.values()) - 1
+    offsets = dict.fromkeys(markers)
+    with open(file_name, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        carry = b""
+        while position > 0 and None in offsets.values():
+            if limit is not None and end - position >= limit:
+                break
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            # Keep the start of the later block so markers split between blocks are found
+            block = f.read(read_size) + carry
+            for marker, needle in needles.items():
+                if offsets[marker] is None:
+                    found = block.rfind(needle)
+                    if found != -1:
+                        offsets[marker] = position + found
+            carry = block[:overlap]
+
+    return offsets
+
+
+def find_line_start(f, offset, block_size=BLOCK_SIZE):
+    """
+    Find where the line holding a byte offset starts.
+
+    Parameters
+    ----------
+    f : file
+        A file opened in binary mode.
+    offset : int
+        A byte offset in the file.
+    block_size : int
+        The number of bytes read at a time.
+
+    Returns
+    -------
+    int
+        The offset of the first byte of the line.
+
+    """
+    position = offset
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        newline = f.read(read_size).rfind(b"\n")
+        if newline != -1:
+            return position + newline + 1
+
+    return 0
+
+
+def read_trailing_sections(file_name, markers, block_size=BLOCK_SIZE, limit=None):
+    """
+    Read everything from the last occurrence of each marker to the end of the file.
+
+    Parameters
+    ----------
+    file_name : str
+        Path to the file.
+    markers : list
+        The text to search for.
+    block_size : int
+        The number of bytes read at a time.
+    limit : int
+        The most bytes to search from the end of the file, the whole file if not given.
+
+    Returns
+    -------
+    sections : dict
+        The text from the start of the line holding each marker to the end of the file,
+        None if a marker was not found.
+
+    """
+    offsets = find_last_offsets(file_name, markers, block_size, limit)
+    sections = dict.fromkeys(markers)
+    with open(file_name, "rb") as f:
+        for marker, offset in offsets.items():
+            if offset is not None:
+                f.seek(find_line_start(f, offset, block_size))
+                sections[marker] = f.read().decode(errors="replace")
+
+    return sections
+
+
+def read_last_line_with(file_name, marker, block_size=BLOCK_SIZE):
+    """
+    Find the last line of a file that contains a marker.
+
+    Parameters
+    ----------
+    file_name : str
+        Path to the file.
+    marker : str
+        The text to search for.
+    block_size : int
+        The number of bytes read at a time.
+
+    Returns
+    -------
+    str
+        The last line containing the marker, or None if no line does.
+
+    """
+    offset = find_last_offsets(file_name, [marker], block_size)[marker]
+    if offset is None:
+        return None
+    with open(file_name, "rb") as f:
+        f.seek(find_line_start(f, offset, block_size))
+        return f.readline().decode(errors="replace").rstrip("\r\n")
@@ -3,6 +3,8 @@
 import os
 import sys
 import numpy
+import pyqmmm.qm.traj_indexer
+import pyqmmm.qm.trajectory
 from typing import List
 
 
@@ -28,7 +30,121 @@ def get_selection():
     return selection
 
 
-def remove_atoms(selection: List[int]) -> List[List[str]]:
+def read_pdb_template(template_file):
+    """
+    Pre-parse the atom records of a PDB template into a format string for one model.
+
+    Parameters
+    ----------
+    template_file : str
+        The PDB file whose atom records match the atoms kept in the trajectory.
+
+    Returns
+    -------
+    model_format : str
+        The atom records of one model with placeholders for the x, y and z coordinates.
+    atom_count : int
+        The number of atom records in the template.
+
+    """
+    records = []
+    with open(template_file, "r") as template:
+        for line in template:
+            if line.startswith(("ATOM", "HETATM")):
+                line = line.rstrip("\n").ljust(54).replace("%", "%%")
+                records.append(f"{line[:30]}%8.3f%8.3f%8.3f{line[54:]}\n")
+
+    return "".join(records), len(records)
+
+
+def filter_trajectory(xyz_file, selection, xyz_out=None, pdb_out=None, template_file="template.pdb", chunk_size=1000):
+    """
+    Remove atoms from every frame of a trajectory in a single streaming pass.
+
+    A boolean atom mask is applied to a whole block of frames at once
+    and the result is written straight to an xyz file, a multi-model PDB or both.
+
+    Parameters
+    ----------
+    xyz_file : str
+        The xyz trajectory to filter.
+    selection : list[int]
+        One-based indices of the atoms to remove.
+    xyz_out : str
+        The name of the filtered xyz file, not written if not given.
+    pdb_out : str
+        The name of the multi-model PDB file, not written if not given.
+    template_file : str
+        The PDB template with one atom record per kept atom, used for pdb_out.
+    chunk_size : int
+        The number of frames decoded at a time.
+
+    Returns
+    -------
+    frame_count : int
+        The number of frames written.
+
+    """
+    index = pyqmmm.qm.traj_indexer.get_frame_index(xyz_file)
+    comments = pyqmmm.qm.traj_indexer.read_comment_lines(xyz_file, index)
+    atom_count = int(index["atom_counts"][0]) if len(comments) else 0
+    selection = numpy.asarray(selection, dtype=int)
+    # Atoms are numbered from 1, so 0 or negative indices would wrap around to the last atoms
+    invalid = selection[(selection < 1) | (selection > atom_count)]
+    if len(invalid):
+        raise ValueError(f"   > Atoms are numbered 1 to {atom_count}, cannot remove {invalid.tolist()}.")
+    keep = numpy.ones(atom_count, dtype=bool)
+    keep[selection - 1] = False
+    kept_count = int(keep.sum())
+
+    if pdb_out:
+        model_format, template_count = read_pdb_template(template_file)
+        if template_count != kept_count:
+            raise ValueError(f"   > {template_file} has {template_count} atoms but {kept_count} atoms are kept.")
+
+    xyz_traj_out = open(xyz_out, "w") if xyz_out else None
+    pdb_traj_out = open(pdb_out, "w") if pdb_out else None
+    frame_format = None
+    try:
+        for frames, elements, coordinates in pyqmmm.qm.trajectory.iter_coordinate_chunks(xyz_file, chunk_size, index):
+            kept = coordinates[:, keep]
+            if frame_format is None:
+                frame_format = pyqmmm.qm.trajectory.xyz_frame_format(elements[keep])
+            for frame, frame_coordinates in zip(frames, kept):
+                values = tuple(frame_coordinates.ravel())
+                if xyz_traj_out:
+                    xyz_traj_out.write(f"{kept_count}\n{comments[frame]}\n")
+                    xyz_traj_out.write(frame_format % values)
+                if pdb_traj_out:
+                    pdb_traj_out.write(f"MODEL     {frame + 1:4d}\n")
+                    pdb_traj_out.write(model_format % values)
+                    pdb_traj_out.write("TER\nENDMDL\n")
+    finally:
+        for out_file in (xyz_traj_out, pdb_traj_out):
+            if out_file:
+                out_file.close()
+
+    return len(comments)
+
+
+def get_xyz_file():
+    """
+    Find the single xyz trajectory in the current directory.
+
+    Returns
+    -------
+    xyz_file : str
+        The name of the xyz file.
+
+    """
+    xyz_files = [f for f in os.listdir(".") if f.endswith("xyz")]
+    if len(xyz_files) != 1:
+        raise ValueError("   > More than one .xyz file found.")
+
+    return xyz_files[0]
+
+
+def remove_atoms(selection: List[int]) -> int:
     """
     Removes an atom and creates a new xyz.
 
@@ -41,48 +157,13 @@ def remove_atoms(selection: List[int]) -> List[List[str]]:
     selection : list[int]
         A list of atoms.
 
+    Returns
+    -------
+    frame_count : int
+        The number of frames written to new_traj.xyz.
+
     """
-    # Search the current directory for the .xyz file
-    xyz_files = [f for f in os.listdir(".") if f.endswith("xyz")]
-    if len(xyz_files) != 1:
-        raise ValueError("   > More than one .xyz file found.")
-    xyz_file = xyz_files[0]
-
-    # Lines in the molecule plus the header lines
-    with open(xyz_file) as traj_orig:
-        section_length = int(traj_orig.readline().strip()) + 2
-
-    with open(xyz_file) as traj_orig:
-        # Convert file to list of lists
-        unsorted_lines: list[str] = []
-        for line in traj_orig:
-            stripped_line = line.strip()
-            unsorted_lines.append(stripped_line)
-
-        # Place each frame in its own list
-        n = section_length
-        frames = [
-            unsorted_lines[i * n : (i + 1) * n]
-            for i in range((len(unsorted_lines) + n - 1) // n)
-        ]
-        new_frames: list[list[str]] = []
-
-        # Loop over the frames and delete all rows that match the selection
-        for frame in frames:
-            for index in sorted(selection, reverse=True):
-                index += 1
-                del frame[index]
-            # Update the header line to match the new atom count
-            frame[0] = str(int(frame[0]) - len(selection))
-            new_frames.append(frame)
-
-    # Write out the new xyz file
-    new_traj_out = open("new_traj.xyz", "w")
-    for frame in new_frames:
-        for line in frame:
-            new_traj_out.write(line + "\n")
-
-    return new_frames
+    return filter_trajectory(get_xyz_file(), selection, xyz_out="new_traj.xyz")
 
 
 def get_pdb_ensemble():
@@ -91,35 +172,7 @@ def get_pdb_ensemble():
     Creates a PDB ensemble file.
 
     """
-    # Initialize files
-    template = open("template.pdb", "r").readlines()
-    xyz_file = open("new_traj.xyz", "r").readlines()
-    pdb_file = open("new_traj.pdb", "w")
-
-    # Initialize count variables
-    max_atom = int(
-        open("template.pdb", "r").readlines()[-1].split()[1]
-    )  # Final atom number
-    atom = -1  # Account for two header lines in the xyz
-    model = 2  # MODEL 1 was already written
-
-    pdb_file.write("MODEL        1\n")
-    for index, line in enumerate(xyz_file):
-        # If we have passed the xyz header lines
-        if atom > 0:
-            x, y, z = line.strip("\n").split()[1:5]
-            pdb_file.write(
-                f"{template[atom - 1][0:32]}{x[0:6]}  {y[0:6]}  {z[0:6]}{template[atom - 1][54:80]}\n"
-            )
-            atom += 1
-        # If it is the first line continue
-        else:
-            atom += 1
-        # If we have reached the end of the file
-        if atom > max_atom:
-            pdb_file.write(f"TER\nENDMDL\nMODEL        {model}\n")
-            atom = -1
-            model += 1
+    filter_trajectory("new_traj.xyz", [], pdb_out="new_traj.pdb")
 
 
 def traj_atom_filter():
@@ -132,9 +185,11 @@ def traj_atom_filter():
     print("Reads in a template file called template.pdb.\n")
 
     if not os.path.exists("new_traj.xyz"):
+        # Filter the atoms and write both the xyz and the PDB ensemble in one pass
         selection = get_selection()
-        remove_atoms(selection)
-    get_pdb_ensemble()
+        filter_trajectory(get_xyz_file(), selection, xyz_out="new_traj.xyz", pdb_out="new_traj.pdb")
+    else:
+        get_pdb_ensemble()
 
 
 # Executes the function when run as a script
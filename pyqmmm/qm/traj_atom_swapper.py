@@ -1,5 +1,9 @@
 """Swap any two atoms in an xyz."""
 
+import os
+import numpy as np
+import pyqmmm.qm.traj_indexer
+import pyqmmm.qm.trajectory
 from typing import NoReturn, List, Tuple
 
 
@@ -125,19 +129,242 @@ def write_scan(
                 newfile.write(line)
 
 
+def swaps_to_permutation(swaps: List[Tuple[int, int]], atom_count: int) -> np.ndarray:
+    """
+    Combine a list of atom swaps into a single permutation.
+
+    Parameters
+    ----------
+    swaps : list[tuple[int, int]]
+        One-based atom pairs to swap, applied in order.
+    atom_count : int
+        The number of atoms in the system.
+
+    Returns
+    -------
+    permutation : numpy.ndarray
+        Zero-based indices where new atom i takes the data of old atom permutation[i].
+
+    """
+    permutation = np.arange(atom_count)
+    for atom1, atom2 in swaps:
+        # Atoms are numbered from 1, so 0 would wrap around to the last atom
+        if not (1 <= atom1 <= atom_count and 1 <= atom2 <= atom_count):
+            raise ValueError(f"   > Atoms are numbered 1 to {atom_count}, cannot swap {atom1}_{atom2}.")
+        permutation[[atom1 - 1, atom2 - 1]] = permutation[[atom2 - 1, atom1 - 1]]
+    if not np.array_equal(np.sort(permutation), np.arange(atom_count)):
+        raise ValueError(f"   > The swaps {swaps} do not give a permutation of {atom_count} atoms.")
+
+    return permutation
+
+
+def permute_xyz(filename: str, permutation: np.ndarray, out_file: str, chunk_size: int = 1000) -> int:
+    """
+    Reorder the atoms of every frame of an xyz trajectory.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the xyz trajectory.
+    permutation : numpy.ndarray
+        Zero-based indices where new atom i takes the data of old atom permutation[i].
+    out_file : str
+        The name of the reordered xyz file.
+    chunk_size : int
+        The number of frames decoded at a time.
+
+    Returns
+    -------
+    frame_count : int
+        The number of frames written.
+
+    """
+    index = pyqmmm.qm.traj_indexer.get_frame_index(filename)
+    comments = pyqmmm.qm.traj_indexer.read_comment_lines(filename, index)
+    frame_format = None
+    with open(out_file, "w") as newfile:
+        for frames, elements, coordinates in pyqmmm.qm.trajectory.iter_coordinate_chunks(filename, chunk_size, index):
+            # The whole block of frames is reordered with one fancy-indexing call
+            permuted = coordinates[:, permutation]
+            if frame_format is None:
+                frame_format = pyqmmm.qm.trajectory.xyz_frame_format(elements[permutation])
+            for frame, frame_coordinates in zip(frames, permuted):
+                newfile.write(f"{len(permutation)}\n{comments[frame]}\n")
+                newfile.write(frame_format % tuple(frame_coordinates.ravel()))
+
+    return len(comments)
+
+
+def permute_table(filename: str, permutation: np.ndarray, out_file: str) -> int:
+    """
+    Reorder the per-atom rows of a .spin or .charge scan file.
+
+    Each scan step ends with an "End" line and each atom row starts with its atom number.
+    The atom numbers stay in place while the rest of each row follows the permutation,
+    so tools that select atoms by number see the relabeled data.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the .spin or .charge file.
+    permutation : numpy.ndarray
+        Zero-based indices where new atom i takes the data of old atom permutation[i].
+    out_file : str
+        The name of the reordered file.
+
+    Returns
+    -------
+    step_count : int
+        The number of scan steps written.
+
+    """
+    with open(filename, "r") as file:
+        lines = file.readlines()
+
+    # Find the atom rows of each scan step
+    atom_rows: List[List[int]] = []
+    step_rows: List[int] = []
+    for line_number, line in enumerate(lines):
+        tokens = line.split()
+        if tokens and tokens[0] == "End":
+            atom_rows.append(step_rows)
+            step_rows = []
+        elif tokens and tokens[0].isdigit():
+            step_rows.append(line_number)
+    if step_rows:
+        atom_rows.append(step_rows)
+    if any(len(rows) != len(permutation) for rows in atom_rows):
+        raise ValueError(f"   > Every step of {filename} must have {len(permutation)} atoms.")
+
+    # Split each row after its atom number so the numbers stay in place
+    row_numbers = np.array(atom_rows, dtype=int).reshape(-1, len(permutation))
+    numbers = np.empty(row_numbers.shape, dtype=object)
+    data = np.empty(row_numbers.shape, dtype=object)
+    for position, line_number in np.ndenumerate(row_numbers):
+        line = lines[line_number]
+        split = len(line) - len(line.lstrip()) + len(line.split(maxsplit=1)[0])
+        numbers[position], data[position] = line[:split], line[split:]
+
+    # Every scan step is relabeled with a single fancy-indexing call
+    new_lines = np.array(lines, dtype=object)
+    new_lines[row_numbers] = numbers + data[:, permutation]
+    with open(out_file, "w") as newfile:
+        newfile.writelines(new_lines.tolist())
+
+    return len(atom_rows)
+
+
+def permute_store(filename: str, permutation: np.ndarray, out_file: str) -> int:
+    """
+    Reorder the atoms of a scan_properties .npz file written by pes_organizer.
+
+    The charges and spins are (scan steps, atoms) arrays,
+    so every step is relabeled with a single fancy-indexing call.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the .npz file.
+    permutation : numpy.ndarray
+        Zero-based indices where new atom i takes the data of old atom permutation[i].
+    out_file : str
+        The name of the reordered .npz file.
+
+    Returns
+    -------
+    step_count : int
+        The number of scan steps written.
+
+    """
+    with np.load(filename) as store:
+        properties = {key: store[key] for key in store.files}
+    if len(properties["elements"]) != len(permutation):
+        raise ValueError(f"   > {filename} must have {len(permutation)} atoms.")
+
+    properties["elements"] = properties["elements"][permutation]
+    for key in ("charges", "spins"):
+        if key in properties:
+            properties[key] = properties[key][:, permutation]
+    np.savez(out_file, **properties)
+
+    return len(properties["charges"])
+
+
+def apply_permutation(filenames: List[str], permutation: np.ndarray) -> List[str]:
+    """
+    Apply the same atom permutation to xyz trajectories and their spin and charge tables.
+
+    Parameters
+    ----------
+    filenames : list[str]
+        The .xyz, .spin and .charge files and scan_properties .npz files to relabel.
+    permutation : numpy.ndarray
+        Zero-based indices where new atom i takes the data of old atom permutation[i].
+
+    Returns
+    -------
+    out_files : list[str]
+        The names of the relabeled files, written as "{name}_swapped.{ext}".
+
+    """
+    out_files = []
+    for filename in filenames:
+        pre, ext = os.path.splitext(filename)
+        out_file = f"{pre}_swapped{ext}"
+        if ext == ".xyz":
+            permute_xyz(filename, permutation, out_file)
+        elif ext in (".spin", ".charge"):
+            permute_table(filename, permutation, out_file)
+        elif ext == ".npz":
+            permute_store(filename, permutation, out_file)
+        else:
+            raise ValueError(f"   > Unsupported file type {filename}")
+        out_files.append(out_file)
+
+    return out_files
+
+
+def get_atom_count(filename: str) -> int:
+    """
+    Get the number of atoms in an xyz trajectory, a scan_properties .npz or the first step of a scan table.
+
+    """
+    if filename.endswith(".xyz"):
+        with open(filename, "r") as file:
+            return int(file.readline())
+    if filename.endswith(".npz"):
+        with np.load(filename) as store:
+            return len(store["elements"])
+
+    atom_count = 0
+    with open(filename, "r") as file:
+        for line in file:
+            tokens = line.split()
+            if tokens and tokens[0] == "End":
+                break
+            if tokens and tokens[0].isdigit():
+                atom_count += 1
+
+    return atom_count
+
+
 def pair_swapper():
     print("\n.--------------.")
     print("| PAIR SWAPPER |")
     print(".--------------.\n")
     print("Sometimes atoms get switched between comparing scans.")
-    print("This script gives you a way to switch then back.\n")
-
-    filename = input("   > What is your xyz file name (e.g., 1.xyz, 2.spin)? ")
-    if filename.split(".")[-1] == "xyz":
-        lines_lists, skipped = swap_xyz(filename)
-    if filename.split(".")[-1] == "spin":
-        lines_lists, skipped = swap_spins(filename)
-    write_scan(filename, lines_lists, skipped)
+    print("This script gives you a way to switch then back.")
+    print("Several swaps can be applied to xyz, spin, charge and scan_properties .npz files at once.\n")
+
+    request = input("   > What files should be relabeled (e.g., 1.xyz,1.spin,1.charge,scan_properties_1.npz)? ")
+    filenames = [filename.strip() for filename in request.split(",")]
+    swaps_request = input("   > What atoms should be swapped (e.g., 12_15,16_18)? ")
+    swaps = [tuple(map(int, pair.split("_"))) for pair in swaps_request.split(",")]
+
+    # All swaps are combined and applied to every file in a single pass
+    permutation = swaps_to_permutation(swaps, get_atom_count(filenames[0]))
+    out_files = apply_permutation(filenames, permutation)
+    print(f"   > Relabeled files written to {', '.join(out_files)}")
 
 
 # Executes the function when run as a script
@@ -0,0 +1,187 @@
+"""Binary sidecar cache of parsed xyz trajectories for repeated QM analysis."""
+
+import numpy as np
+import pyqmmm.qm.traj_indexer
+from pyqmmm.qm.trajectory import Trajectory
+
+CACHE_SUFFIX = ".cache.npz"
+CACHE_VERSION = 1
+CACHE_FIELDS = ("coordinates", "elements", "comments", "energies", "software")
+
+
+def cache_path(xyz_file):
+    """
+    Get the name of the cache file that sits next to an xyz trajectory.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+
+    Returns
+    -------
+    str
+        Path to the cache file, e.g., scan_optim.xyz.cache.npz.
+
+    """
+    return f"{xyz_file}{CACHE_SUFFIX}"
+
+
+def comment_energies(comments, software=None):
+    """
+    Parse the energy of each frame from its comment line.
+
+    Parameters
+    ----------
+    comments : list
+        The comment line of each frame.
+    software : str
+        Software used for the calculation, identified from the first comment if not given.
+
+    Returns
+    -------
+    energies : numpy.ndarray
+        The energy of each frame in Hartrees, NaN where no energy could be parsed.
+        Use get_energies() to raise on such frames instead.
+
+    """
+    energies = np.full(len(comments), np.nan)
+    if software is None:
+        try:
+            software = pyqmmm.qm.traj_indexer.identify_software(comments[0])
+        except (ValueError, IndexError):
+            return energies
+
+    for frame, comment in enumerate(comments):
+        try:
+            energies[frame] = pyqmmm.qm.traj_indexer.parse_energy(comment, software)
+        except (ValueError, IndexError):
+            continue
+
+    return energies
+
+
+def build_cache(xyz_file):
+    """
+    Parse an xyz trajectory into the arrays stored in its cache.
+
+    Trajectories whose frames do not all have the same number of atoms
+    cannot be stored as one coordinate array, so only their header fields are returned.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+
+    Returns
+    -------
+    cache : dict
+        The coordinates, elements, comment lines, energies in Hartrees
+        and the software identified from the first comment line.
+        Coordinates and elements are left out for ragged trajectories.
+
+    """
+    index = pyqmmm.qm.traj_indexer.get_frame_index(xyz_file)
+    comments = pyqmmm.qm.traj_indexer.read_comment_lines(xyz_file, index)
+    try:
+        software = pyqmmm.qm.traj_indexer.identify_software(comments[0])
+    except (ValueError, IndexError):
+        software = ""
+    cache = {
+        "comments": np.array(comments, dtype=str),
+        "energies": comment_energies(comments, software or None),
+        "software": np.array(software),
+    }
+
+    atom_counts = index["atom_counts"]
+    if len(atom_counts) and np.any(atom_counts != atom_counts[0]):
+        return cache
+    traj = Trajectory.from_xyz(xyz_file, index)
+    cache["coordinates"] = traj.coordinates
+    cache["elements"] = traj.elements
+
+    return cache
+
+
+def get_cache(xyz_file, save=True):
+    """
+    Load the cache of a trajectory, rebuilding it if the trajectory has changed.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    save : bool
+        Whether to save a newly built cache next to the trajectory.
+
+    Returns
+    -------
+    cache : dict
+        The coordinates, elements, comment lines, energies in Hartrees
+        and the software identified from the first comment line.
+        Ragged trajectories only have the header fields and are not saved.
+
+    """
+    cache = pyqmmm.qm.traj_indexer.load_sidecar(cache_path(xyz_file), xyz_file, CACHE_VERSION, CACHE_FIELDS)
+    if cache is None:
+        cache = build_cache(xyz_file)
+        if save and "coordinates" in cache:
+            pyqmmm.qm.traj_indexer.save_sidecar(cache_path(xyz_file), xyz_file, CACHE_VERSION, cache)
+
+    return cache
+
+
+def get_energies(xyz_file, software=None):
+    """
+    Get the energy of each frame of a trajectory.
+
+    Energies come from the cache if it is up to date,
+    only the energy and software arrays are loaded from it.
+    Otherwise only the comment lines are read,
+    so plotting energies never requires parsing the coordinates.
+    Either way a comment line without an energy raises a ValueError.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    software : str
+        Software used for the calculation, identified from the first comment line if not given.
+
+    Returns
+    -------
+    energies : numpy.ndarray
+        The energy of each frame in Hartrees.
+
+    """
+    cache = pyqmmm.qm.traj_indexer.load_sidecar(
+        cache_path(xyz_file), xyz_file, CACHE_VERSION, ("energies", "software")
+    )
+    if cache is not None and (software is None or software == str(cache["software"])):
+        # Frames the cache could not parse are reported by read_energies() below
+        if not np.isnan(cache["energies"]).any():
+            return cache["energies"]
+
+    return pyqmmm.qm.traj_indexer.read_energies(xyz_file, software)
+
+
+def get_trajectory(xyz_file):
+    """
+    Get a fully decoded Trajectory from the cache.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+
+    Returns
+    -------
+    Trajectory
+        The trajectory with its coordinates, elements and comment lines.
+
+    """
+    cache = get_cache(xyz_file)
+    if "coordinates" not in cache:
+        raise ValueError(f"The frames of {xyz_file} do not all have the same number of atoms.")
+
+    return Trajectory(cache["coordinates"], cache["elements"], cache["comments"])
@@ -0,0 +1,559 @@
+"""Byte-offset frame index shared by the tools that read xyz trajectories."""
+
+import os
+import mmap
+import contextlib
+import numpy as np
+
+INDEX_SUFFIX = ".idx.npz"
+INDEX_VERSION = 1
+CHUNK_SIZE = 1 << 24  # Bytes scanned for newlines at a time
+INDEX_FIELDS = ("offsets", "atom_counts", "comment_offsets", "coord_offsets", "ends")
+# Position of the energy in the comment line written by each program
+ENERGY_FIELDS = {
+    "ORCA-MEP": 5,
+    "ORCA-IRC": 5,
+    "ORCA": 4,
+    "TeraChem-scan": 4,
+    "TeraChem-opt": 0,
+}
+
+
+def index_path(xyz_file):
+    """
+    Get the name of the index file that sits next to an xyz trajectory.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+
+    Returns
+    -------
+    str
+        Path to the index file, e.g., scan_optim.xyz.idx.npz.
+
+    """
+    return f"{xyz_file}{INDEX_SUFFIX}"
+
+
+def file_signature(xyz_file):
+    """
+    The modification time and size used to tell if a sidecar file is stale.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+
+    Returns
+    -------
+    numpy.ndarray
+        Modification time in nanoseconds and size in bytes.
+
+    """
+    stat = os.stat(xyz_file)
+    return np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+
+def scan_frames(buffer):
+    """
+    Locate every frame in a buffer holding an xyz trajectory.
+
+    Newlines are found with NumPy one chunk at a time,
+    so only the count line of each frame is decoded.
+    Blank lines between frames are skipped and an incomplete final frame,
+    for example from a job that is still running, is left out.
+
+    Parameters
+    ----------
+    buffer : bytes or mmap.mmap
+        The raw contents of the trajectory.
+
+    Returns
+    -------
+    index : dict
+        Arrays of byte offsets for the count line, comment line, first atom line and end of each frame,
+        along with the number of atoms in each frame.
+
+    """
+    size = len(buffer)
+    frames = {field: [] for field in INDEX_FIELDS}
+    pending = np.empty(0, dtype=np.int64)  # Newline positions not yet assigned to a frame
+    line_start = 0
+
+    for chunk_start in range(0, size, CHUNK_SIZE):
+        count = min(CHUNK_SIZE, size - chunk_start)
+        chunk = np.frombuffer(buffer, dtype=np.uint8, count=count, offset=chunk_start)
+        newlines = np.flatnonzero(chunk == ord("\n")) + chunk_start
+        # Treat the end of the file as a newline if the last line is unterminated
+        if chunk_start + count == size and buffer[size - 1 : size] != b"\n":
+            newlines = np.append(newlines, size)
+        pending = np.concatenate((pending, newlines))
+
+        cursor = 0
+        while cursor < len(pending):
+            header = bytes(buffer[line_start : pending[cursor]]).strip()
+            if not header:  # Skip empty lines
+                line_start = int(pending[cursor]) + 1
+                cursor += 1
+                continue
+            atom_count = int(header)
+            last_line = cursor + 1 + atom_count
+            if last_line >= len(pending):
+                break  # The rest of this frame is in the next chunk
+            frames["offsets"].append(line_start)
+            frames["atom_counts"].append(atom_count)
+            frames["comment_offsets"].append(int(pending[cursor]) + 1)
+            frames["coord_offsets"].append(int(pending[cursor + 1]) + 1)
+            frames["ends"].append(min(int(pending[last_line]) + 1, size))
+            line_start = int(pending[last_line]) + 1
+            cursor = last_line + 1
+        pending = pending[cursor:]
+
+    return {field: np.array(values, dtype=np.int64) for field, values in frames.items()}
+
+
+@contextlib.contextmanager
+def map_trajectory(xyz_file):
+    """
+    Memory-map an xyz trajectory for reading.
+
+    Pages are loaded by the operating system as they are touched,
+    so the memory used does not depend on the size of the file.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+
+    Yields
+    ------
+    mmap.mmap
+        A read-only map of the file, or empty bytes for an empty file.
+
+    """
+    with open(xyz_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def build_frame_index(xyz_file):
+    """
+    Make a single pass over an xyz trajectory and record where each frame is.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+
+    Returns
+    -------
+    index : dict
+        Arrays of byte offsets and atom counts for each frame.
+
+    """
+    # The file is memory-mapped so trajectories larger than RAM can be indexed
+    with map_trajectory(xyz_file) as mapped:
+        return scan_frames(mapped)
+
+
+def save_sidecar(sidecar_file, xyz_file, version, arrays):
+    """
+    Save arrays derived from a trajectory to a sidecar .npz file.
+
+    The file is written to a temporary name first so that a partially written
+    sidecar is never picked up by another process.
+    If the directory is not writable the sidecar is simply not saved.
+
+    Parameters
+    ----------
+    sidecar_file : str
+        Path to the sidecar file.
+    xyz_file : str
+        Path to the xyz trajectory the arrays were derived from.
+    version : int
+        Format version of the sidecar.
+    arrays : dict
+        The arrays to save.
+
+    """
+    temp_file = f"{sidecar_file}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, "wb") as f:
+            np.savez(
+                f,
+                version=np.array(version),
+                signature=file_signature(xyz_file),
+                **arrays,
+            )
+        os.replace(temp_file, sidecar_file)
+    except OSError:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def load_sidecar(sidecar_file, xyz_file, version, fields):
+    """
+    Load arrays from a sidecar .npz file if it still matches its trajectory.
+
+    Parameters
+    ----------
+    sidecar_file : str
+        Path to the sidecar file.
+    xyz_file : str
+        Path to the xyz trajectory the arrays were derived from.
+    version : int
+        Expected format version of the sidecar.
+    fields : list
+        Names of the arrays to load.
+
+    Returns
+    -------
+    arrays : dict or None
+        The saved arrays, or None if the sidecar is missing or the trajectory has changed.
+
+    """
+    if not os.path.exists(sidecar_file):
+        return None
+
+    try:
+        with np.load(sidecar_file) as saved:
+            if int(saved["version"]) != version:
+                return None
+            if not np.array_equal(saved["signature"], file_signature(xyz_file)):
+                return None
+            return {field: saved[field] for field in fields}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_frame_index(xyz_file, index):
+    """
+    Save a frame index next to its trajectory.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    index : dict
+        The frame index returned by build_frame_index().
+
+    """
+    save_sidecar(index_path(xyz_file), xyz_file, INDEX_VERSION, index)
+
+
+def load_frame_index(xyz_file):
+    """
+    Load a saved frame index if it still matches its trajectory.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+
+    Returns
+    -------
+    index : dict or None
+        The saved frame index, or None if it is missing or the trajectory has changed.
+
+    """
+    return load_sidecar(index_path(xyz_file), xyz_file, INDEX_VERSION, INDEX_FIELDS)
+
+
+def get_frame_index(xyz_file, save=True):
+    """
+    Load the frame index of a trajectory, building and saving it if needed.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    save : bool
+        Whether to save a newly built index next to the trajectory.
+
+    Returns
+    -------
+    index : dict
+        Arrays of byte offsets and atom counts for each frame.
+
+    """
+    index = load_frame_index(xyz_file)
+    if index is None:
+        index = build_frame_index(xyz_file)
+        if save:
+            save_frame_index(xyz_file, index)
+
+    return index
+
+
+def count_frames(xyz_file):
+    """
+    Count the frames in an xyz trajectory.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+
+    Returns
+    -------
+    int
+        The number of complete frames.
+
+    """
+    return len(get_frame_index(xyz_file)["offsets"])
+
+
+def iter_frames(xyz_file, frames=None, index=None):
+    """
+    Yield the raw text of frames by seeking straight to them.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    frames : list
+        Zero-based frame numbers to read, all frames if not given.
+    index : dict
+        A frame index for the trajectory, loaded if not given.
+
+    Yields
+    ------
+    str
+        The count line, comment line and atom lines of each frame.
+
+    """
+    if index is None:
+        index = get_frame_index(xyz_file)
+    if frames is None:
+        frames = range(len(index["offsets"]))
+    with open(xyz_file, "rb") as f:
+        for frame in frames:
+            start = int(index["offsets"][frame])
+            end = int(index["ends"][frame])
+            f.seek(start)
+            yield f.read(end - start).decode()
+
+
+def iter_frame_views(xyz_file, frames=None, index=None):
+    """
+    Yield zero-copy views of frames from a memory-mapped trajectory.
+
+    Each view is released when the next frame is requested or the loop is left early,
+    so copy it with bytes() if it needs to be kept.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    frames : list
+        Zero-based frame numbers to read, all frames if not given.
+    index : dict
+        A frame index for the trajectory, loaded if not given.
+
+    Yields
+    ------
+    memoryview
+        The raw bytes of the count line, comment line and atom lines of each frame.
+
+    """
+    if index is None:
+        index = get_frame_index(xyz_file)
+    if frames is None:
+        frames = range(len(index["offsets"]))
+    with map_trajectory(xyz_file) as mapped, memoryview(mapped) as whole:
+        for frame in frames:
+            view = whole[int(index["offsets"][frame]) : int(index["ends"][frame])]
+            # Released even if the caller stops early, otherwise the map cannot be closed
+            try:
+                yield view
+            finally:
+                view.release()
+
+
+def copy_frames(xyz_file, frames, out_file, index=None):
+    """
+    Copy the raw bytes of selected frames into an open binary file.
+
+    Frames are written straight from the memory-mapped trajectory without being decoded,
+    so the work done scales with the size of the output rather than the input.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    frames : list
+        Zero-based frame numbers to copy, in the order they should be written.
+    out_file : file object
+        A file opened for writing in binary mode.
+    index : dict
+        A frame index for the trajectory, loaded if not given.
+
+    Returns
+    -------
+    int
+        The number of frames written.
+
+    """
+    frame_count = 0
+    for view in iter_frame_views(xyz_file, frames, index):
+        out_file.write(view)
+        # The last frame of a file may not end with a newline
+        if len(view) and view[-1] != ord("\n"):
+            out_file.write(b"\n")
+        frame_count += 1
+
+    return frame_count
+
+
+def read_frame(xyz_file, frame, index=None):
+    """
+    Read the raw text of a single frame.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    frame : int
+        Zero-based frame number, negative values count from the end.
+    index : dict
+        A frame index for the trajectory, loaded if not given.
+
+    Returns
+    -------
+    str
+        The count line, comment line and atom lines of the frame.
+
+    """
+    return next(iter_frames(xyz_file, [frame], index))
+
+
+def read_comment_lines(xyz_file, index=None):
+    """
+    Read the comment line of every frame without touching the atom lines.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    index : dict
+        A frame index for the trajectory, loaded if not given.
+
+    Returns
+    -------
+    comments : list
+        The stripped comment line of each frame.
+
+    """
+    if index is None:
+        index = get_frame_index(xyz_file)
+    # Slicing the map copies only the comment bytes, the atom lines are never read
+    with map_trajectory(xyz_file) as mapped:
+        comments = [
+            mapped[start:end].decode().strip()
+            for start, end in zip(index["comment_offsets"].tolist(), index["coord_offsets"].tolist())
+        ]
+
+    return comments
+
+
+def identify_software(line):
+    """
+    Identify the software used for the calculation from a comment line.
+
+    Parameters
+    ----------
+    line : str
+        Line from the file.
+
+    Returns
+    -------
+    str
+        Identifier of the software used for the calculation.
+    """
+    if "ORCA-job qmscript_MEP" in line:
+        return "ORCA-MEP"
+    elif "ORCA-job qmscript_IRC_Full" in line:
+        return "ORCA-IRC"
+    elif "ORCA-job qmscript" in line:
+        return "ORCA"
+    elif "Converged     Job" in line:
+        return "TeraChem-scan"
+    elif "TeraChem" in line:
+        return "TeraChem-opt"
+    else:
+        raise ValueError(f"Could not identify software from line: {line}")
+
+
+def parse_energy(line, software):
+    """
+    Parse the energy from a comment line based on the software used.
+
+    Parameters
+    ----------
+    line : str
+        Line from the file containing energy information.
+    software: str
+        The software used for the calculation.
+
+    Returns
+    -------
+    float
+        The energy extracted from the line, in Hartrees.
+
+    """
+    if software not in ENERGY_FIELDS:
+        raise ValueError(f"Unsupported software: {software}")
+
+    return float(line.split()[ENERGY_FIELDS[software]])
+
+
+def read_energies(xyz_file, software=None, index=None):
+    """
+    Extract the energy of every frame from the comment lines alone.
+
+    Only the count and comment lines are read,
+    the atom lines of each frame are skipped using the frame index.
+    A comment line without an energy raises a ValueError naming the frame.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    software : str
+        Software used for the calculation, identified from the first comment line if not given.
+    index : dict
+        A frame index for the trajectory, loaded if not given.
+
+    Returns
+    -------
+    energies : numpy.ndarray
+        The energy of each frame in Hartrees.
+
+    """
+    comments = read_comment_lines(xyz_file, index)
+    if not comments:
+        return np.empty(0)
+    if software is None:
+        software = identify_software(comments[0])
+    if software not in ENERGY_FIELDS:
+        raise ValueError(f"Unsupported software: {software}")
+
+    # NumPy converts all of the energy fields to floats in a single call
+    field = ENERGY_FIELDS[software]
+    try:
+        return np.array([comment.split()[field] for comment in comments], dtype=np.float64)
+    except (IndexError, ValueError):
+        for frame, comment in enumerate(comments):
+            try:
+                parse_energy(comment, software)
+            except (IndexError, ValueError):
+                raise ValueError(f"Could not parse a {software} energy from frame {frame} of {xyz_file}: {comment}") from None
+        raise
@@ -1,48 +1,56 @@
 """Combine frames into a single file."""
 
+import os
+import re
 import glob
 import pyqmmm.qm.reaction_coordinate_collector
+import pyqmmm.qm.traj_indexer
 
 
-def get_xyz_filenames():
+def is_trajectory(xyz_file):
     """
-    Search the current directory for all xyz files and remove non-trajectories.
+    Check whether an xyz file holds more than one frame.
+
+    Only the first frame and the header of the second are read.
 
     Parameters
     ----------
-    atoms : list
-        List of atoms indices
+    xyz_file : str
+        The name of the xyz file.
+
+    Returns
+    -------
+    bool
+        True if a second frame header with the same atom count follows the first frame.
+
+    """
+    with open(xyz_file, "rb") as current_file:
+        try:
+            atom_count = int(current_file.readline())
+        except ValueError:
+            return False
+        # Skip the comment line and the atom lines of the first frame
+        for _ in range(atom_count + 1):
+            current_file.readline()
+        for line in current_file:
+            if line.strip():
+                return line.strip() == str(atom_count).encode()
+
+    return False
+
+
+def get_xyz_filenames():
+    """
+    Search the current directory for all xyz files and remove non-trajectories.
 
     Returns
     -------
     trajectory_list : list
         List string names of all the trajectory xyz files in the directory.
     """
-    # Get all xyz files and sort them
+    # Get all xyz files and keep the trajectories
     file_list = glob.glob("*.xyz")
-    sorted(file_list)
-    xyz_filename_list = []
-
-    # Loop through files and check to see if they are trajectories
-    for file in file_list:
-        with open(file, "r") as current_file:
-            trajectory = False
-            first_line = True
-            header_count = 0
-            # If the atom count appears more than once than it is a trajectory
-            for line in current_file:
-                if first_line == True:
-                    atom_count = line.strip()
-                    header_count += 1
-                    first_line = False
-                if line.strip() == atom_count:
-                    header_count += 1
-                if header_count > 1:
-                    trajectory = True
-                    break
-        # Combine all the trajectory files into a single list
-        if trajectory == True:
-            xyz_filename_list.append(file)
+    xyz_filename_list = [file for file in file_list if is_trajectory(file)]
 
     xyz_filename_list.sort()
     print(f"   > We found these .xyz files: {xyz_filename_list}")
@@ -50,6 +58,50 @@ def get_xyz_filenames():
     return xyz_filename_list
 
 
+def parse_frame_selection(selection, frame_count):
+    """
+    Convert a frame-selection expression into zero-based frame numbers.
+
+    Frames are numbered from 1 and negative numbers count back from the last frame.
+    Comma-separated terms can be single frames (5, -1),
+    inclusive ranges (1-10, -5--1) or stepped ranges (1-20:2, 20-1:-3).
+    A range that runs backwards without a step is read in reverse,
+    a step whose sign does not match the direction of the range is an error.
+
+    Parameters
+    ----------
+    selection : str
+        The frame-selection expression, e.g., 1-10,15,-5--1.
+    frame_count : int
+        The number of frames in the trajectory.
+
+    Returns
+    -------
+    frames : list
+        The selected zero-based frame numbers in the requested order.
+
+    """
+    frames = []
+    for term in selection.replace(" ", "").split(","):
+        match = re.fullmatch(r"(-?\d+)(?:-(-?\d+)(?::(-?\d+))?)?", term)
+        if not match:
+            raise ValueError(f"Could not understand the frame selection {term}")
+        start, stop, step = match.groups()
+        # Convert one-based and negative frame numbers to zero-based indices
+        first = int(start) - 1 if int(start) > 0 else frame_count + int(start)
+        last = first
+        if stop is not None:
+            last = int(stop) - 1 if int(stop) > 0 else frame_count + int(stop)
+        step = int(step) if step else (1 if last >= first else -1)
+        if step == 0 or not (0 <= first < frame_count and 0 <= last < frame_count):
+            raise ValueError(f"The frame selection {term} is outside of the {frame_count} frames")
+        if (last - first) * step < 0:
+            raise ValueError(f"The step of the frame selection {term} runs away from the end of the range")
+        frames.extend(range(first, last + (1 if step > 0 else -1), step))
+
+    return frames
+
+
 def request_frames(xyz_filename):
     """
     Get the request frames for each file from the user.
@@ -62,23 +114,20 @@ def request_frames(xyz_filename):
     Returns
     -------
     frames : list
-        The frames the user requested to be extracted from the xyz trajectory.
+        The zero-based frames the user requested to be extracted from the xyz trajectory.
+        An empty string is returned if the user skipped the file.
     """
     # What frames would you like from the first .xyz file?
     if xyz_filename == "combined.xyz":
-        return
-    request = input(f"   > Which frames do you want from {xyz_filename}?: ")
+        return ""
+    frame_count = pyqmmm.qm.traj_indexer.count_frames(xyz_filename)
+    request = input(f"   > Which of the {frame_count} frames do you want from {xyz_filename} (e.g., 1-5,-1)?: ")
     # Continue if the user did not want that file processed and pressed enter
     if request == "":
         return request
-    # Check the request and convert it to a list even if it is hyphenated
-    temp = [
-        (lambda sub: range(sub[0], sub[-1] + 1))(list(map(int, ele.split("-"))))
-        for ele in request.split(",")
-    ]
-    frames = [b for a in temp for b in a]
+    frames = parse_frame_selection(request, frame_count)
 
-    print(f"   > For {xyz_filename} you requested frames {frames}.")
+    print(f"   > For {xyz_filename} you requested frames {[frame + 1 for frame in frames]}.")
 
     return frames
 
@@ -98,30 +147,8 @@ def multiframe_xyz_to_list(xyz_filename):
         List of lists containing the trajectory with each frame saved as an element.
 
     """
-    # Variables that measure our progress in parsing the optim.xyz file
-    xyz_as_list = []  # List of lists containing all frames
-    frame_contents = ""
-    line_count = 0
-    frame_count = 0
-    first_line = True  # Marks if we've looked at the atom count yet
-
-    # Loop through optim.xyz and collect distances, energies and frame contents
-    with open(xyz_filename, "r") as trajectory:
-        for line in trajectory:
-            # We determine the section length using the atom count in first line
-            if first_line == True:
-                section_length = int(line.strip()) + 2
-                first_line = False
-            # At the end of the section reset the frame-specific variables
-            if line_count == section_length:
-                line_count = 0
-                xyz_as_list.append(frame_contents)
-                frame_contents = ""
-                frame_count += 1
-            frame_contents += line
-            line_count += 1
-
-        xyz_as_list.append(frame_contents)
+    # Each frame is read directly from its byte range in the frame index
+    xyz_as_list = list(pyqmmm.qm.traj_indexer.iter_frames(xyz_filename))
 
     print(f"   > We found {len(xyz_as_list)} frames in {xyz_filename}.")
 
@@ -132,35 +159,38 @@ def combine_xyz_files():
     """
     Combines two xyz files into one.
 
+    Every selection is requested and checked before combined.xyz is touched.
+    The requested frames are then copied straight from each file's frame index,
+    so only the selected frames are ever read.
+
     """
     # Find xyz trajectories in the current directory
     combined_filename = "combined.xyz"
     xyz_filename_list = get_xyz_filenames()
-    # For each xyz file convert to a list with only the requested frames
-    combined_xyz_list = []
+    selections = []
     for file in xyz_filename_list:
         requested_frames = request_frames(file)
         # The user can skip files by with enter which returns an empty string
         if requested_frames == "":
             continue
-        # Convert the xyz files to a list
-        xyz_list = multiframe_xyz_to_list(file)
-        requested_xyz_list = [
-            frame
-            for index, frame in enumerate(xyz_list)
-            if index + 1 in requested_frames
-        ]
         # Ask the user if they want the frames reversed for a given xyz file
         reverse = input(f"   > Any key to reverse {file} else Return: ")
         if reverse:
-            requested_xyz_list.reverse()
-            reverse = False
-        combined_xyz_list += requested_xyz_list
-    # Write the combined trajectories out to a new file called combined.xyz
-    with open(combined_filename, "w") as combined_file:
-        for entry in combined_xyz_list:
-            combined_file.write(entry)
-    print(f"   > Your combined xyz was written to {combined_filename}\n")
+            requested_frames.reverse()
+        selections.append((file, requested_frames))
+
+    # Write to a temporary file so an interrupted run leaves any previous combined.xyz intact
+    temp_filename = f"{combined_filename}.{os.getpid()}.tmp"
+    frame_count = 0
+    try:
+        with open(temp_filename, "wb") as combined_file:
+            for file, requested_frames in selections:
+                frame_count += pyqmmm.qm.traj_indexer.copy_frames(file, requested_frames, combined_file)
+        os.replace(temp_filename, combined_filename)
+    finally:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+    print(f"   > Your combined xyz with {frame_count} frames was written to {combined_filename}\n")
 
 
 def xyz_merger():
@@ -188,7 +218,7 @@ def xyz_merger():
     # STEP 2: Perform reaction coordinate analysis
     perform_rc_analysis = input("   > Any key to perform analyze RC, else Return: ")
     if perform_rc_analysis:
-        reaction_coordinate_collector.reaction_coordinate_collector()
+        pyqmmm.qm.reaction_coordinate_collector.reaction_coordinate_collector()
 
 
 if __name__ == "__main__":
@@ -2,6 +2,10 @@
 
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+import pyqmmm.qm.traj_indexer
+import pyqmmm.qm.trajectory
+from pyqmmm.qm.traj_merger import parse_frame_selection
 
 
 def check_exists():
@@ -14,7 +18,7 @@ def check_exists():
     if os.path.exists(file_name):
         print(f"Found {file_name}")
     else:
-        print(f"No {dat}")
+        print(f"No {file_name}")
         exit()
     return file_name
 
@@ -32,20 +36,116 @@ def create_dir():
         os.makedirs(dir)
 
 
-def get_frames(file_name):
+def select_frames(frame_count, stride=1, frame_range=None):
+    """
+    Choose the zero-based frames that go into the movie.
+
+    Parameters
+    ----------
+    frame_count : int
+        The number of frames in the trajectory.
+    stride : int
+        Keep every stride-th frame of the selection.
+    frame_range : str
+        A frame-selection expression such as 1-500, all frames if not given.
+
+    Returns
+    -------
+    frames : list
+        The selected zero-based frame numbers.
+
+    """
+    if frame_range:
+        frames = parse_frame_selection(frame_range, frame_count)
+    else:
+        frames = list(range(frame_count))
+
+    return frames[::stride]
+
+
+def get_frames(file_name, out_dir="movie", stride=1, frame_range=None, workers=None):
     """
     Break up the original xyz file.
 
+    Frame boundaries come from the frame index and the frame files are written in parallel.
+    Each file is named after the one-based frame number it came from.
+
+    Parameters
+    ----------
+    file_name : str
+        The xyz trajectory to split.
+    out_dir : str
+        The directory the frame files are written to.
+    stride : int
+        Keep every stride-th frame.
+    frame_range : str
+        A frame-selection expression such as 1-500, all frames if not given.
+    workers : int
+        The number of writer threads, chosen by Python if not given.
+
+    Returns
+    -------
+    frame_count : int
+        The number of frame files written.
+
+    """
+    index = pyqmmm.qm.traj_indexer.get_frame_index(file_name)
+    frames = select_frames(len(index["offsets"]), stride, frame_range)
+
+    with pyqmmm.qm.traj_indexer.map_trajectory(file_name) as mapped:
+
+        def write_frame(frame):
+            with open(os.path.join(out_dir, f"{frame + 1}.xyz"), "wb") as f:
+                f.write(mapped[int(index["offsets"][frame]) : int(index["ends"][frame])])
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Consume the results so any write error is raised here
+            list(executor.map(write_frame, frames))
+
+    return len(frames)
+
+
+def write_movie_pdb(file_name, out_file="movie.pdb", stride=1, frame_range=None):
     """
-    current_frame = 0
-    with open(file_name, "r") as ensemble:
-        for line in ensemble:
-            if len("".join(line.split())) == 2:
-                current_frame += 1
-                if current_frame > 1:
-                    f.close()
-                f = open(f"./movie/{current_frame}.xyz")
-            f.write(line)
+    Write the selected frames as models of a single PDB instead of separate files.
+
+    Parameters
+    ----------
+    file_name : str
+        The xyz trajectory to convert.
+    out_file : str
+        The name of the multi-model PDB.
+    stride : int
+        Keep every stride-th frame.
+    frame_range : str
+        A frame-selection expression such as 1-500, all frames if not given.
+
+    Returns
+    -------
+    frame_count : int
+        The number of models written.
+
+    """
+    index = pyqmmm.qm.traj_indexer.get_frame_index(file_name)
+    selected = select_frames(len(index["offsets"]), stride, frame_range)
+
+    model_format = None
+    frame_count = 0
+    with open(out_file, "w") as pdb_file:
+        for _, elements, coordinates in pyqmmm.qm.trajectory.iter_coordinate_chunks(file_name, index=index, frames=selected):
+            if model_format is None:
+                model_format = "".join(
+                    f"HETATM{serial:5d} {element:<4} MOL A   1    %8.3f%8.3f%8.3f  1.00  0.00          {element:>2}\n"
+                    for serial, element in enumerate(elements, start=1)
+                )
+            for frame_coordinates in coordinates:
+                frame_count += 1
+                pdb_file.write(f"MODEL     {frame_count:4d}\n")
+                pdb_file.write(model_format % tuple(frame_coordinates.ravel()))
+                pdb_file.write("ENDMDL\n")
+        pdb_file.write("END\n")
+
+    return frame_count
 
 
 def xyz_movie_generator():
@@ -59,8 +159,13 @@ def xyz_movie_generator():
 
     # Run the functions to generate individual movie frames
     file_name = check_exists()
-    create_dir()
-    get_frames(file_name)
+    stride = int(input("   > Keep every nth frame (default 1)? ") or 1)
+    frame_range = input("   > Which frames (e.g., 1-500), else Return for all? ")
+    if input("   > Any key to write a single multi-model PDB, else Return: "):
+        write_movie_pdb(file_name, stride=stride, frame_range=frame_range)
+    else:
+        create_dir()
+        get_frames(file_name, stride=stride, frame_range=frame_range)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,295 @@
+"""NumPy-backed xyz trajectory shared by the QM trajectory tools."""
+
+import numpy as np
+import pyqmmm.qm.traj_indexer
+
+
+def parse_atom_block(block, atom_count):
+    """
+    Convert the atom lines of one frame into elements and coordinates.
+
+    Parameters
+    ----------
+    block : bytes
+        The atom lines of a single frame.
+    atom_count : int
+        The number of atoms in the frame.
+
+    Returns
+    -------
+    elements : numpy.ndarray
+        The element symbol of each atom.
+    coordinates : numpy.ndarray
+        An (atom_count, 3) array of Cartesian coordinates.
+
+    """
+    tokens = block.split()
+    if len(tokens) == 4 * atom_count:
+        # Plain element x y z lines can be converted in a single call
+        fields = np.array(tokens).reshape(atom_count, 4)
+    else:
+        # Some programs append extra columns, so only keep the first four
+        fields = np.array([line.split()[:4] for line in block.splitlines()[:atom_count]])
+    elements = fields[:, 0].astype(str)
+    coordinates = fields[:, 1:4].astype(np.float64)
+
+    return elements, coordinates
+
+
+def xyz_frame_format(elements):
+    """
+    Build a format string for the atom lines of one frame.
+
+    Filling it with the flattened coordinates of a frame formats every atom line in one call.
+
+    Parameters
+    ----------
+    elements : list
+        The element symbol of each atom.
+
+    Returns
+    -------
+    str
+        The atom lines of a frame with placeholders for the x, y and z coordinates.
+
+    """
+    return "".join(f"{element:<2} %14.8f %14.8f %14.8f\n" for element in elements)
+
+
+class Trajectory:
+    """
+    An xyz trajectory with all coordinates stored in one NumPy array.
+
+    Coordinates live in a contiguous (n_frames, n_atoms, 3) float array,
+    element symbols in a single array shared by all frames
+    and comment lines in a list with one entry per frame.
+    Trajectories opened with from_xyz() only decode a frame when it is first accessed.
+
+    Parameters
+    ----------
+    coordinates : numpy.ndarray
+        An (n_frames, n_atoms, 3) array of Cartesian coordinates, n_frames may be zero.
+    elements : list
+        The element symbol of each atom.
+    comments : list
+        The comment line of each frame.
+
+    """
+
+    def __init__(self, coordinates, elements, comments=None):
+        self._coordinates = np.ascontiguousarray(coordinates, dtype=np.float64)
+        if self._coordinates.ndim != 3 or self._coordinates.shape[2] != 3:
+            raise ValueError(
+                f"Expected an (n_frames, n_atoms, 3) coordinate array, got shape {self._coordinates.shape}."
+            )
+        n_frames, n_atoms, _ = self._coordinates.shape
+        self._elements = np.asarray(elements, dtype=str)
+        self._comments = list(comments) if comments is not None else [""] * n_frames
+        self._decoded = np.ones(n_frames, dtype=bool)
+        self.xyz_file = None
+        self.index = None
+        if len(self._elements) != n_atoms or len(self._comments) != n_frames:
+            raise ValueError("The elements and comments do not match the shape of the coordinates.")
+
+    @classmethod
+    def from_xyz(cls, xyz_file, index=None):
+        """
+        Open an xyz trajectory without decoding any of its frames.
+
+        Parameters
+        ----------
+        xyz_file : str
+            Path to the xyz trajectory.
+        index : dict
+            A frame index for the trajectory, loaded if not given.
+
+        Returns
+        -------
+        Trajectory
+            A trajectory whose frames are read from disk on first access.
+
+        """
+        if index is None:
+            index = pyqmmm.qm.traj_indexer.get_frame_index(xyz_file)
+        atom_counts = index["atom_counts"]
+        if len(atom_counts) and np.any(atom_counts != atom_counts[0]):
+            raise ValueError(f"The frames of {xyz_file} do not all have the same number of atoms.")
+        n_atoms = int(atom_counts[0]) if len(atom_counts) else 0
+
+        traj = cls.__new__(cls)
+        traj._coordinates = np.empty((len(atom_counts), n_atoms, 3), dtype=np.float64)
+        # An empty trajectory has no frame to take the elements from
+        traj._elements = None if len(atom_counts) else np.empty(0, dtype=str)
+        traj._comments = None if len(atom_counts) else []
+        traj._decoded = np.zeros(len(atom_counts), dtype=bool)
+        traj.xyz_file = xyz_file
+        traj.index = index
+
+        return traj
+
+    def __len__(self):
+        return self._coordinates.shape[0]
+
+    def __getitem__(self, frame):
+        return self.frame(frame)
+
+    def __iter__(self):
+        for frame in range(len(self)):
+            yield self.frame(frame)
+
+    @property
+    def n_atoms(self):
+        """The number of atoms in each frame."""
+        return self._coordinates.shape[1]
+
+    @property
+    def elements(self):
+        """The element symbol of each atom."""
+        if self._elements is None:
+            self._decode([0])
+        return self._elements
+
+    @property
+    def comments(self):
+        """The comment line of each frame."""
+        if self._comments is None:
+            self._comments = pyqmmm.qm.traj_indexer.read_comment_lines(self.xyz_file, self.index)
+        return self._comments
+
+    @property
+    def coordinates(self):
+        """The (n_frames, n_atoms, 3) coordinate array with every frame decoded."""
+        self._decode(np.flatnonzero(~self._decoded))
+        return self._coordinates
+
+    def frame(self, frame):
+        """
+        Get the coordinates of a single frame.
+
+        Parameters
+        ----------
+        frame : int
+            Zero-based frame number, negative values count from the end.
+
+        Returns
+        -------
+        numpy.ndarray
+            An (n_atoms, 3) view into the coordinate array.
+
+        """
+        try:
+            frame = range(len(self))[frame]
+        except IndexError:
+            raise IndexError(f"Frame {frame} is out of range for a trajectory with {len(self)} frames.") from None
+        if not self._decoded[frame]:
+            self._decode([frame])
+        return self._coordinates[frame]
+
+    def _decode(self, frames):
+        """Parse the requested frames from disk into the coordinate array."""
+        if len(frames) == 0:
+            return
+        with open(self.xyz_file, "rb") as f:
+            for frame in frames:
+                start = int(self.index["coord_offsets"][frame])
+                end = int(self.index["ends"][frame])
+                f.seek(start)
+                elements, coordinates = parse_atom_block(f.read(end - start), self.n_atoms)
+                self._coordinates[frame] = coordinates
+                self._decoded[frame] = True
+                if self._elements is None:
+                    self._elements = elements
+
+    def subset(self, frames=None, atoms=None):
+        """
+        Create a new trajectory from a selection of frames and atoms.
+
+        Parameters
+        ----------
+        frames : list or slice
+            The zero-based frames to keep, all frames if not given.
+        atoms : list or numpy.ndarray
+            Zero-based atom indices or a boolean atom mask, all atoms if not given.
+
+        Returns
+        -------
+        Trajectory
+            A fully decoded trajectory holding only the selection.
+
+        """
+        frames = np.arange(len(self))[frames if frames is not None else slice(None)]
+        atoms = np.arange(self.n_atoms)[atoms if atoms is not None else slice(None)]
+        self._decode([frame for frame in frames if not self._decoded[frame]])
+        coordinates = self._coordinates[np.ix_(frames, atoms)]
+        comments = [self.comments[frame] for frame in frames]
+
+        return Trajectory(coordinates, self.elements[atoms], comments)
+
+    def write_xyz(self, out_file, frames=None):
+        """
+        Write the trajectory out as an xyz file.
+
+        Parameters
+        ----------
+        out_file : str
+            The name of the output xyz file.
+        frames : list
+            The zero-based frames to write, all frames if not given.
+
+        """
+        if frames is None:
+            frames = range(len(self))
+        frame_format = xyz_frame_format(self.elements)
+        with open(out_file, "w") as f:
+            for frame in frames:
+                f.write(f"{self.n_atoms}\n{self.comments[frame]}\n")
+                f.write(frame_format % tuple(self.frame(frame).ravel()))
+
+
+def iter_coordinate_chunks(xyz_file, chunk_size=1000, index=None, frames=None):
+    """
+    Decode an xyz trajectory a block of frames at a time.
+
+    Frames are parsed from a memory-mapped file,
+    so at most chunk_size frames of coordinates are held in memory.
+    Only the requested frames need to have the same number of atoms.
+
+    Parameters
+    ----------
+    xyz_file : str
+        Path to the xyz trajectory.
+    chunk_size : int
+        The number of frames in each block.
+    index : dict
+        A frame index for the trajectory, loaded if not given.
+    frames : list
+        Zero-based frame numbers to decode, all frames if not given.
+
+    Yields
+    ------
+    frames : list
+        The zero-based frame numbers in the block.
+    elements : numpy.ndarray
+        The element symbol of each atom.
+    coordinates : numpy.ndarray
+        A (len(frames), n_atoms, 3) coordinate array.
+
+    """
+    if index is None:
+        index = pyqmmm.qm.traj_indexer.get_frame_index(xyz_file)
+    if frames is None:
+        frames = range(len(index["atom_counts"]))
+    # Only the requested frames need to share an atom count
+    atom_counts = index["atom_counts"][np.asarray(frames, dtype=np.int64)]
+    if len(atom_counts) and np.any(atom_counts != atom_counts[0]):
+        raise ValueError(f"The requested frames of {xyz_file} do not all have the same number of atoms.")
+
+    for start in range(0, len(frames), chunk_size):
+        chunk = frames[start : start + chunk_size]
+        coordinates = np.empty((len(chunk), int(atom_counts[0]), 3))
+        views = pyqmmm.qm.traj_indexer.iter_frame_views(xyz_file, chunk, index)
+        for i, view in enumerate(views):
+            frame = chunk[i]
+            block = bytes(view[int(index["coord_offsets"][frame] - index["offsets"][frame]) :])
+            elements, coordinates[i] = parse_atom_block(block, int(atom_counts[start + i]))
+        yield chunk, elements, coordinates
@@ -1,6 +1,7 @@
 """Reverses an xyz trajectory, for example if it was run backwards for better convergence."""
 
 import os
+import pyqmmm.qm.traj_indexer
 
 def read_xyz(file):
     """
@@ -52,6 +53,80 @@ def write_xyz(file, frames):
             for atom_line in atoms:
                 f.write(f'{atom_line}\n')
 
+def reverse_xyz(xyz_file, output_file=None, in_place=False):
+    """
+    Write the frames of an xyz trajectory in reverse order.
+
+    Frames are copied as raw byte ranges from the frame index of a memory-mapped file,
+    so no lines are decoded and memory use does not grow with the trajectory.
+
+    Parameters
+    ----------
+    xyz_file : str
+        The name of the xyz file to reverse.
+    output_file : str
+        The name of the output xyz file, defaults to "{name}_reversed.xyz" next to the input.
+    in_place : bool
+        Replace the input file with its reversed copy, cannot be combined with output_file.
+
+    Returns
+    -------
+    output_file : str
+        The name of the file the reversed trajectory was written to.
+
+    """
+    if in_place and output_file is not None:
+        raise ValueError("   > Choose either an output file or in_place, not both.")
+    if in_place:
+        output_file = xyz_file
+    elif output_file is None:
+        output_file = f"{os.path.splitext(xyz_file)[0]}_reversed.xyz"
+
+    index = pyqmmm.qm.traj_indexer.get_frame_index(xyz_file, save=not in_place)
+    frames = range(len(index["offsets"]) - 1, -1, -1)
+    # Write to a temporary file so a failed run never leaves a partial trajectory behind
+    temp_file = f"{output_file}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, "wb") as f:
+            pyqmmm.qm.traj_indexer.copy_frames(xyz_file, frames, f, index)
+        os.replace(temp_file, output_file)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+    return output_file
+
+
+def flip_directories(directories, xyz_name="scan_optim.xyz", in_place=False):
+    """
+    Reverse the same trajectory in each of a batch of scan directories.
+
+    Parameters
+    ----------
+    directories : list
+        The scan directories to process.
+    xyz_name : str
+        The name of the trajectory inside each directory.
+    in_place : bool
+        Replace each trajectory instead of writing a "_reversed" sibling.
+
+    Returns
+    -------
+    reversed_files : list
+        The names of the reversed trajectories that were written.
+
+    """
+    reversed_files = []
+    for directory in directories:
+        xyz_file = os.path.join(directory, xyz_name)
+        if not os.path.exists(xyz_file):
+            print(f"   > Skipping {directory}, no {xyz_name} found")
+            continue
+        reversed_files.append(reverse_xyz(xyz_file, in_place=in_place))
+
+    return reversed_files
+
+
 def xyz_flipper(input_file):
     """
     Takes an xyz file and reverses the order of the frames.
@@ -77,14 +152,8 @@ def xyz_flipper(input_file):
     xyz_file = f"{input_file}.xyz"
     output_file = f"{input_file}_reversed.xyz"
 
-    # Read frames from the input file
-    frames = read_xyz(xyz_file)
-
-    # Reverse the order of the frames
-    frames_reversed = list(reversed(frames))
-
-    # Write the reversed frames to the output file
-    write_xyz(output_file, frames_reversed)
+    # Copy the frames in reverse order without decoding them
+    reverse_xyz(xyz_file, output_file)
 
     print(f"Reversed trajectory written to {output_file}")
 
@@ -0,0 +1,133 @@
+"""
+Tests for the Multiwfn bond order cache and parser.
+"""
+
+import os
+
+import pytest
+import scipy.sparse
+
+import pyqmmm.qm.bond_valence
+
+
+def bond_matrix(pairs, size=4):
+    rows, cols, orders = zip(*[(atom1 - 1, atom2 - 1, order) for atom1, atom2, order in pairs])
+    upper = scipy.sparse.coo_matrix((orders, (rows, cols)), shape=(size, size))
+    return (upper + upper.T).tocsr()
+
+
+@pytest.fixture
+def fake_multiwfn(monkeypatch):
+    """Replace Multiwfn with a function that records each wavefunction it is run on."""
+    calls = []
+
+    def run_multiwfn(wfn, analysis="mayer", threads=1):
+        calls.append((wfn, threads))
+        if "broken" in wfn:
+            raise RuntimeError(f"Multiwfn {wfn} failed")
+        return bond_matrix([(1, 2, 0.9), (2, 4, 0.3)])
+
+    monkeypatch.setattr(pyqmmm.qm.bond_valence, "run_multiwfn", run_multiwfn)
+    return calls
+
+
+def test_split_threads():
+    assert pyqmmm.qm.bond_valence.split_threads(8, 3) == (3, 2)
+    assert pyqmmm.qm.bond_valence.split_threads(2, 4) == (2, 1)
+    assert pyqmmm.qm.bond_valence.split_threads(4, 0) == (1, 4)
+
+
+def test_bond_orders_are_cached_by_content(tmp_path, fake_multiwfn):
+    cache_dir = str(tmp_path / "cache")
+    (tmp_path / "1_step.gbw").write_bytes(b"wavefunction")
+    (tmp_path / "2_step.gbw").write_bytes(b"wavefunction")
+
+    first = pyqmmm.qm.bond_valence.get_bond_orders(str(tmp_path / "1_step.gbw"), cache_dir=cache_dir)
+    second = pyqmmm.qm.bond_valence.get_bond_orders(str(tmp_path / "2_step.gbw"), cache_dir=cache_dir)
+
+    # Identical wavefunctions share a cache entry, so Multiwfn only runs once
+    assert len(fake_multiwfn) == 1
+    assert (first != second).nnz == 0
+    assert [name for name in os.listdir(cache_dir) if name.endswith(".tmp.npz")] == []
+
+
+def test_empty_cached_result_is_run_again(tmp_path, fake_multiwfn):
+    cache_dir = str(tmp_path / "cache")
+    wfn = str(tmp_path / "1_step.gbw")
+    (tmp_path / "1_step.gbw").write_bytes(b"wavefunction")
+    os.makedirs(cache_dir)
+    cache_file = pyqmmm.qm.bond_valence.cache_path(wfn, cache_dir=cache_dir)
+    scipy.sparse.save_npz(cache_file, scipy.sparse.csr_matrix((0, 0)))
+
+    bond_orders = pyqmmm.qm.bond_valence.get_bond_orders(wfn, cache_dir=cache_dir)
+
+    assert len(fake_multiwfn) == 1
+    assert pyqmmm.qm.bond_valence.get_bond_order(bond_orders, 2, 1) == 0.9
+
+
+def test_failed_jobs_are_reported_after_the_others_are_cached(tmp_path, fake_multiwfn):
+    cache_dir = str(tmp_path / "cache")
+    wfn_files = []
+    for name in ("1_step.gbw", "2_broken.gbw", "3_step.gbw"):
+        (tmp_path / name).write_bytes(name.encode())
+        wfn_files.append(str(tmp_path / name))
+
+    with pytest.raises(RuntimeError, match="2_broken.gbw") as error:
+        pyqmmm.qm.bond_valence.run_bond_orders(wfn_files, threads=4, jobs=2, cache_dir=cache_dir)
+
+    assert isinstance(error.value.__cause__, RuntimeError)
+    assert sorted(threads for _, threads in fake_multiwfn) == [2, 2, 2]
+    assert len(os.listdir(cache_dir)) == 2
+
+
+MULTIWFN_OUTPUT = """\
+ Loaded 1_step.gbw successfully!
+ Bond orders with absolute value >=  0.050000
+ #    1:        1(Fe)   2(O )   Alpha:  0.412345 Beta:  0.301234 Total:  0.713579
+ #    2:        1(Fe)   4(N )   Alpha:  0.200000 Beta:  0.150000 Total:  0.350000
+ #    3:        2(O )   3(H )   Alpha:  0.450000 Beta:  0.450000 Total:  0.900000
+ Note: The "Total" bond orders shown above are more meaningful than the below ones.
+ #    4:        3(H )   4(N )   Alpha:  0.010000 Beta:  0.010000 Total:  9.999999
+"""
+
+
+def baseline_bond_orders(output, atom_pairs):
+    """Pick the requested pairs out of the Multiwfn output, as calculate_bond_valence() did before the CSR matrix."""
+    step_data = {}
+    start_processing = False
+    for line in output.split("\n"):
+        if "Bond orders with absolute value" in line:
+            start_processing = True
+            continue
+        if "Note: The \"Total\" bond orders shown above" in line:
+            break
+        if start_processing and "Alpha:" in line and "Total:" in line:
+            parts = line.split("(")
+            atom1 = int(parts[0].split()[-1])
+            atom2 = int(parts[1].split()[-1])
+            if (atom1, atom2) in atom_pairs or (atom2, atom1) in atom_pairs:
+                step_data[(atom1, atom2)] = float(parts[2].split()[-1])
+    return step_data
+
+
+def test_streamed_matrix_matches_baseline_parser():
+    atom_pairs = [(1, 2), (4, 1), (2, 3), (3, 4)]
+
+    # The parser reads from an iterator, like the stdout pipe of a running Multiwfn
+    bond_orders = pyqmmm.qm.bond_valence.parse_bond_orders(iter(MULTIWFN_OUTPUT.splitlines(keepends=True)))
+
+    expected = baseline_bond_orders(MULTIWFN_OUTPUT, atom_pairs)
+    assert bond_orders.shape == (4, 4)
+    for atom1, atom2 in atom_pairs:
+        order = expected.get((atom1, atom2), expected.get((atom2, atom1), 0.0))
+        assert pyqmmm.qm.bond_valence.get_bond_order(bond_orders, atom1, atom2) == order
+        assert pyqmmm.qm.bond_valence.get_bond_order(bond_orders, atom2, atom1) == order
+
+
+def test_coordination_sphere():
+    bond_orders = pyqmmm.qm.bond_valence.parse_bond_orders(MULTIWFN_OUTPUT.splitlines())
+
+    assert pyqmmm.qm.bond_valence.get_coordination_sphere(bond_orders, 1) == {2: 0.713579, 4: 0.35}
+    assert pyqmmm.qm.bond_valence.get_coordination_sphere(bond_orders, 1, threshold=0.5) == {2: 0.713579}
+    assert pyqmmm.qm.bond_valence.get_coordination_sphere(bond_orders, 9) == {}
+    assert pyqmmm.qm.bond_valence.get_bond_order(bond_orders, 1, 9) == 0.0
@@ -0,0 +1,37 @@
+"""
+Tests for summing charges and spins over atom groups.
+"""
+
+import numpy as np
+import pytest
+
+import pyqmmm.qm.charge_spin_extractor
+
+VALUES = np.array([[0.1, -0.2, 0.3, 0.4], [0.5, -0.6, 0.7, 0.8]])
+
+
+def test_group_sums_match_column_sums():
+    groups = {"metal": [1], "ligand": [2, 3, 4]}
+
+    table = pyqmmm.qm.charge_spin_extractor.sum_atom_groups(VALUES, groups)
+
+    assert table.index.tolist() == [1, 2]
+    assert np.allclose(table["metal"], VALUES[:, 0])
+    assert np.allclose(table["ligand"], VALUES[:, 1:].sum(axis=1))
+
+
+@pytest.mark.parametrize("atoms", [[0], [5], [1, -1]])
+def test_groups_outside_the_structure_are_rejected(atoms):
+    with pytest.raises(ValueError, match="numbered 1 to 4"):
+        pyqmmm.qm.charge_spin_extractor.sum_atom_groups(VALUES, {"bad": atoms})
+
+
+def test_rewritten_store_is_read_again(tmp_path):
+    store = str(tmp_path / "scan_properties_job.npz")
+    np.savez(store, charges=VALUES, elements=np.array(["Fe", "O", "H", "H"]))
+    assert np.array_equal(pyqmmm.qm.charge_spin_extractor.get_property(store, "charges"), VALUES)
+
+    np.savez(store, charges=VALUES[:1], elements=np.array(["Fe", "O", "H", "H"]))
+    assert np.array_equal(pyqmmm.qm.charge_spin_extractor.get_property(store, "charges"), VALUES[:1])
+    with pytest.raises(ValueError, match="no spins"):
+        pyqmmm.qm.charge_spin_extractor.get_property(store, "spins")
@@ -0,0 +1,96 @@
+"""
+Tests for building the NEB MEP trajectory from an ORCA output.
+"""
+
+import re
+
+import pytest
+
+import pyqmmm.qm.create_mep_trj
+
+RULE = "-" * 63
+
+
+def block(label, shift):
+    return f"{label} (ANGSTROEM)\n------------\nC  0.0 0.0 {shift:.4f}\nH  0.0 0.0 {shift + 1:.4f}\n\n"
+
+
+def summary(energies):
+    rows = "".join(f"  {image}   0.0  {energy:.6f}  0.0\n" for image, energy in enumerate(energies))
+    return f"{RULE}\n   PATH SUMMARY\n{RULE}\nAll forces in Eh/Bohr.\n\nImage Dist.(Ang.) E(Eh)\n{rows}{RULE}\n"
+
+
+def baseline_mep(orca_output_file, output_xyz_file):
+    """Build the MEP with the regular expressions create_neb_mep_trj_from_out() used before the state machine."""
+    coordinate_pattern = re.compile(
+        r"(REACTANT|PRODUCT|IMAGE \d+ \((ANGSTROEM|BOHR)\))\n-+\n"
+        r"((?:[A-Z][a-z]?\s+-?\d+\.\d+\s+-?\d+\.\d+\s+-?\d+\.\d+\s*\n)+)"
+    )
+    energy_pattern = re.compile(r"\s+\d+\s+\S+\s+(-?\d+\.\d+)")
+    with open(orca_output_file) as file:
+        orca_output = file.read()
+    coordinates = coordinate_pattern.findall(orca_output)
+    energies = energy_pattern.findall(orca_output.split("PATH SUMMARY")[1].split(RULE)[1].strip())
+    coordinates = [coordinates[0]] + coordinates + [coordinates[-1]]
+    with open(output_xyz_file, "w") as file:
+        for (_, _, coord_data), energy in zip(coordinates, energies):
+            lines = coord_data.strip().split("\n")
+            file.write(f"{len(lines)}\nCoordinates from ORCA-job qmscript_MEP E {energy}\n")
+            file.writelines(line + "\n" for line in lines)
+
+
+def test_single_iteration_matches_baseline(tmp_path):
+    orca_out = tmp_path / "orca.out"
+    orca_out.write_text(block("IMAGE 1", 1.0) + block("IMAGE 2", 2.0) + summary([-1.0, -1.001, -1.002, -1.003]))
+
+    summaries = pyqmmm.qm.create_mep_trj.create_neb_mep_trj_from_out(str(orca_out), str(tmp_path / "mep.xyz"))
+    baseline_mep(str(orca_out), str(tmp_path / "baseline.xyz"))
+
+    assert summaries == 1
+    assert (tmp_path / "mep.xyz").read_text() == (tmp_path / "baseline.xyz").read_text()
+
+
+def test_latest_blocks_and_summary_are_used(tmp_path):
+    orca_out = tmp_path / "orca.out"
+    first = block("REACTANT", 0.0) + block("IMAGE 1", 1.0) + block("PRODUCT", 3.0) + summary([-1.0, -1.1, -1.2])
+    second = block("IMAGE 1", 1.5) + summary([-2.0, -2.1, -2.2])
+    orca_out.write_text(first + second)
+    iterations = tmp_path / "iterations.xyz"
+
+    summaries = pyqmmm.qm.create_mep_trj.create_neb_mep_trj_from_out(
+        str(orca_out), str(tmp_path / "mep.xyz"), str(iterations)
+    )
+
+    lines = (tmp_path / "mep.xyz").read_text().splitlines()
+    assert summaries == 2
+    assert [line for line in lines if line.startswith("Coordinates")] == [
+        f"Coordinates from ORCA-job qmscript_MEP E {energy}" for energy in ("-2.000000", "-2.100000", "-2.200000")
+    ]
+    assert lines[6] == "C  0.0 0.0 1.5000"
+    assert iterations.read_text().count("Coordinates from") == 6
+
+
+def test_header_mention_without_a_rule_keeps_the_last_block(tmp_path):
+    orca_out = tmp_path / "orca.out"
+    # A bare PRODUCT line not followed by a rule must not wipe the product coordinates
+    blocks = block("REACTANT", 0.0) + block("IMAGE 1", 1.0) + block("PRODUCT", 3.0)
+    orca_out.write_text(blocks + "PRODUCT\nThe product is kept fixed.\n" + summary([-1.0, -1.1, -1.2]))
+
+    pyqmmm.qm.create_mep_trj.create_neb_mep_trj_from_out(str(orca_out), str(tmp_path / "mep.xyz"))
+
+    lines = (tmp_path / "mep.xyz").read_text().splitlines()
+    assert lines[-4:] == [
+        "2",
+        "Coordinates from ORCA-job qmscript_MEP E -1.200000",
+        "C  0.0 0.0 3.0000",
+        "H  0.0 0.0 4.0000",
+    ]
+
+
+def test_mismatched_summary_writes_nothing(tmp_path):
+    orca_out = tmp_path / "orca.out"
+    orca_out.write_text(block("IMAGE 1", 1.0) + summary([-1.0, -1.1]))
+
+    with pytest.raises(ValueError, match="Mismatch"):
+        pyqmmm.qm.create_mep_trj.create_neb_mep_trj_from_out(str(orca_out), str(tmp_path / "mep.xyz"))
+    assert not (tmp_path / "mep.xyz").exists()
@@ -0,0 +1,95 @@
+"""
+Tests for the hydrogen bond lifetimes and time-resolved occupancy.
+"""
+
+import numpy as np
+import pytest
+
+import pyqmmm.md.hbond_lifetimes
+
+
+def random_presence(frame_count=60, group_count=4, seed=11):
+    presence = np.random.default_rng(seed).random((frame_count, group_count)) < 0.6
+    presence[:, 0] = True
+    presence[:, 1] = False
+    return presence
+
+
+def naive_runs(series):
+    """List the (start, length) of each run of True by walking the frames one at a time."""
+    runs = []
+    start = None
+    for frame, present in enumerate(list(series) + [False]):
+        if present and start is None:
+            start = frame
+        elif not present and start is not None:
+            runs.append((start, frame - start))
+            start = None
+    return runs
+
+
+def naive_fill(series, tolerance):
+    """Bridge each break of at most tolerance frames that has the bond on both sides."""
+    filled = list(series)
+    for start, length in naive_runs([not present for present in series]):
+        if length <= tolerance and start > 0 and start + length < len(series):
+            filled[start : start + length] = [True] * length
+    return filled
+
+
+def test_run_lengths_match_naive_walk():
+    presence = random_presence()
+    groups, starts, lengths = pyqmmm.md.hbond_lifetimes.run_lengths(presence)
+
+    expected = [(group, start, length) for group in range(4) for start, length in naive_runs(presence[:, group])]
+    assert list(zip(groups.tolist(), starts.tolist(), lengths.tolist())) == expected
+    assert lengths[groups == 0].tolist() == [60]
+    assert not (groups == 1).any()
+
+
+@pytest.mark.parametrize("tolerance", [0, 1, 2, 5])
+def test_fill_gaps_matches_naive_fill(tolerance):
+    presence = random_presence()
+    filled = pyqmmm.md.hbond_lifetimes.fill_gaps(presence, tolerance)
+
+    for group in range(presence.shape[1]):
+        assert filled[:, group].tolist() == naive_fill(presence[:, group].tolist(), tolerance)
+
+
+def test_breaks_at_the_ends_are_not_bridged():
+    series = np.array([[False], [True], [False], [True], [False]])
+
+    assert pyqmmm.md.hbond_lifetimes.fill_gaps(series, 3)[:, 0].tolist() == [False, True, True, True, False]
+
+
+def test_lifetimes_summarize_runs():
+    presence = random_presence()
+    summary = pyqmmm.md.hbond_lifetimes.lifetimes(presence, time_per_frame=0.5)
+
+    for group in range(presence.shape[1]):
+        lengths = [length for _, length in naive_runs(presence[:, group])]
+        assert summary.loc[group, "events"] == len(lengths)
+        assert summary.loc[group, "mean_lifetime"] == pytest.approx(np.mean(lengths) * 0.5 if lengths else 0.0)
+        assert summary.loc[group, "max_lifetime"] == pytest.approx(max(lengths, default=0) * 0.5)
+
+
+@pytest.mark.parametrize("window", [1, 7, 60, 100])
+def test_sliding_occupancy_matches_window_loop(window):
+    presence = random_presence()
+    occupancy = pyqmmm.md.hbond_lifetimes.sliding_occupancy(presence, window)
+
+    window = min(window, len(presence))
+    expected = [presence[start : start + window].mean(axis=0) * 100 for start in range(len(presence) - window + 1)]
+    assert np.allclose(occupancy, expected)
+
+
+def test_trajectory_blocks_drop_trailing_frames():
+    presence = random_presence(frame_count=23)
+    summary, blocks = pyqmmm.md.hbond_lifetimes.trajectory_blocks(presence, n_blocks=5)
+
+    expected = [presence[start : start + 4].mean(axis=0) * 100 for start in range(0, 20, 4)]
+    assert np.allclose(blocks, expected)
+    assert np.allclose(summary["block_mean"], np.mean(expected, axis=0))
+    assert np.allclose(summary["block_std"], np.std(expected, axis=0, ddof=1))
+    with pytest.raises(ValueError, match="Cannot split 3 frames"):
+        pyqmmm.md.hbond_lifetimes.trajectory_blocks(presence[:3], n_blocks=5)
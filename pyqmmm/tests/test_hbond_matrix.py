@@ -0,0 +1,137 @@
+"""
+Tests for the packed hbond frame matrix.
+"""
+
+import numpy as np
+import pytest
+
+import pyqmmm.md.hbond_matrix
+
+HEADER = [
+    "set pm3d map corners2color c1",
+    "set title 'hbond'",
+    "set xlabel 'Frame'",
+    "set ylabel 'Hbond'",
+    "unset key",
+    "set yrange [0:11]",
+    'set ytics("A@O-B@N-B@H" 1, "C@O-D@N-D@H" 2)',
+    "splot '-' with pm3d title 'hbond'",
+]
+
+
+def random_presence(frame_count=40, n_hbonds=11, seed=3):
+    return np.random.default_rng(seed).random((frame_count, n_hbonds)) < 0.3
+
+
+def write_gnu(path, presence):
+    """Write a hbond.gnu series with one block of rows per frame, separated by blank lines."""
+    frames = []
+    for frame, row in enumerate(presence, start=1):
+        frames.append("".join(f"{frame:8.3f} {bond:4d} {int(present)}\n" for bond, present in enumerate(row)))
+    path.write_bytes(("\n".join(HEADER) + "\n" + "\n".join(frames) + "end\n").encode())
+    return str(path)
+
+
+def baseline_counts(file_path, groups):
+    """Count frames with each group present by splitting frames on blank lines, as count_occurrences() did."""
+    counts = [0] * len(groups)
+    frame_count = 0
+    with open(file_path) as f:
+        for _ in range(8):
+            next(f)
+        for frame in f.read().split("\n\n"):
+            frame_count += 1
+            bonds = set()
+            for line in frame.split("\n"):
+                if line == "end":
+                    break
+                arr = [int(float(x)) for x in line.split(" ") if x]
+                if arr[-1] == 1:
+                    bonds.add(arr[1])
+            for column, group in enumerate(groups):
+                counts[column] += bool(group & bonds)
+    return counts, frame_count
+
+
+GROUPS = [{0}, {1, 2, 3}, {4, 10}, {5, 6, 7, 8, 9}, set(), {42}]
+
+
+def test_packed_matrix_round_trip(tmp_path):
+    presence = random_presence()
+    file_path = write_gnu(tmp_path / "hbond.gnu", presence)
+
+    packed, n_hbonds = pyqmmm.md.hbond_matrix.read_hbond_matrix(file_path, n_hbonds=presence.shape[1])
+
+    assert packed.dtype == np.uint8
+    assert packed.shape == (40, 2)
+    assert np.array_equal(np.unpackbits(packed, axis=1, count=n_hbonds).astype(bool), presence)
+
+
+def test_group_counts_match_baseline(tmp_path):
+    presence = random_presence()
+    file_path = write_gnu(tmp_path / "hbond.gnu", presence)
+
+    packed, n_hbonds = pyqmmm.md.hbond_matrix.read_hbond_matrix(file_path)
+    counts = pyqmmm.md.hbond_matrix.group_counts(packed, n_hbonds, GROUPS)
+
+    expected, frame_count = baseline_counts(file_path, GROUPS)
+    assert packed.shape[0] == frame_count
+    assert counts.tolist() == expected
+
+
+def test_group_presence_is_any_over_the_group(tmp_path):
+    presence = random_presence()
+    packed, _ = pyqmmm.md.hbond_matrix.pack_matrix(*np.nonzero(presence), len(presence), presence.shape[1])
+
+    grouped = pyqmmm.md.hbond_matrix.group_presence(packed, presence.shape[1], GROUPS)
+
+    for column, group in enumerate(GROUPS):
+        valid = sorted(index for index in group if index < presence.shape[1])
+        expected = presence[:, valid].any(axis=1) if valid else np.zeros(len(presence), dtype=bool)
+        assert np.array_equal(grouped[:, column], expected)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100])
+def test_presence_blocks_cover_every_frame(chunk_size):
+    presence = random_presence()
+    packed, n_hbonds = pyqmmm.md.hbond_matrix.pack_matrix(*np.nonzero(presence), len(presence), presence.shape[1])
+
+    blocks = list(pyqmmm.md.hbond_matrix.iter_group_presence(packed, n_hbonds, GROUPS, chunk_size))
+
+    assert np.array_equal(np.concatenate(blocks), pyqmmm.md.hbond_matrix.group_presence(packed, n_hbonds, GROUPS))
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 5, 64, 1000, 1 << 24])
+def test_chunked_counts_match_baseline(tmp_path, chunk_bytes):
+    presence = random_presence()
+    file_path = write_gnu(tmp_path / "hbond.gnu", presence)
+
+    counts, frame_count = pyqmmm.md.hbond_matrix.final_counts(file_path, GROUPS, chunk_bytes=chunk_bytes)
+
+    assert (counts.tolist(), frame_count) == baseline_counts(file_path, GROUPS)
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 13, 1 << 24])
+def test_chunks_hold_back_split_frames(tmp_path, chunk_bytes):
+    presence = random_presence(frame_count=9)
+    file_path = write_gnu(tmp_path / "hbond.gnu", presence)
+
+    frames, bonds, frame_count = pyqmmm.md.hbond_matrix.read_present_bonds(file_path, chunk_bytes)
+
+    assert frame_count == 9
+    assert sorted(zip(frames.tolist(), bonds.tolist())) == list(zip(*map(np.ndarray.tolist, np.nonzero(presence))))
+
+
+def test_rows_with_extra_columns_use_the_last_field(tmp_path):
+    path = tmp_path / "hbond.gnu"
+    rows = "1 0 0.5 1\n1 1 0.5 0\n\n2 0 0.5 0\n2 1 0.5 1\nend\n"
+    path.write_bytes(("\n".join(HEADER) + "\n" + rows).encode())
+
+    frames, bonds, frame_count = pyqmmm.md.hbond_matrix.read_present_bonds(str(path))
+
+    assert frame_count == 2
+    assert frames.tolist() == [0, 1]
+    assert bonds.tolist() == [0, 1]
+    assert pyqmmm.md.hbond_matrix.parse_row(b"3.000 7 0.25 1") == [3, 7, 1]
+    with pytest.raises(ValueError, match="at least 3 fields"):
+        pyqmmm.md.hbond_matrix.parse_row(b"3.000 7")
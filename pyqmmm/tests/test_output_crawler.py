@@ -0,0 +1,54 @@
+"""
+Tests for the cached parallel output crawler.
+"""
+
+import os
+
+import pyqmmm.qm.output_crawler
+
+
+def count_lines(file_name):
+    with open(file_name) as f:
+        return len(f.readlines())
+
+
+def write_outputs(tmp_path):
+    file_names = []
+    for job, line_count in (("a", 2), ("b", 3)):
+        (tmp_path / job).mkdir()
+        (tmp_path / job / "qmscript.out").write_text("line\n" * line_count)
+        file_names.append(str(tmp_path / job / "qmscript.out"))
+    return file_names
+
+
+def test_unchanged_files_come_from_the_cache(tmp_path):
+    file_names = write_outputs(tmp_path)
+    cache_file = str(tmp_path / "cache.json")
+    assert pyqmmm.qm.output_crawler.find_outputs(str(tmp_path), "qmscript.out") == file_names
+
+    first = pyqmmm.qm.output_crawler.crawl(file_names, count_lines, cache_file)
+    with open(file_names[1], "a") as f:
+        f.write("line\n")
+    parsed = []
+
+    def count_lines_again(file_name):
+        parsed.append(file_name)
+        return count_lines(file_name)
+
+    count_lines_again.__name__ = "count_lines"
+    second = pyqmmm.qm.output_crawler.crawl(file_names, count_lines_again, cache_file)
+
+    assert first == {file_names[0]: 2, file_names[1]: 3}
+    assert second == {file_names[0]: 2, file_names[1]: 4}
+    assert parsed == [file_names[1]]
+
+
+def test_unwritable_cache_does_not_stop_the_crawl(tmp_path, capsys):
+    file_names = write_outputs(tmp_path)
+    cache_file = str(tmp_path / "missing" / "cache.json")
+
+    results = pyqmmm.qm.output_crawler.crawl(file_names, count_lines, cache_file)
+
+    assert results == {file_names[0]: 2, file_names[1]: 3}
+    assert "Could not save the output cache" in capsys.readouterr().out
+    assert not os.path.exists(tmp_path / "missing")
@@ -0,0 +1,96 @@
+"""
+Tests for collecting the final charges and spins of a TeraChem scan.
+"""
+
+import numpy as np
+
+import pyqmmm.qm.pes_organizer
+
+ELEMENTS = ["Fe", "O", "H"]
+ITERATIONS = [2, 3]  # Optimization steps in each scan step
+
+
+def write_scan(job_dir):
+    """Write a qmscript.out, charge_mull.xls and mullpop with a unique value for every section and atom."""
+    scr = job_dir / "scr"
+    scr.mkdir(parents=True)
+    output = []
+    for iterations in ITERATIONS:
+        output += ["FINAL ENERGY: -100.0 a.u."] * iterations + ["-=#=- Optimized Energy:    -100.0"]
+    (job_dir / "qmscript.out").write_text("\n".join(output) + "\n")
+
+    charges, spins = [], []
+    for section in range(sum(ITERATIONS)):
+        spins.append(" " * 29 + "Spin-Averaged Mulliken Population Analysis")
+        for atom, element in enumerate(ELEMENTS, start=1):
+            value = section + atom / 10
+            charges.append(f"{atom} {element} {value:.4f} 0.0")
+            spins.append(f"{atom} {element} 0.0 0.0 0.0 0.0 0.0 0.0 0.0 {-value:.4f}")
+    (scr / "charge_mull.xls").write_text("\n".join(charges) + "\n")
+    (scr / "mullpop").write_text("\n".join(spins) + "\n")
+
+
+def baseline_final_sections(file, starts_section, final_scan_position, column):
+    """Collect the sections that end each scan step, as get_scan_charges() and get_scan_spins() did."""
+    section_count = 0
+    current_section = 0
+    section_found = False
+    sections = []
+    with open(file) as f:
+        for line in f:
+            if starts_section(line):
+                current_section += 1
+                if section_count < len(final_scan_position) and current_section == final_scan_position[section_count]:
+                    section_count += 1
+                    section_found = True
+                    sections.append([])
+                else:
+                    section_found = False
+            tokens = line.split()
+            if section_found and len(tokens) > column and tokens[0].isdigit():
+                sections[-1].append(float(tokens[column]))
+    return np.array(sections)
+
+
+def test_post_process_matches_baseline_sections(tmp_path, monkeypatch):
+    job_dir = tmp_path / "job1"
+    write_scan(job_dir)
+    monkeypatch.chdir(job_dir)
+
+    properties = pyqmmm.qm.pes_organizer.post_process_scan()
+
+    final_scan_position, _ = pyqmmm.qm.pes_organizer.get_iteration_pairs()
+    assert final_scan_position == [2, 5]
+    is_first_atom = lambda line: line.split()[0] == "1"
+    is_spin_header = lambda line: line[29:42] == "Spin-Averaged"
+    charges = baseline_final_sections("scr/charge_mull.xls", is_first_atom, final_scan_position, 2)
+    spins = baseline_final_sections("scr/mullpop", is_spin_header, final_scan_position, 9)
+    assert np.array_equal(properties["charges"], charges)
+    assert np.array_equal(properties["spins"], spins)
+    assert properties["elements"].tolist() == ELEMENTS
+
+    assert properties["file"] == "./scr/scan_properties_job1.npz"
+    with np.load(properties["file"]) as saved:
+        assert np.array_equal(saved["charges"], charges)
+        assert np.array_equal(saved["spins"], spins)
+
+
+def test_charge_sections_split_where_the_atom_index_resets(tmp_path):
+    charge_file = tmp_path / "charge_mull.xls"
+    charge_file.write_text("2 O -0.5\n3 H 0.5\n1 Fe 1.0\n2 O -0.4\n3 H 0.4\n")
+
+    sections, elements = pyqmmm.qm.pes_organizer.read_charge_sections(str(charge_file))
+
+    assert sections == [["-0.5", "0.5"], ["1.0", "-0.4", "0.4"]]
+    assert elements == ["O", "H"]
+
+
+def test_spins_are_left_out_without_mullpop(tmp_path, monkeypatch):
+    write_scan(tmp_path)
+    (tmp_path / "scr" / "mullpop").unlink()
+    monkeypatch.chdir(tmp_path)
+
+    properties = pyqmmm.qm.pes_organizer.post_process_scan("scr/out.npz")
+
+    assert "spins" not in properties
+    assert properties["charges"].shape == (2, 3)
@@ -0,0 +1,29 @@
+"""
+Tests for the vectorized reaction coordinates.
+"""
+
+import numpy as np
+import pytest
+
+import pyqmmm.qm.reaction_coordinate_collector
+
+# A planar zigzag of four atoms with unit bonds and right angles
+COORDINATES = np.array([[[0.0, 1.0, 0.0], [0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [1.0, 0.0, 1.0]]])
+
+
+def test_distance_angle_and_dihedral():
+    definitions = pyqmmm.qm.reaction_coordinate_collector.parse_rc_definitions("1_3,1_2_3,1_2_3_4")
+    values = pyqmmm.qm.reaction_coordinate_collector.compute_reaction_coordinates(COORDINATES, definitions)
+
+    assert np.allclose(values, [[np.sqrt(2.0), 90.0, 90.0]])
+
+
+def test_ranges_are_rejected():
+    with pytest.raises(ValueError, match="ranges are not allowed"):
+        pyqmmm.qm.reaction_coordinate_collector.parse_rc_definitions("1-3")
+
+
+@pytest.mark.parametrize("definition", [[0, 2], [1, 5], [1, 2, 3, 9]])
+def test_atoms_outside_the_structure_are_rejected(definition):
+    with pytest.raises(ValueError, match="_".join(str(atom) for atom in definition)):
+        pyqmmm.qm.reaction_coordinate_collector.compute_reaction_coordinates(COORDINATES, [definition])
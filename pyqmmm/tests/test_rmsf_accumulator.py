@@ -0,0 +1,31 @@
+"""
+Tests for the single-pass RMSF accumulation, which runs without MDAnalysis.
+"""
+
+import numpy as np
+import pytest
+
+import pyqmmm.md.rmsf_accumulator
+
+
+def test_accumulated_rmsf_matches_two_pass_formula():
+    rng = np.random.default_rng(5)
+    # A large offset is where a naive sum of squares loses precision
+    frames = rng.normal(scale=0.3, size=(200, 15, 3)) + 1.0e4
+
+    rmsf = pyqmmm.md.rmsf_accumulator.accumulate_rmsf(iter(frames))
+
+    expected = np.sqrt(((frames - frames.mean(axis=0)) ** 2).sum(axis=-1).mean(axis=0))
+    assert rmsf.shape == (15,)
+    assert np.allclose(rmsf, expected, rtol=1e-9)
+
+
+def test_single_frame_has_no_fluctuation():
+    rmsf = pyqmmm.md.rmsf_accumulator.accumulate_rmsf([np.ones((4, 3))])
+
+    assert rmsf.tolist() == [0.0, 0.0, 0.0, 0.0]
+
+
+def test_empty_trajectory_is_rejected():
+    with pytest.raises(ValueError, match="no frames"):
+        pyqmmm.md.rmsf_accumulator.accumulate_rmsf([])
@@ -0,0 +1,55 @@
+"""
+Compare the streaming RMSF against the in-memory MDAnalysis alignment it can replace.
+"""
+
+import numpy as np
+import pytest
+
+mda = pytest.importorskip("MDAnalysis")
+from MDAnalysis.analysis import align, rms
+from MDAnalysis.coordinates.memory import MemoryReader
+
+import pyqmmm.md.rmsf_calculator
+
+
+def random_rotation(rng):
+    """Random proper rotation matrix from the QR decomposition of a Gaussian matrix."""
+    q, r = np.linalg.qr(rng.normal(size=(3, 3)))
+    q *= np.sign(np.diag(r))
+    if np.linalg.det(q) < 0:
+        q[:, 0] *= -1
+    return q
+
+
+def make_universe(coordinates):
+    """Universe with two atoms per residue holding the given (frames, atoms, 3) coordinates."""
+    n_atoms = coordinates.shape[1]
+    u = mda.Universe.empty(
+        n_atoms,
+        n_residues=n_atoms // 2,
+        atom_resindex=np.arange(n_atoms) // 2,
+        trajectory=True,
+    )
+    u.load_new(coordinates.astype(np.float32), format=MemoryReader)
+    return u
+
+
+def test_streaming_rmsf_matches_in_memory_alignment():
+    """Single-pass Welford RMSF agrees with AlignTraj(in_memory=True) followed by rms.RMSF."""
+    rng = np.random.default_rng(7)
+    structure = rng.normal(scale=5.0, size=(20, 3))
+    frames = [
+        (structure + rng.normal(scale=0.3, size=structure.shape)) @ random_rotation(rng).T
+        + rng.normal(scale=10.0, size=3)
+        for _ in range(50)
+    ]
+    coordinates = np.array(frames)
+    reference = make_universe(structure[np.newaxis])
+
+    streamed = pyqmmm.md.rmsf_calculator.streaming_rmsf(make_universe(coordinates), reference)
+
+    u = make_universe(coordinates)
+    align.AlignTraj(u, reference, select="all", in_memory=True).run()
+    in_memory = rms.RMSF(u.select_atoms("all")).run().results.rmsf
+
+    assert np.allclose(streamed, in_memory, atol=1e-4)
@@ -0,0 +1,62 @@
+"""
+Tests for searching QM outputs backwards from the end.
+"""
+
+import pytest
+
+import pyqmmm.qm.tail_reader
+
+OUTPUT = (
+    "FINAL ENERGY: -10.0 a.u.\n"
+    "PATH SUMMARY\n"
+    "image 0\n"
+    "FINAL ENERGY: -12.5 a.u.\n"
+    "PATH SUMMARY\n"
+    "image 0\n"
+    "image 1\n"
+    "FINAL ENERGY: -13.25 a.u.\n"
+    "done"
+)
+
+
+def forward_last_line_with(text, marker):
+    """Read every line from the top and keep the last match, as the outputs were read before."""
+    last = None
+    for line in text.splitlines():
+        if marker in line:
+            last = line
+    return last
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 7, 16, 1 << 16])
+def test_last_line_matches_forward_scan(tmp_path, block_size):
+    (tmp_path / "qmscript.out").write_bytes(OUTPUT.encode())
+
+    for marker in ("FINAL ENERGY", "PATH SUMMARY", "image", "done", "missing"):
+        line = pyqmmm.qm.tail_reader.read_last_line_with(str(tmp_path / "qmscript.out"), marker, block_size)
+        assert line == forward_last_line_with(OUTPUT, marker)
+
+
+@pytest.mark.parametrize("block_size", [2, 5, 1 << 16])
+def test_trailing_sections_start_at_the_last_marker(tmp_path, block_size):
+    (tmp_path / "qmscript.out").write_bytes(OUTPUT.encode())
+
+    sections = pyqmmm.qm.tail_reader.read_trailing_sections(
+        str(tmp_path / "qmscript.out"), ["PATH SUMMARY", "ENERGY: -12.5", "missing"], block_size
+    )
+
+    assert sections["PATH SUMMARY"] == OUTPUT[OUTPUT.rindex("PATH SUMMARY") :]
+    assert sections["ENERGY: -12.5"] == OUTPUT[OUTPUT.rindex("FINAL ENERGY: -12.5") :]
+    assert sections["missing"] is None
+
+
+def test_search_limit(tmp_path):
+    (tmp_path / "qmscript.out").write_bytes(OUTPUT.encode())
+    # Only the last FINAL ENERGY line is within the searched bytes
+    limit = len(OUTPUT) - OUTPUT.rindex("FINAL ENERGY")
+
+    offsets = pyqmmm.qm.tail_reader.find_last_offsets(
+        str(tmp_path / "qmscript.out"), ["FINAL ENERGY", "PATH SUMMARY"], block_size=8, limit=limit
+    )
+
+    assert offsets == {"FINAL ENERGY": OUTPUT.rindex("FINAL ENERGY"), "PATH SUMMARY": None}
@@ -0,0 +1,88 @@
+"""
+Tests for removing atoms from every frame of a trajectory.
+"""
+
+import numpy as np
+import pytest
+
+import pyqmmm.qm.traj_atom_filter
+
+ELEMENTS = ["Fe", "O", "H", "H", "Cl"]
+
+
+def write_trajectory(path, frame_count=3):
+    lines = []
+    for frame in range(frame_count):
+        lines += [str(len(ELEMENTS)), f"frame {frame}"]
+        lines += [f"{element} {atom:.3f} {frame:.3f} {atom * frame / 3:.3f}" for atom, element in enumerate(ELEMENTS)]
+    path.write_text("\n".join(lines) + "\n")
+    return lines
+
+
+def baseline_remove_atoms(lines, selection):
+    """Delete the selected atom lines frame by frame, as remove_atoms() did before the atom mask."""
+    n = len(ELEMENTS) + 2
+    frames = []
+    for start in range(0, len(lines), n):
+        frame = lines[start : start + n]
+        for atom in sorted(selection, reverse=True):
+            del frame[atom + 1]
+        frame[0] = str(int(frame[0]) - len(selection))
+        frames.append(frame)
+    return frames
+
+
+def read_frames(path, atom_count):
+    lines = path.read_text().splitlines()
+    n = atom_count + 2
+    return [lines[start : start + n] for start in range(0, len(lines), n)]
+
+
+def test_filtered_xyz_matches_baseline(tmp_path):
+    lines = write_trajectory(tmp_path / "traj.xyz")
+    selection = [1, 4, 5]
+
+    frame_count = pyqmmm.qm.traj_atom_filter.filter_trajectory(
+        str(tmp_path / "traj.xyz"), selection, xyz_out=str(tmp_path / "new_traj.xyz")
+    )
+
+    expected = baseline_remove_atoms(lines, selection)
+    written = read_frames(tmp_path / "new_traj.xyz", 2)
+    assert frame_count == 3
+    for got, want in zip(written, expected):
+        assert got[:2] == want[:2]
+        assert [line.split()[0] for line in got[2:]] == [line.split()[0] for line in want[2:]]
+        assert np.allclose(
+            [[float(value) for value in line.split()[1:]] for line in got[2:]],
+            [[float(value) for value in line.split()[1:]] for line in want[2:]],
+        )
+
+
+def test_pdb_models_use_the_template(tmp_path):
+    write_trajectory(tmp_path / "traj.xyz", frame_count=2)
+    template = tmp_path / "template.pdb"
+    template.write_text(
+        "ATOM      1  O   WAT A   1       0.000   0.000   0.000  1.00  0.00           O\n"
+        "ATOM      2  H1  WAT A   1       0.000   0.000   0.000  1.00  0.00           H\n"
+    )
+
+    pyqmmm.qm.traj_atom_filter.filter_trajectory(
+        str(tmp_path / "traj.xyz"), [1, 4, 5], pdb_out=str(tmp_path / "new_traj.pdb"), template_file=str(template)
+    )
+
+    lines = (tmp_path / "new_traj.pdb").read_text().splitlines()
+    assert lines[0] == "MODEL        1"
+    assert lines[3:6] == ["TER", "ENDMDL", "MODEL        2"]
+    assert lines[7][:30] == "ATOM      2  H1  WAT A   1    "
+    assert [float(lines[7][i : i + 8]) for i in (30, 38, 46)] == [2.0, 1.0, 0.667]
+    assert lines[7][54:] == "  1.00  0.00           H"
+
+
+@pytest.mark.parametrize("selection", [[0], [6], [-1]])
+def test_atoms_outside_the_trajectory_are_rejected(tmp_path, selection):
+    write_trajectory(tmp_path / "traj.xyz")
+
+    with pytest.raises(ValueError, match="numbered 1 to 5"):
+        pyqmmm.qm.traj_atom_filter.filter_trajectory(
+            str(tmp_path / "traj.xyz"), selection, xyz_out=str(tmp_path / "new_traj.xyz")
+        )
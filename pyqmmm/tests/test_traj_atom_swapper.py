@@ -0,0 +1,63 @@
+"""
+Tests for relabeling atoms across xyz, charge and scan_properties files.
+"""
+
+import numpy as np
+import pytest
+
+import pyqmmm.qm.traj_atom_swapper
+
+
+def test_swaps_combine_into_one_permutation():
+    permutation = pyqmmm.qm.traj_atom_swapper.swaps_to_permutation([(1, 3), (3, 4)], 4)
+
+    assert permutation.tolist() == [2, 1, 3, 0]
+
+
+@pytest.mark.parametrize("swap", [(0, 2), (1, 5), (-1, 2)])
+def test_swaps_outside_the_structure_are_rejected(swap):
+    with pytest.raises(ValueError, match="numbered 1 to 4"):
+        pyqmmm.qm.traj_atom_swapper.swaps_to_permutation([swap], 4)
+
+
+def test_permute_xyz_swaps_atom_lines(tmp_path):
+    frames = ["3\nstep {0}\nC 0.0 0.0 {0}.0\nO 1.0 0.0 {0}.0\nH 2.0 0.0 {0}.0\n".format(frame) for frame in range(2)]
+    (tmp_path / "scan.xyz").write_text("".join(frames))
+    permutation = pyqmmm.qm.traj_atom_swapper.swaps_to_permutation([(1, 3)], 3)
+
+    pyqmmm.qm.traj_atom_swapper.permute_xyz(str(tmp_path / "scan.xyz"), permutation, str(tmp_path / "out.xyz"))
+
+    lines = (tmp_path / "out.xyz").read_text().splitlines()
+    assert lines[:2] == ["3", "step 0"]
+    assert [line.split()[0] for line in lines[2:5]] == ["H", "O", "C"]
+    assert [float(line.split()[1]) for line in lines[7:10]] == [2.0, 1.0, 0.0]
+
+
+def test_permute_table_keeps_atom_numbers(tmp_path):
+    step = "1 C 0.10\n2 O -0.20\n3 H 0.30\nEnd scan\n"
+    (tmp_path / "scan.charge").write_text(step + step)
+    permutation = pyqmmm.qm.traj_atom_swapper.swaps_to_permutation([(1, 3)], 3)
+
+    step_count = pyqmmm.qm.traj_atom_swapper.permute_table(
+        str(tmp_path / "scan.charge"), permutation, str(tmp_path / "out.charge")
+    )
+
+    assert step_count == 2
+    assert (tmp_path / "out.charge").read_text() == 2 * "1 H 0.30\n2 O -0.20\n3 C 0.10\nEnd scan\n"
+
+
+def test_apply_permutation_relabels_the_scan_properties_store(tmp_path):
+    charges = np.array([[0.1, -0.2, 0.3], [0.4, -0.5, 0.6]])
+    spins = np.array([[1.0, 0.0, 0.5], [0.9, 0.1, 0.4]])
+    store = str(tmp_path / "scan_properties_job.npz")
+    np.savez(store, charges=charges, spins=spins, elements=np.array(["C", "O", "H"]))
+    atom_count = pyqmmm.qm.traj_atom_swapper.get_atom_count(store)
+    permutation = pyqmmm.qm.traj_atom_swapper.swaps_to_permutation([(1, 3)], atom_count)
+
+    (out_file,) = pyqmmm.qm.traj_atom_swapper.apply_permutation([store], permutation)
+
+    assert out_file == str(tmp_path / "scan_properties_job_swapped.npz")
+    with np.load(out_file) as swapped:
+        assert swapped["elements"].tolist() == ["H", "O", "C"]
+        assert np.array_equal(swapped["charges"], charges[:, [2, 1, 0]])
+        assert np.array_equal(swapped["spins"], spins[:, [2, 1, 0]])
@@ -0,0 +1,46 @@
+"""
+Tests for the binary trajectory cache.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import pyqmmm.qm.traj_cache
+import pyqmmm.qm.traj_indexer
+
+COMMENTS = ["Converged     Job  -- Energy:  -512.125", "Converged     Job  -- Energy:  -512.25"]
+
+
+def write_xyz(path, comments=COMMENTS):
+    with open(path, "w") as f:
+        for frame, comment in enumerate(comments):
+            f.write(f"2\n{comment}\nC 0.0 0.0 {frame:.1f}\nO 0.0 0.0 1.1\n")
+    return str(path)
+
+
+def test_get_energies_without_a_cache(tmp_path):
+    xyz_file = write_xyz(tmp_path / "scan.xyz")
+
+    energies = pyqmmm.qm.traj_cache.get_energies(xyz_file)
+    assert energies.tolist() == [-512.125, -512.25]
+    assert not os.path.exists(pyqmmm.qm.traj_cache.cache_path(xyz_file))
+
+
+def test_get_energies_from_the_cache(tmp_path):
+    xyz_file = write_xyz(tmp_path / "scan.xyz")
+    cache = pyqmmm.qm.traj_cache.get_cache(xyz_file)
+
+    assert str(cache["software"]) == "TeraChem-scan"
+    assert np.allclose(cache["coordinates"][1], [[0.0, 0.0, 1.0], [0.0, 0.0, 1.1]])
+    assert pyqmmm.qm.traj_cache.get_energies(xyz_file).tolist() == cache["energies"].tolist()
+
+
+def test_get_energies_reports_frames_the_cache_could_not_parse(tmp_path):
+    xyz_file = write_xyz(tmp_path / "scan.xyz", [COMMENTS[0], "Converged     Job  -- Energy:"])
+    cache = pyqmmm.qm.traj_cache.get_cache(xyz_file)
+
+    assert np.isnan(cache["energies"][1])
+    with pytest.raises(ValueError, match="frame 1"):
+        pyqmmm.qm.traj_cache.get_energies(xyz_file)
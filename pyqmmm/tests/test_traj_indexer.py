@@ -0,0 +1,182 @@
+"""
+Tests for the byte-offset frame index of xyz trajectories.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import pyqmmm.qm.traj_indexer
+
+FRAMES = [
+    ("Coordinates from ORCA-job qmscript_MEP E -1234.500000", [("O", 0.0, 0.0, 0.1), ("H", 0.0, 0.75, -0.5)]),
+    ("Coordinates from ORCA-job qmscript_MEP E -1234.600000", [("O", 0.0, 0.0, 0.2), ("H", 0.0, 0.76, -0.4)]),
+    ("Coordinates from ORCA-job qmscript_MEP E -1234.550000", [("O", 0.0, 0.0, 0.3), ("H", 0.0, 0.77, -0.3)]),
+]
+
+
+def write_xyz(path, frames=FRAMES, separator=""):
+    """Write frames as an xyz trajectory, optionally with text between frames."""
+    text = ""
+    for comment, atoms in frames:
+        text += f"{len(atoms)}\n{comment}\n"
+        text += "".join(f"{element} {x:.6f} {y:.6f} {z:.6f}\n" for element, x, y, z in atoms)
+        text += separator
+    path.write_text(text)
+    return str(path)
+
+
+def read_frames_by_line(xyz_file):
+    """Split a trajectory into frames line by line, as the tools did before the frame index."""
+    frames = []
+    # Keep the line endings as written, frames from the index are raw bytes
+    with open(xyz_file, newline="") as f:
+        lines = [line for line in f if line.strip()]
+    line = 0
+    while line < len(lines):
+        atom_count = int(lines[line])
+        frames.append("".join(lines[line : line + atom_count + 2]))
+        line += atom_count + 2
+    return frames
+
+
+def test_index_matches_line_parser(tmp_path):
+    xyz_file = write_xyz(tmp_path / "scan.xyz")
+    index = pyqmmm.qm.traj_indexer.build_frame_index(xyz_file)
+
+    assert index["atom_counts"].tolist() == [2, 2, 2]
+    frames = list(pyqmmm.qm.traj_indexer.iter_frames(xyz_file, index=index))
+    assert frames == read_frames_by_line(xyz_file)
+    assert pyqmmm.qm.traj_indexer.read_comment_lines(xyz_file, index) == [comment for comment, _ in FRAMES]
+
+
+def test_index_across_chunk_boundaries(tmp_path, monkeypatch):
+    xyz_file = write_xyz(tmp_path / "scan.xyz", separator="\n")
+    expected = pyqmmm.qm.traj_indexer.build_frame_index(xyz_file)
+
+    # Frames split across many tiny chunks must give the same offsets
+    monkeypatch.setattr(pyqmmm.qm.traj_indexer, "CHUNK_SIZE", 7)
+    index = pyqmmm.qm.traj_indexer.build_frame_index(xyz_file)
+
+    for field in pyqmmm.qm.traj_indexer.INDEX_FIELDS:
+        assert np.array_equal(index[field], expected[field])
+
+
+def test_index_skips_incomplete_final_frame(tmp_path):
+    path = tmp_path / "running.xyz"
+    write_xyz(path)
+    with open(path, "a") as f:
+        f.write("2\nunfinished\nO 0.0 0.0 0.0\n")
+
+    assert pyqmmm.qm.traj_indexer.count_frames(str(path)) == 3
+
+
+def test_index_without_trailing_newline(tmp_path):
+    path = tmp_path / "scan.xyz"
+    write_xyz(path)
+    path.write_text(path.read_text().rstrip("\n"))
+
+    frames = list(pyqmmm.qm.traj_indexer.iter_frames(str(path)))
+    assert len(frames) == 3
+    assert frames[-1].endswith("-0.300000")
+
+
+def test_empty_file_has_no_frames(tmp_path):
+    path = tmp_path / "empty.xyz"
+    path.write_text("")
+
+    assert pyqmmm.qm.traj_indexer.count_frames(str(path)) == 0
+
+
+def test_sidecar_is_saved_and_reused(tmp_path):
+    xyz_file = write_xyz(tmp_path / "scan.xyz")
+    index = pyqmmm.qm.traj_indexer.get_frame_index(xyz_file)
+
+    assert os.path.exists(pyqmmm.qm.traj_indexer.index_path(xyz_file))
+    saved = pyqmmm.qm.traj_indexer.load_frame_index(xyz_file)
+    for field in pyqmmm.qm.traj_indexer.INDEX_FIELDS:
+        assert np.array_equal(saved[field], index[field])
+
+
+def test_sidecar_is_invalidated_when_the_trajectory_changes(tmp_path):
+    xyz_file = write_xyz(tmp_path / "scan.xyz")
+    pyqmmm.qm.traj_indexer.get_frame_index(xyz_file)
+
+    write_xyz(tmp_path / "scan.xyz", FRAMES[:2])
+    assert pyqmmm.qm.traj_indexer.load_frame_index(xyz_file) is None
+    assert pyqmmm.qm.traj_indexer.count_frames(xyz_file) == 2
+
+
+def test_sidecar_with_another_version_is_ignored(tmp_path):
+    xyz_file = write_xyz(tmp_path / "scan.xyz")
+    index = pyqmmm.qm.traj_indexer.build_frame_index(xyz_file)
+    sidecar = pyqmmm.qm.traj_indexer.index_path(xyz_file)
+    pyqmmm.qm.traj_indexer.save_sidecar(sidecar, xyz_file, pyqmmm.qm.traj_indexer.INDEX_VERSION + 1, index)
+
+    assert pyqmmm.qm.traj_indexer.load_frame_index(xyz_file) is None
+
+
+def test_frame_views_match_frames(tmp_path):
+    xyz_file = write_xyz(tmp_path / "scan.xyz")
+
+    views = [bytes(view).decode() for view in pyqmmm.qm.traj_indexer.iter_frame_views(xyz_file, [2, 0])]
+    assert views == [read_frames_by_line(xyz_file)[frame] for frame in (2, 0)]
+
+
+def test_frame_views_can_be_abandoned(tmp_path):
+    xyz_file = write_xyz(tmp_path / "scan.xyz")
+
+    # Leaving the loop early must release the view so the map can be closed
+    for view in pyqmmm.qm.traj_indexer.iter_frame_views(xyz_file):
+        break
+    views = pyqmmm.qm.traj_indexer.iter_frame_views(xyz_file)
+    next(views)
+    views.close()
+
+    with pytest.raises(ValueError):
+        view.tobytes()
+
+
+def test_copy_frames_writes_raw_bytes(tmp_path):
+    path = tmp_path / "scan.xyz"
+    write_xyz(path)
+    path.write_text(path.read_text().rstrip("\n"))
+
+    with open(tmp_path / "copy.xyz", "wb") as out_file:
+        frame_count = pyqmmm.qm.traj_indexer.copy_frames(str(path), [2, 1], out_file)
+
+    frames = read_frames_by_line(str(path))
+    assert frame_count == 2
+    assert (tmp_path / "copy.xyz").read_bytes().decode() == frames[2] + "\n" + frames[1]
+
+
+@pytest.mark.parametrize(
+    "comment, software, energy",
+    [
+        ("Coordinates from ORCA-job qmscript_MEP E -1234.5", "ORCA-MEP", -1234.5),
+        ("Coordinates from ORCA-job qmscript_IRC_Full E -99.25", "ORCA-IRC", -99.25),
+        ("Coordinates from ORCA-job qmscript -77.5", "ORCA", -77.5),
+        ("Converged     Job  -- Energy:  -512.125", "TeraChem-scan", -512.125),
+        ("-88.0625 frame 4 xyz file generated by TeraChem", "TeraChem-opt", -88.0625),
+    ],
+)
+def test_read_energies_matches_comment_parser(tmp_path, comment, software, energy):
+    frames = [(comment, FRAMES[0][1]), (comment.replace(str(energy), str(energy - 1)), FRAMES[1][1])]
+    xyz_file = write_xyz(tmp_path / "scan.xyz", frames)
+
+    energies = pyqmmm.qm.traj_indexer.read_energies(xyz_file)
+    assert pyqmmm.qm.traj_indexer.identify_software(comment) == software
+    assert energies.tolist() == [energy, energy - 1]
+    assert energies.tolist() == [
+        pyqmmm.qm.traj_indexer.parse_energy(line, software)
+        for line in pyqmmm.qm.traj_indexer.read_comment_lines(xyz_file)
+    ]
+
+
+def test_read_energies_names_the_bad_frame(tmp_path):
+    frames = [FRAMES[0], ("Coordinates from ORCA-job qmscript_MEP E", FRAMES[1][1])]
+    xyz_file = write_xyz(tmp_path / "scan.xyz", frames)
+
+    with pytest.raises(ValueError, match="frame 1"):
+        pyqmmm.qm.traj_indexer.read_energies(xyz_file)
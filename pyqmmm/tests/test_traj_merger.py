@@ -0,0 +1,71 @@
+"""
+Tests for combining frames from several xyz trajectories.
+"""
+
+import pytest
+
+import pyqmmm.qm.traj_merger
+
+
+def baseline_selection(request):
+    """Expand a comma-separated list of ranges the way request_frames() did before negative frames and steps."""
+    ranges = [list(map(int, term.split("-"))) for term in request.split(",")]
+    return [frame - 1 for bounds in ranges for frame in range(bounds[0], bounds[-1] + 1)]
+
+
+def write_xyz(path, label, frame_count):
+    frames = [f"1\n{label} frame {frame}\nH 0.0 0.0 {frame:.1f}\n" for frame in range(frame_count)]
+    path.write_text("".join(frames))
+    return frames
+
+
+@pytest.mark.parametrize("selection", ["1-3,5", "2", "4-4,1-2", "1-10"])
+def test_frame_selection_matches_baseline_ranges(selection):
+    assert pyqmmm.qm.traj_merger.parse_frame_selection(selection, 10) == baseline_selection(selection)
+
+
+@pytest.mark.parametrize(
+    "selection, frames",
+    [
+        ("-1", [9]),
+        ("-3--1", [7, 8, 9]),
+        ("1-7:3", [0, 3, 6]),
+        ("10-1:-4", [9, 5, 1]),
+        ("3-1", [2, 1, 0]),
+        (" 1, -1 ", [0, 9]),
+    ],
+)
+def test_negative_stepped_and_reversed_selections(selection, frames):
+    assert pyqmmm.qm.traj_merger.parse_frame_selection(selection, 10) == frames
+
+
+@pytest.mark.parametrize("selection", ["0", "11", "-11", "1-5:0", "1-5:-1", "a-b", "1-"])
+def test_invalid_selections_are_rejected(selection):
+    with pytest.raises(ValueError):
+        pyqmmm.qm.traj_merger.parse_frame_selection(selection, 10)
+
+
+def test_combine_copies_the_selected_frames(tmp_path, monkeypatch):
+    first = write_xyz(tmp_path / "1.xyz", "first", 4)
+    second = write_xyz(tmp_path / "2.xyz", "second", 3)
+    (tmp_path / "single.xyz").write_text("1\nnot a trajectory\nH 0.0 0.0 0.0\n")
+    monkeypatch.chdir(tmp_path)
+    answers = iter(["2-4", "", "1,3", "r"])
+    monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
+
+    pyqmmm.qm.traj_merger.combine_xyz_files()
+
+    combined = (tmp_path / "combined.xyz").read_text()
+    assert combined == "".join(first[1:4] + [second[2], second[0]])
+    assert not any(path.name.endswith(".tmp") for path in tmp_path.iterdir())
+
+
+def test_combine_leaves_combined_xyz_alone_on_a_bad_selection(tmp_path, monkeypatch):
+    write_xyz(tmp_path / "1.xyz", "first", 4)
+    (tmp_path / "combined.xyz").write_text("previous\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.input", lambda prompt: "9")
+
+    with pytest.raises(ValueError):
+        pyqmmm.qm.traj_merger.combine_xyz_files()
+    assert (tmp_path / "combined.xyz").read_text() == "previous\n"
@@ -0,0 +1,115 @@
+"""
+Tests for the NumPy-backed xyz trajectory.
+"""
+
+import numpy as np
+import pytest
+
+import pyqmmm.qm.trajectory
+
+COMMENTS = ["frame 0", "frame 1", "frame 2"]
+ELEMENTS = ["Fe", "O", "H"]
+
+
+def make_coordinates(n_frames=3, n_atoms=3):
+    return np.arange(n_frames * n_atoms * 3, dtype=np.float64).reshape(n_frames, n_atoms, 3) / 7.0
+
+
+def write_xyz(path, coordinates, elements=ELEMENTS, comments=COMMENTS, extra=""):
+    """Write a trajectory, optionally with an extra column after each atom line."""
+    with open(path, "w") as f:
+        for comment, frame in zip(comments, coordinates):
+            f.write(f"{len(elements)}\n{comment}\n")
+            for element, (x, y, z) in zip(elements, frame):
+                f.write(f"{element} {x:.8f} {y:.8f} {z:.8f}{extra}\n")
+    return str(path)
+
+
+def read_xyz_by_line(xyz_file):
+    """Parse a trajectory line by line, as the tools did before Trajectory."""
+    frames = []
+    with open(xyz_file) as f:
+        lines = f.read().splitlines()
+    line = 0
+    while line < len(lines):
+        atom_count = int(lines[line])
+        atoms = [atom_line.split() for atom_line in lines[line + 2 : line + 2 + atom_count]]
+        frames.append([[float(value) for value in atom[1:4]] for atom in atoms])
+        line += atom_count + 2
+    return np.array(frames)
+
+
+def test_from_xyz_matches_line_parser(tmp_path):
+    xyz_file = write_xyz(tmp_path / "traj.xyz", make_coordinates())
+    traj = pyqmmm.qm.trajectory.Trajectory.from_xyz(xyz_file)
+
+    assert len(traj) == 3
+    assert traj.n_atoms == 3
+    assert np.allclose(traj.coordinates, read_xyz_by_line(xyz_file))
+    assert traj.elements.tolist() == ELEMENTS
+    assert traj.comments == COMMENTS
+
+
+def test_frames_are_decoded_on_first_access(tmp_path):
+    xyz_file = write_xyz(tmp_path / "traj.xyz", make_coordinates())
+    traj = pyqmmm.qm.trajectory.Trajectory.from_xyz(xyz_file)
+
+    assert not traj._decoded.any()
+    assert np.allclose(traj[-1], make_coordinates()[2])
+    assert traj._decoded.tolist() == [False, False, True]
+
+
+def test_extra_columns_are_ignored(tmp_path):
+    xyz_file = write_xyz(tmp_path / "traj.xyz", make_coordinates(), extra=" 0.25 -0.1")
+    traj = pyqmmm.qm.trajectory.Trajectory.from_xyz(xyz_file)
+
+    assert np.allclose(traj.coordinates, make_coordinates())
+
+
+def test_frame_out_of_range(tmp_path):
+    xyz_file = write_xyz(tmp_path / "traj.xyz", make_coordinates())
+    traj = pyqmmm.qm.trajectory.Trajectory.from_xyz(xyz_file)
+
+    with pytest.raises(IndexError, match="Frame 3"):
+        traj.frame(3)
+
+
+def test_empty_trajectory(tmp_path):
+    path = tmp_path / "empty.xyz"
+    path.write_text("")
+    traj = pyqmmm.qm.trajectory.Trajectory.from_xyz(str(path))
+
+    assert len(traj) == 0
+    assert traj.comments == []
+    assert traj.coordinates.shape == (0, 0, 3)
+
+
+def test_malformed_coordinates_are_rejected():
+    with pytest.raises(ValueError, match="n_frames, n_atoms, 3"):
+        pyqmmm.qm.trajectory.Trajectory(np.zeros((3, 3)), ELEMENTS)
+    with pytest.raises(ValueError, match="do not match"):
+        pyqmmm.qm.trajectory.Trajectory(make_coordinates(), ELEMENTS[:2])
+
+
+def test_subset_and_write_round_trip(tmp_path):
+    xyz_file = write_xyz(tmp_path / "traj.xyz", make_coordinates())
+    traj = pyqmmm.qm.trajectory.Trajectory.from_xyz(xyz_file)
+
+    subset = traj.subset(frames=[2, 0], atoms=[0, 2])
+    out_file = str(tmp_path / "subset.xyz")
+    subset.write_xyz(out_file)
+
+    written = pyqmmm.qm.trajectory.Trajectory.from_xyz(out_file)
+    assert written.elements.tolist() == ["Fe", "H"]
+    assert written.comments == ["frame 2", "frame 0"]
+    assert np.allclose(written.coordinates, make_coordinates()[[2, 0]][:, [0, 2]])
+
+
+def test_coordinate_chunks_match_line_parser(tmp_path):
+    xyz_file = write_xyz(tmp_path / "traj.xyz", make_coordinates())
+    expected = read_xyz_by_line(xyz_file)
+
+    chunks = list(pyqmmm.qm.trajectory.iter_coordinate_chunks(xyz_file, chunk_size=2))
+    assert [list(frames) for frames, _, _ in chunks] == [[0, 1], [2]]
+    assert np.allclose(np.concatenate([coordinates for _, _, coordinates in chunks]), expected)
+    assert chunks[0][1].tolist() == ELEMENTS
@@ -0,0 +1,53 @@
+"""
+Tests for reversing xyz trajectories.
+"""
+
+import pytest
+
+import pyqmmm.qm.traj_indexer
+import pyqmmm.qm.xyz_flipper
+
+
+def write_trajectory(path, frame_count=4):
+    frames = [(2, f"frame {frame}", [f"C 0.0 0.0 {frame:.1f}", "O 0.0 0.0 1.1"]) for frame in range(frame_count)]
+    pyqmmm.qm.xyz_flipper.write_xyz(str(path), frames)
+    return frames
+
+
+def test_reverse_matches_line_parser(tmp_path):
+    frames = write_trajectory(tmp_path / "scan.xyz")
+
+    output_file = pyqmmm.qm.xyz_flipper.reverse_xyz(str(tmp_path / "scan.xyz"))
+
+    assert output_file == str(tmp_path / "scan_reversed.xyz")
+    assert pyqmmm.qm.xyz_flipper.read_xyz(output_file) == frames[::-1]
+
+
+def test_reverse_in_place(tmp_path):
+    frames = write_trajectory(tmp_path / "scan.xyz")
+
+    pyqmmm.qm.xyz_flipper.reverse_xyz(str(tmp_path / "scan.xyz"), in_place=True)
+
+    assert pyqmmm.qm.xyz_flipper.read_xyz(str(tmp_path / "scan.xyz")) == frames[::-1]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["scan.xyz"]
+
+
+def test_in_place_with_an_output_file_is_rejected(tmp_path):
+    write_trajectory(tmp_path / "scan.xyz")
+
+    with pytest.raises(ValueError):
+        pyqmmm.qm.xyz_flipper.reverse_xyz(str(tmp_path / "scan.xyz"), str(tmp_path / "out.xyz"), in_place=True)
+
+
+def test_failed_reverse_leaves_no_temporary_file(tmp_path, monkeypatch):
+    frames = write_trajectory(tmp_path / "scan.xyz")
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pyqmmm.qm.traj_indexer, "copy_frames", fail)
+    with pytest.raises(OSError):
+        pyqmmm.qm.xyz_flipper.reverse_xyz(str(tmp_path / "scan.xyz"), in_place=True)
+
+    assert pyqmmm.qm.xyz_flipper.read_xyz(str(tmp_path / "scan.xyz")) == frames
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["scan.xyz"]